@@ -0,0 +1,399 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+'''
+Offline backtest of a saved model over a config's date range.
+Bars come from the bar cache (downloaded once, then memory-mapped), a bar file or a
+synthetic generator. Indicators and turbulence are computed once over the whole range,
+as the live feed would have seen them bar by bar; turbulence is the VIXY close, loaded
+from the same source as the bars. Every trading day is then replayed as
+an independent path that starts from the same cash, like a fresh paper trading session.
+All days advance together: each minute builds the states of every day into one
+(days, state_dim) array, the model predicts them in a single batched forward pass, and
+fills, costs and accounting are numpy operations across days. A month of minute bars
+is about 390 forward passes instead of ~8000.
+
+Orders follow the live planner (sells first, then greedy buys with the cash left, actions
+within +-10 ignored), fill at the bar close and pay `cost` per dollar traded. A turbulent
+bar (turbulence >= turbulence_thresh) sells everything, as FinRL does.
+
+    python main/backtester.py --config tutorials/FinRL_StockTrading_Fundamental/config.json \\
+        --model-path tutorials/FinRL_StockTrading_Fundamental/models/trained_ppo.zip
+    python main/backtester.py --config ... --model-path ... --bars bars.parquet --output report.json
+    python main/backtester.py --config ... --model-path ... --synthetic-days 21
+'''
+
+NY_TZ = "America/New_York"
+SESSION_OPEN_MINUTES = 9 * 60 + 30
+SESSION_CLOSE_MINUTES = 16 * 60
+# close used as turbulence by the live feed, as in FinRL
+TURBULENCE_SYMBOL = "VIXY"
+
+
+def sigmoid_sign(ary, thresh):
+    """Turbulence squashing of PaperTradingAlpaca.sigmoid_sign, for arrays."""
+    return (1 / (1 + np.exp(-np.asarray(ary) / thresh * np.e)) - 0.5) * thresh
+
+
+def _scale_max_stock(action, max_stock):
+    return np.trunc(action * max_stock)
+
+
+def _scale_allocation(action, max_stock):
+    return (action * 200) - 100
+
+
+# profile name -> (zero-pad the state into the model observation, action scaling)
+# "stock_trading" scales [-1, 1] actions to shares like FinRL's StockTradingEnv, "portfolio_allocation"
+# is the [0, 1] scaling and padded observation of the Explainable DRL scripts.
+PROFILES = {
+    "stock_trading": (False, _scale_max_stock),
+    "portfolio_allocation": (True, _scale_allocation),
+}
+
+
+def default_profile(config_path):
+    return "portfolio_allocation" if "Explainable" in os.path.abspath(config_path) else "stock_trading"
+
+
+class Market:
+    def __init__(self, bars, tech, turbulence, start=None, end=None):
+        """
+        Bars with their precomputed features, split into regular trading sessions.
+
+        Args:
+            bars (BarData): Aligned bars, including the warmup history before `start`.
+            tech (np.ndarray): (T, n_tickers, n_indicators) indicator values after each bar.
+            turbulence (np.ndarray): (T,) turbulence after each bar.
+            start, end: Only sessions inside [start, end] are traded (default: all of them).
+        """
+        import pandas as pd
+
+        self.bars = bars
+        self.tickers = bars.tickers
+        self.close = bars.close
+        self.tech = tech
+        self.turbulence = turbulence
+        local = pd.DatetimeIndex(pd.to_datetime(bars.timestamps, utc=True)).tz_convert(NY_TZ)
+        minutes = local.hour * 60 + local.minute
+        in_session = (minutes >= SESSION_OPEN_MINUTES) & (minutes < SESSION_CLOSE_MINUTES)
+        if start is not None:
+            in_session &= bars.timestamps >= pd.Timestamp(start).value
+        if end is not None:
+            in_session &= bars.timestamps <= pd.Timestamp(end).value
+        days = np.asarray(local.normalize().asi8)
+        rows = np.flatnonzero(in_session)
+        self.days, first = np.unique(days[rows], return_index=True)
+        self.sessions = np.split(rows, first[1:]) if len(rows) else []
+
+    def session_matrix(self):
+        """(days, max_bars) row indices of each session, padded with -1, and the matching validity mask."""
+        length = max((len(rows) for rows in self.sessions), default=0)
+        matrix = np.full((len(self.sessions), length), -1, dtype=np.int64)
+        for i, rows in enumerate(self.sessions):
+            matrix[i, :len(rows)] = rows
+        return matrix, matrix >= 0
+
+
+def compute_features(bars, tech_indicator_list, turbulence_source="vixy", turbulence=None, turbulence_window=252):
+    """
+    Indicators and turbulence after every bar, as the incremental live feed produces them.
+
+    Args:
+        bars (BarData): Aligned bars of the config's tickers, oldest first.
+        tech_indicator_list (list): Indicator names.
+        turbulence_source (str): "returns" computes UniverseTurbulence from the bars; otherwise
+            `turbulence` (VIXY closes aligned to the bars, see load_bars) is used. Without it the
+            turbulence is zero and the turbulence liquidation never fires; a warning is printed.
+
+    Returns:
+        (tech, turbulence): (T, n, k) and (T,) arrays.
+    """
+    from tutorials.utils.indicators import IncrementalIndicatorEngine
+    from tutorials.utils.turbulence import UniverseTurbulence
+
+    engine = IncrementalIndicatorEngine(len(bars.tickers), tech_indicator_list)
+    tech = np.empty((len(bars), len(bars.tickers), len(engine.indicators)))
+    for t in range(len(bars)):
+        tech[t] = engine.update(bars.high[t], bars.low[t], bars.close[t])
+    if turbulence_source == "returns":
+        model = UniverseTurbulence(bars.tickers, window=turbulence_window)
+        turbulence = np.array([model.update(row)[0] for row in bars.close])
+    elif turbulence is None:
+        print(f"WARNING: no {TURBULENCE_SYMBOL} bars for turbulence, using zeros; turbulent bars will not "
+              f"liquidate as they would live")
+        turbulence = np.zeros(len(bars))
+    return tech, np.asarray(turbulence, dtype=float)
+
+
+class BatchPolicy:
+    def __init__(self, model, state_dim, action_dim, max_stock, profile="stock_trading", elegantrl=False):
+        """
+        Batched predict() over many states with the live action scaling.
+
+        Args:
+            model: SB3 model or policy (predict(obs) accepts a batch), or an ElegantRL actor.
+            state_dim (int): Length of the state vector.
+            action_dim (int): Number of tickers; extra model outputs are dropped.
+            max_stock (int): Shares per unit of action.
+            profile (str): Key of PROFILES.
+            elegantrl (bool): `model` is a torch actor returning tanh actions.
+        """
+        self.model = model
+        self.action_dim = action_dim
+        self.max_stock = max_stock
+        self.elegantrl = elegantrl
+        allow_padding, self.scale = PROFILES[profile]
+        self.adapter = None
+        if not elegantrl:
+            from tutorials.utils.observation_adapter import ObservationAdapter
+
+            self.adapter = ObservationAdapter(model.observation_space.shape, state_dim, allow_padding=allow_padding)
+        self.calls = 0
+        self.decisions = 0
+        self.seconds = 0.0
+
+    def predict(self, states):
+        """Scaled (batch, action_dim) actions for a (batch, state_dim) array of states."""
+        start = time.perf_counter()
+        if self.elegantrl:
+            import torch
+
+            with torch.no_grad():
+                action = self.model(torch.as_tensor(states, dtype=torch.float32)).numpy()
+            action = action * self.max_stock
+        else:
+            action = self.model.predict(self.adapter.adapt_batch(states), deterministic=True)[0]
+            action = self.scale(np.asarray(action, dtype=float), self.max_stock)
+        self.seconds += time.perf_counter() - start
+        self.calls += 1
+        self.decisions += len(states)
+        return np.asarray(action, dtype=float).reshape(len(states), -1)[:, :self.action_dim]
+
+
+def run_backtest(market, policy, schema, cash=100_000.0, cost=0.001, turbulence_thresh=30, min_action=10):
+    """
+    Replay every session of `market` in parallel.
+
+    Returns a dict with the equity curve (days, bars) and per-day cash, trades and costs.
+    """
+    from tutorials.utils.order_planner import plan_orders_batch
+
+    rows, valid = market.session_matrix()
+    days, steps = rows.shape
+    n = len(market.tickers)
+    cash = np.full(days, float(cash))
+    stocks = np.zeros((days, n))
+    stocks_cd = np.zeros((days, n))
+    equity = np.zeros((days, steps))
+    trades = np.zeros(days, dtype=np.int64)
+    costs = np.zeros(days)
+    states = schema.allocate(batch=days)
+
+    for s in range(steps):
+        active = valid[:, s]
+        r = np.where(active, rows[:, s], 0)
+        price = market.close[r]
+        turbulence = market.turbulence[r]
+        turbulent = turbulence >= turbulence_thresh
+        schema.write(states, cash, sigmoid_sign(turbulence, turbulence_thresh) * 2 ** -5, turbulent.astype(float),
+                     price, stocks, stocks_cd, market.tech[r])
+        action = policy.predict(states)
+        stocks_cd[active] += 1
+
+        # plan with the cash net of costs so fees cannot overdraw the account
+        sell, buy, _ = plan_orders_batch(action, stocks, price, cash / (1 + cost), min_action)
+        sell[turbulent] = stocks[turbulent].astype(np.int64)
+        buy[turbulent] = 0
+        sell[~active] = 0
+        buy[~active] = 0
+
+        traded = (sell + buy) > 0
+        notional = np.einsum("ij,ij->i", sell + buy, price)
+        cash += np.einsum("ij,ij->i", sell - buy, price) - cost * notional
+        stocks += buy - sell
+        stocks_cd[traded] = 0
+        trades += traded.sum(axis=1)
+        costs += cost * notional
+        equity[:, s] = np.where(active, cash + np.einsum("ij,ij->i", stocks, price),
+                                equity[:, s - 1] if s else cash)
+    return {"equity": equity, "valid": valid, "cash": cash, "trades": trades, "costs": costs}
+
+
+def summarize(result, initial_cash, policy, elapsed):
+    """Return, drawdown and cost statistics of a run_backtest result."""
+    equity = result["equity"] / initial_cash
+    daily = equity[:, -1] - 1 if equity.size else np.zeros(0)
+    # chain the days into one curve: each day starts from where the previous one ended
+    growth = np.concatenate([[1.0], np.cumprod(1 + daily)[:-1]]) if len(daily) else np.zeros(0)
+    curve = (equity * growth[:, None])[result["valid"]]
+    peak = np.maximum.accumulate(np.concatenate([[1.0], curve]))[1:]
+    std = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    return {
+        "days": int(len(daily)),
+        "decisions": int(result["valid"].sum()),
+        "total_return": float(np.prod(1 + daily) - 1) if len(daily) else 0.0,
+        "mean_daily_return": float(daily.mean()) if len(daily) else 0.0,
+        "worst_day": float(daily.min()) if len(daily) else 0.0,
+        "sharpe": float(daily.mean() / std * np.sqrt(252)) if std > 0 else 0.0,
+        "max_drawdown": float(((peak - curve) / peak).max()) if curve.size else 0.0,
+        "trades": int(result["trades"].sum()),
+        "costs": float(result["costs"].sum()),
+        "predict_us_per_decision": policy.seconds / max(policy.decisions, 1) * 1e6,
+        "predict_ms_per_batch": policy.seconds / max(policy.calls, 1) * 1e3,
+        "seconds": elapsed,
+    }
+
+
+def align_closes(timestamps, source_timestamps, close):
+    """The last close of a series at or before each timestamp (its first close before it starts)."""
+    if len(source_timestamps) == 0:
+        return None
+    rows = np.searchsorted(source_timestamps, timestamps, side="right") - 1
+    return np.asarray(close, dtype=float)[np.maximum(rows, 0)]
+
+
+def load_bars(config, period="test", bars_path=None, cache_dir=None, synthetic_days=None, warmup_days=5, seed=0):
+    """
+    Bars of the config's tickers for a period, starting `warmup_days` early so the indicators are warm.
+
+    Returns (bars, start, end, turbulence); start and end bound the traded sessions. turbulence
+    holds the TURBULENCE_SYMBOL close at every bar, or None when the source has no such bars
+    (synthetic bars, a bar file without the symbol) or the config computes it from returns.
+    """
+    import pandas as pd
+
+    from tutorials.utils.bar_cache import BarCache, config_dates
+    from tutorials.utils.broker_simulator import BarData, load_bar_file, synthetic_bars
+
+    tickers = config["training"]["ticker_list"]
+    start, end = config_dates(config, period)
+    if synthetic_days:
+        sessions = pd.bdate_range(start.tz_localize(None), periods=synthetic_days + warmup_days)
+        bars = synthetic_bars(tickers, n_bars=390 * len(sessions), seed=seed)
+        opens = np.array([pd.Timestamp(f"{day.date()} 09:30", tz=NY_TZ).value for day in sessions])
+        timestamps = (opens[:, None] + np.arange(390) * 60_000_000_000).ravel()
+        bars = BarData(tickers, timestamps, bars.open, bars.high, bars.low, bars.close, bars.volume)
+        first_day = pd.Timestamp(sessions[warmup_days].date(), tz="UTC")
+        return bars, first_day, pd.Timestamp(sessions[-1].date(), tz="UTC") + pd.Timedelta(days=1), None
+    use_symbol = config["trading"].get("turbulence_source", "vixy") != "returns"
+    if bars_path:
+        file_bars = load_bar_file(bars_path)
+        columns = [file_bars.index[ticker] for ticker in tickers]
+        bars = BarData(tickers, file_bars.timestamps, *[getattr(file_bars, field)[:, columns]
+                                                        for field in ["open", "high", "low", "close", "volume"]])
+        turbulence = None
+        if use_symbol and TURBULENCE_SYMBOL in file_bars.index:
+            turbulence = file_bars.close[:, file_bars.index[TURBULENCE_SYMBOL]].astype(float)
+        return bars, start, end, turbulence
+
+    import alpaca_trade_api as tradeapi
+
+    alpaca = config["alpaca"]
+    api = tradeapi.REST(alpaca["data_api_key"], alpaca["data_api_secret"], alpaca["data_api_base_url"], "v2")
+    cache = BarCache(cache_dir or os.path.join(ROOT_DIR, '.bar_cache'), api)
+    interval = config["training"]["time_interval"]
+    first = start - pd.Timedelta(days=warmup_days)
+    bars = cache.bar_data(tickers, interval, first, end)
+    turbulence = None
+    if use_symbol:
+        symbol = cache.get(TURBULENCE_SYMBOL, interval, first, end)
+        turbulence = align_closes(bars.timestamps, symbol.timestamps, symbol.close)
+    return bars, start, end, turbulence
+
+
+def prepare_market(config, bars):
+    """Market of a config from (bars, start, end, turbulence) of load_bars: indicators and turbulence included."""
+    from finrl.config import INDICATORS
+
+    trading = config["trading"]
+    bars, start, end, turbulence = bars
+    tech, turbulence = compute_features(bars, INDICATORS, trading.get("turbulence_source", "vixy"), turbulence,
+                                        turbulence_window=trading.get("turbulence_window", 252))
+    return Market(bars, tech, turbulence, start, end)
+
+
+def backtest(config_path, model_path, model_name=None, period="test", profile=None, model=None, cash=100_000.0,
+             cost=0.001, bars=None, bars_path=None, cache_dir=None, synthetic_days=None, market=None):
+    """
+    Backtest one saved model over its config's date range and return the summary dict.
+
+    Args:
+        config_path (str): Tutorial config.json.
+        model_path (str): Saved model; model_name is guessed from it when not given.
+        period (str): "test", "train" or "full_train" dates of the config.
+        profile (str): Key of PROFILES; guessed from the tutorial when not given.
+        model: Already loaded model, instead of loading model_path.
+        bars (tuple): (bars, start, end, turbulence) already loaded with load_bars, shared between models.
+        market (Market): Already prepared with prepare_market; skips loading bars and features.
+    """
+    from finrl.config import INDICATORS
+
+    from model_registry import ELEGANTRL, guess_model_name, load_model
+    from tutorials.utils.state_schema import StateSchema
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    trading = config["trading"]
+    model_name = (model_name or guess_model_name(model_path) or "PPO").upper()
+    profile = profile or default_profile(config_path)
+    schema = StateSchema.from_config(config, INDICATORS)
+    if model is None:
+        model = load_model(model_name, model_path)
+    policy = BatchPolicy(model, schema.size, schema.n_tickers, trading["max_stock"], profile,
+                         elegantrl=model_name == ELEGANTRL)
+
+    start_time = time.perf_counter()
+    if market is None:
+        market = prepare_market(config, bars or load_bars(config, period, bars_path, cache_dir, synthetic_days))
+    result = run_backtest(market, policy, schema, cash, cost, trading["turbulence_thresh"])
+    report = summarize(result, cash, policy, time.perf_counter() - start_time)
+    report.update({"model": model_name, "model_path": model_path, "profile": profile, "period": period})
+    return report
+
+
+def print_report(report):
+    print(f"{report['model']} {report['model_path']} ({report['profile']}, {report['period']})")
+    print(f"  days {report['days']}, decisions {report['decisions']}, trades {report['trades']}")
+    print(f"  total return {report['total_return']:+.2%}, mean daily {report['mean_daily_return']:+.3%}, "
+          f"worst day {report['worst_day']:+.2%}")
+    print(f"  sharpe {report['sharpe']:.2f}, max drawdown {report['max_drawdown']:.2%}, costs ${report['costs']:.2f}")
+    print(f"  predict {report['predict_us_per_decision']:.1f}us/decision "
+          f"({report['predict_ms_per_batch']:.2f}ms/batch), {report['seconds']:.2f}s total")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest a saved model over a config's date range.")
+    parser.add_argument("--config", required=True, help="Tutorial config.json.")
+    parser.add_argument("--model-path", required=True)
+    parser.add_argument("--model-name", help="A2C, PPO, DDPG, TD3, SAC or ELEGANTRL (guessed from the path).")
+    parser.add_argument("--period", default="test", choices=["train", "test", "full_train"])
+    parser.add_argument("--profile", choices=list(PROFILES), help="Action scaling (guessed from the tutorial).")
+    parser.add_argument("--cash", type=float, default=100_000.0, help="Starting cash of every day.")
+    parser.add_argument("--cost", type=float, default=0.001, help="Transaction cost per dollar traded.")
+    parser.add_argument("--bars", help="CSV or Parquet bar file to use instead of the bar cache.")
+    parser.add_argument("--cache-dir", help="Bar cache directory (default .bar_cache).")
+    parser.add_argument("--synthetic-days", type=int, help="Replay this many days of synthetic bars.")
+    parser.add_argument("--output", help="Write the report as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    report = backtest(args.config, args.model_path, args.model_name, args.period, args.profile, cash=args.cash,
+                      cost=args.cost, bars_path=args.bars, cache_dir=args.cache_dir,
+                      synthetic_days=args.synthetic_days)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+'''
+Benchmark of one trade() cycle, split into its stages.
+Each strategy profile runs LivePaperTradingAlpaca against a SimulatedBroker replaying
+synthetic bars, with a stub model in place of the trained one, for several universe
+sizes. Every stage is timed over many cycles (p50/p99), then measured again in a
+separate pass under tracemalloc so the allocation tracking does not skew the timings.
+
+    python main/benchmark_hot_path.py --tickers 5 30 100 500 --cycles 200
+    python main/benchmark_hot_path.py --output bench.json
+    python main/benchmark_hot_path.py --baseline bench.json --tolerance 1.25
+'''
+
+STAGES = ["state", "predict", "plan", "submit", "log"]
+DEFAULT_TICKERS = [5, 30, 100, 500]
+
+
+class Space:
+    def __init__(self, shape):
+        self.shape = shape
+
+
+class StubModel:
+    def __init__(self, action_dim, observation_shape, seed=0, unit_interval=False):
+        """
+        Stand-in for a trained policy: a fixed random linear map followed by tanh.
+
+        Args:
+            action_dim (int): Number of actions returned by predict().
+            observation_shape (tuple): Shape of observation_space.
+            seed (int): Seed of the projection weights.
+            unit_interval (bool): Return actions in [0, 1] (portfolio allocation models)
+                instead of [-1, 1].
+        """
+        self.action_dim = action_dim
+        self.observation_space = Space(observation_shape)
+        self.unit_interval = unit_interval
+        size = int(np.prod(observation_shape))
+        rng = np.random.default_rng(seed)
+        self.weights = rng.normal(0.0, 1.0, size=(action_dim, size)).astype(np.float32)
+
+    def predict(self, observation, *args, **kwargs):
+        observation = np.asarray(observation, dtype=np.float32)
+        if observation.ndim > len(self.observation_space.shape):
+            # a batch of observations, as SB3's predict accepts
+            action = np.tanh(observation.reshape(len(observation), -1) @ self.weights.T)
+        else:
+            action = np.tanh(self.weights @ observation.ravel())
+        if self.unit_interval:
+            action = (action + 1) / 2
+        return action, None
+
+
+def _stock_trading_predict(trader, state):
+    return trader.predict_action(state) * trader.max_stock
+
+
+def _stock_trading_log(trader, state, action, plan):
+    print(f"Current state: {state}")
+    print(f"Model predicted action: {action}")
+    for qty, ticker, side in plan.orders():
+        print(f"{side.upper()} {qty} {ticker} @ {trader.price[trader.stockUniverse.index(ticker)]} PENDING")
+
+
+def _allocation_predict(trader, state):
+    action = trader.model.predict(state)[0]
+    return ((action * 200) - 100)[:len(trader.stockUniverse)]
+
+
+def _allocation_log(trader, state, action, plan):
+    print(f"Current State Shape: {state.shape}")
+    print(f"Current State Values: {state}")
+    print(f"Scaled Action: {action}")
+    print(f"Cash: ${trader.cash:.2f}")
+    print(f"Current Stock Holdings: {trader.stocks}")
+    print(f"Current Stock Prices: {trader.price}")
+    print(f"Planned Orders: {plan.orders()}")
+
+
+# profile name -> (wrap model in ObservationReshapeWrapper, predict, log)
+# "stock_trading" mirrors the Fundamental / NeurIPS 2018 scripts, "portfolio_allocation"
+# the Explainable DRL scripts with their reshaping wrapper and [0, 1] action scaling.
+PROFILES = {
+    "stock_trading": (False, _stock_trading_predict, _stock_trading_log),
+    "portfolio_allocation": (True, _allocation_predict, _allocation_log),
+}
+
+
+def make_tickers(n):
+    return [f"T{i:03d}" for i in range(n)]
+
+
+def build_trader(profile, n_tickers, cycles, seed=0):
+    """Create a LivePaperTradingAlpaca with a stub model on a SimulatedBroker for one profile."""
+    from finrl.config import INDICATORS
+    from tutorials.utils.broker_simulator import SimulatedBroker, synthetic_bars
+    from tutorials.utils.indicators import IncrementalIndicatorEngine
+    from tutorials.utils.live_trading import LivePaperTradingAlpaca
+    from tutorials.utils.state_schema import StateSchema
+
+    wrap, _, _ = PROFILES[profile]
+    tickers = make_tickers(n_tickers)
+    warmup_bars = IncrementalIndicatorEngine(n_tickers, INDICATORS).warmup_bars + 5
+    bars = synthetic_bars(tickers, n_bars=warmup_bars + cycles + 5, seed=seed)
+    broker = SimulatedBroker(bars, cash=1e9, warmup_bars=warmup_bars)
+
+    action_dim = n_tickers
+    state_dim = StateSchema(n_tickers, len(INDICATORS)).size
+    if wrap:
+        # like the Explainable DRL models: a (rows, 16) observation the state is zero-padded into
+        from tutorials.utils.observation_wrapper import ObservationReshapeWrapper
+        model = StubModel(n_tickers, (-(-state_dim // 16), 16), seed=seed, unit_interval=True)
+        model = ObservationReshapeWrapper(model, state_dim, allow_padding=True)
+    else:
+        model = StubModel(n_tickers, (state_dim,), seed=seed)
+    trader = LivePaperTradingAlpaca(
+        ticker_list=tickers,
+        time_interval="1Min",
+        drl_lib="stable_baselines3",
+        agent="a2c",
+        cwd=None,
+        net_dim=[64, 64],
+        state_dim=state_dim,
+        action_dim=action_dim,
+        API_KEY="benchmark",
+        API_SECRET="benchmark",
+        API_BASE_URL="http://localhost",
+        tech_indicator_list=INDICATORS,
+        turbulence_thresh=1e9,
+        max_stock=100,
+        incremental_indicators=True,
+        model=model,
+        broker=broker,
+    )
+    return trader, broker
+
+
+def run_cycle(trader, profile, timings=None, allocations=None):
+    """Run one trade() cycle stage by stage, recording time (ns) and peak allocation (bytes) per stage."""
+    _, predict, log = PROFILES[profile]
+    values = {}
+
+    def stage(name, fn, *args):
+        if allocations is not None:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter_ns()
+        result = fn(*args)
+        elapsed = time.perf_counter_ns() - start
+        if timings is not None:
+            timings[name].append(elapsed)
+        if allocations is not None:
+            allocations[name].append(tracemalloc.get_traced_memory()[1] - start_memory)
+        values[name] = result
+        return result
+
+    state = stage("state", trader.get_state)
+    action = stage("predict", predict, trader, state)
+    trader.stocks_cd += 1
+    plan = stage("plan", trader.plan, action)
+    stage("submit", trader.execute_plan, plan)
+    stage("log", log, trader, state, action, plan)
+    return values
+
+
+def benchmark(profile, n_tickers, cycles=200, alloc_cycles=20, seed=0):
+    """
+    Benchmark one profile at one universe size.
+
+    Returns a dict of stage -> {p50_us, p99_us, mean_us, alloc_kib} plus the total cycle time.
+    """
+    trader, broker = build_trader(profile, n_tickers, cycles + alloc_cycles + 1, seed=seed)
+    timings = {name: [] for name in STAGES}
+    allocations = {name: [] for name in STAGES}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # the first cycle warms the indicators up from history; it is not measured
+        run_cycle(trader, profile)
+        broker.sleep(trader.time_interval)
+        for _ in range(cycles):
+            run_cycle(trader, profile, timings=timings)
+            broker.sleep(trader.time_interval)
+        tracemalloc.start()
+        try:
+            for _ in range(alloc_cycles):
+                run_cycle(trader, profile, allocations=allocations)
+                broker.sleep(trader.time_interval)
+        finally:
+            tracemalloc.stop()
+    trader.order_executor.close()
+
+    report = {}
+    for name in STAGES:
+        samples = np.asarray(timings[name], dtype=float) / 1e3
+        report[name] = {
+            "p50_us": float(np.percentile(samples, 50)),
+            "p99_us": float(np.percentile(samples, 99)),
+            "mean_us": float(samples.mean()),
+            "alloc_kib": float(np.median(allocations[name]) / 1024) if allocations[name] else 0.0,
+        }
+    total = np.sum([timings[name] for name in STAGES], axis=0) / 1e3
+    report["cycle"] = {
+        "p50_us": float(np.percentile(total, 50)),
+        "p99_us": float(np.percentile(total, 99)),
+        "mean_us": float(total.mean()),
+        "alloc_kib": float(sum(report[name]["alloc_kib"] for name in STAGES)),
+    }
+    report["api_calls_per_cycle"] = {
+        name: count / (cycles + alloc_cycles + 1) for name, count in sorted(broker.api_calls.items())
+    }
+    return report
+
+
+def print_report(results):
+    header = f"{'profile':<22}{'tickers':>8}  {'stage':<8}{'p50 us':>12}{'p99 us':>12}{'alloc KiB':>12}"
+    print(header)
+    print("-" * len(header))
+    for key, report in results.items():
+        profile, n_tickers = key.rsplit(":", 1)
+        for name in STAGES + ["cycle"]:
+            stats = report[name]
+            print(f"{profile:<22}{n_tickers:>8}  {name:<8}{stats['p50_us']:>12.1f}{stats['p99_us']:>12.1f}"
+                  f"{stats['alloc_kib']:>12.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of (key, stage, p50, baseline p50) for stages slower than tolerance x baseline."""
+    regressions = []
+    for key, report in results.items():
+        if key not in baseline:
+            continue
+        for name in STAGES + ["cycle"]:
+            current = report[name]["p50_us"]
+            previous = baseline[key][name]["p50_us"]
+            if current > previous * tolerance:
+                regressions.append((key, name, current, previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the per-cycle trading hot path.")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--tickers", nargs="+", type=int, default=DEFAULT_TICKERS)
+    parser.add_argument("--cycles", type=int, default=200, help="Timed cycles per run.")
+    parser.add_argument("--alloc-cycles", type=int, default=20, help="Cycles measured under tracemalloc.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as JSON to this path.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against.")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Fail when a stage's p50 exceeds the baseline by this factor.")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for profile in args.profiles:
+        for n_tickers in args.tickers:
+            print(f"Benchmarking {profile} with {n_tickers} tickers...")
+            results[f"{profile}:{n_tickers}"] = benchmark(profile, n_tickers, args.cycles, args.alloc_cycles, args.seed)
+    print()
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, name, current, previous in regressions:
+            print(f"REGRESSION {key} {name}: p50 {current:.1f}us vs baseline {previous:.1f}us")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
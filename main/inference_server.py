@@ -0,0 +1,189 @@
+import os
+import queue
+import time
+import uuid
+
+import numpy as np
+from model_registry import ELEGANTRL, discover_models, load_model
+
+'''
+Local inference service shared by all strategies on a host.
+Every model is loaded once in the server process, which owns the only torch thread pool.
+Strategies send observations through InferenceClient, whose predict() matches
+model.predict(), and the server groups the requests that arrive in the same tick by
+policy so each policy runs one batched forward pass per tick. Once loaded, the server
+reports each model's observation_space back to the clients, so a strategy can adapt its
+state to a served model as it would to a local one. Predictions are deterministic, as
+in LivePaperTradingAlpaca.predict_action.
+'''
+
+
+class BatchPolicy:
+    def __init__(self, model_name, model_path):
+        """Load a model once (inference policy only) and expose a batched predict."""
+        self.model_name = model_name.upper()
+        self.model_path = model_path
+        self.model = load_model(model_name, model_path)
+        self.is_actor = self.model_name == ELEGANTRL
+        self.observation_space = getattr(self.model, "observation_space", None)
+
+    def predict_batch(self, observations):
+        """Run one forward pass over a (batch, *obs_shape) array and return the actions."""
+        if self.is_actor:
+            import torch
+
+            with torch.no_grad():
+                tensor = torch.as_tensor(observations, dtype=torch.float32)
+                return self.model(tensor).numpy()
+        return self.model.predict(observations, deterministic=True)[0]
+
+
+def _serve(models, request_queue, response_queues, torch_threads, max_batch, batch_window, ready):
+    """Server process: load every model, report their observation spaces on `ready`, then answer requests forever."""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    policies = {key: BatchPolicy(model_name, model_path) for key, (model_name, model_path) in models.items()}
+    ready.put({key: policy.observation_space for key, policy in policies.items()})
+    print(f"Inference server loaded {len(policies)} models with {torch_threads} torch threads")
+
+    while True:
+        request = request_queue.get()
+        if request is None:
+            return
+        requests = [request]
+        deadline = time.time() + batch_window
+        while len(requests) < max_batch:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = request_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return
+            requests.append(request)
+
+        groups = {}
+        for client_id, request_id, key, observation in requests:
+            groups.setdefault(key, []).append((client_id, request_id, observation))
+        for key, group in groups.items():
+            try:
+                actions = policies[key].predict_batch(np.stack([observation for _, _, observation in group]))
+                for (client_id, request_id, _), action in zip(group, actions):
+                    response_queues[client_id].put((request_id, action, None))
+            except Exception as e:
+                for client_id, request_id, _ in group:
+                    response_queues[client_id].put((request_id, None, str(e)))
+
+
+class InferenceClient:
+    def __init__(self, key, client_id, request_queue, response_queue, timeout=30.0):
+        """
+        Send observations for one policy to the InferenceServer. Use it in place of a model.
+
+        observation_space is the served model's, filled in by InferenceServer.start() (None
+        before, and for models without one such as ElegantRL actors).
+        """
+        self.key = key
+        self.observation_space = None
+        self.client_id = client_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.timeout = timeout
+        self.pid = None
+        self.session = None
+        self.request_id = 0
+
+    def predict(self, observation, *args, **kwargs):
+        """Return (action, None) like stable_baselines3 model.predict."""
+        if self.pid != os.getpid():
+            # first request of this process: a restarted strategy must not match responses left in the
+            # queue for the process that used this client before it
+            self.pid, self.session, self.request_id = os.getpid(), uuid.uuid4().hex, 0
+        self.request_id += 1
+        request_id = (self.session, self.request_id)
+        self.request_queue.put((self.client_id, request_id, self.key, np.asarray(observation)))
+        while True:
+            response_id, action, error = self.response_queue.get(timeout=self.timeout)
+            if response_id == request_id:
+                break
+        if error is not None:
+            raise RuntimeError(f"Inference for {self.key} failed: {error}")
+        return action, None
+
+
+class InferenceServer:
+    def __init__(self, ctx, torch_threads=1, max_batch=64, batch_window=0.005):
+        """
+        Batched predict service running in its own process.
+
+        Args:
+            ctx: multiprocessing context used for the server process and queues.
+            torch_threads (int): Size of the single torch thread pool.
+            max_batch (int): Maximum number of requests served in one tick.
+            batch_window (float): Seconds to keep collecting requests after the first one.
+        """
+        self.ctx = ctx
+        self.torch_threads = torch_threads
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.models = {}
+        self.request_queue = ctx.Queue()
+        self.response_queues = {}
+        self.clients = []
+        self.process = None
+
+    def add_model(self, model_name, model_path):
+        """Register a model and return its key. The same file is only loaded once."""
+        key = f"{model_name.upper()}:{os.path.abspath(model_path)}"
+        self.models[key] = (model_name, model_path)
+        return key
+
+    def add_tutorial_models(self, tutorials_dir):
+        """Register every model found under the tutorial directories."""
+        return [self.add_model(model_name, model_path) for _, model_name, model_path in discover_models(tutorials_dir)]
+
+    def client(self, model_name, model_path):
+        """Create a client for a model. Must be called before start(), which sets its observation_space."""
+        key = self.add_model(model_name, model_path)
+        client_id = len(self.response_queues)
+        self.response_queues[client_id] = self.ctx.Queue()
+        client = InferenceClient(key, client_id, self.request_queue, self.response_queues[client_id])
+        self.clients.append(client)
+        return client
+
+    def start(self, timeout=300):
+        """Start the server process, wait until every model is loaded and give the clients their observation spaces."""
+        ready = self.ctx.Queue()
+        self.process = self.ctx.Process(
+            target=_serve,
+            args=(self.models, self.request_queue, self.response_queues, self.torch_threads,
+                  self.max_batch, self.batch_window, ready),
+            name="inference-server",
+            daemon=True,
+        )
+        self.process.start()
+        try:
+            spaces = ready.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError("Inference server did not finish loading models in time.")
+        for client in self.clients:
+            client.observation_space = spaces[client.key]
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def restart(self, timeout=300):
+        """Start a new server process after the previous one died; the clients keep their queues."""
+        if self.process is not None:
+            self.process.join(0)
+        self.start(timeout)
+
+    def stop(self):
+        """Ask the server to exit and wait for it."""
+        if self.process is not None:
+            self.request_queue.put(None)
+            self.process.join(10)
+            self.process = None
@@ -0,0 +1,258 @@
+import os
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+from tutorials.utils.indicators import IncrementalBarFeed, StaleBarError
+from tutorials.utils.metrics import metrics
+from tutorials.utils.turbulence import UniverseTurbulence
+
+'''
+Market data fan-out for strategies running in the same host.
+The hub fetches the union of every strategy's tickers once per bar and writes the
+latest prices, indicators and turbulence into a shared memory block. Each strategy
+attaches a subscriber to that block and slices out its own tickers, so N strategies
+cost one broker round-trip per bar instead of N.
+
+Shared block layout (float64): [seq, bar_time, turbulence, price[n], tech[n * k], universe_turbulence[m]]
+seq is odd while the hub is writing and even once a bar is published. bar_time is the
+start of the published bar in epoch seconds, so a subscriber can tell a fresh bar from
+the previous one (latest(min_bar_time=...)) when a fetch is late or has failed. When the hub
+computes turbulence from returns, it keeps one incremental covariance per distinct
+strategy universe, and each subscriber reads its universe's slot.
+'''
+
+HEADER_SIZE = 3
+# bar intervals a subscriber waits for the first bar before giving up (at least 60s, for the hub's warmup)
+FIRST_BAR_INTERVALS = 3
+
+
+class MarketDataHub:
+    def __init__(self, ticker_list, time_interval, tech_indicator_list, api, publish_delay=2.0, incremental=True,
+                 turbulence_universes=None, turbulence_window=252):
+        """
+        Fetch bars for the union of all strategy tickers and publish them to shared memory.
+
+        Args:
+            ticker_list (list): Union of tickers traded by the subscribing strategies.
+            time_interval (str): Bar interval passed to the data processor (e.g. "1Min").
+            tech_indicator_list (list): Indicators computed for every ticker.
+            api: Alpaca REST client used for fetching.
+            publish_delay (float): Seconds after the bar boundary to wait so the bar is complete.
+            incremental (bool): Update indicators from the latest bar only (IncrementalBarFeed)
+                instead of recomputing them from a fresh window every bar.
+            turbulence_universes (list): Ticker lists of strategies that take turbulence from
+                their own returns (UniverseTurbulence) instead of VIXY. Each distinct universe
+                is computed once per bar and published in its own slot.
+            turbulence_window (int): Rolling window of those turbulence indices, in bars.
+        """
+        self.ticker_list = list(dict.fromkeys(ticker_list))
+        self.time_interval = time_interval
+        self.tech_indicator_list = tech_indicator_list
+        self.api = api
+        self.publish_delay = publish_delay
+        self.interval_seconds = interval_to_seconds(time_interval)
+        self.turbulence = None
+        if turbulence_universes:
+            self.turbulence = UniverseTurbulence(self.ticker_list, turbulence_universes, window=turbulence_window)
+        self.feed = None
+        if incremental:
+            self.feed = IncrementalBarFeed(api, self.ticker_list, time_interval, tech_indicator_list,
+                                           turbulence_model=self.turbulence)
+
+        self.data_size = HEADER_SIZE + len(self.ticker_list) * (1 + len(tech_indicator_list))
+        size = self.data_size + (len(self.turbulence.universes) if self.turbulence is not None else 0)
+        self.shm = shared_memory.SharedMemory(create=True, size=size * 8)
+        self.buffer = np.ndarray((size,), dtype=np.float64, buffer=self.shm.buf)
+        self.buffer[:] = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.fetch_count = 0
+
+    def descriptor(self, tickers=None):
+        """
+        Return the picklable arguments a subscriber needs to attach to this hub.
+
+        Pass a strategy's tickers to read the turbulence computed for its universe.
+        """
+        slot = None
+        if tickers is not None and self.turbulence is not None:
+            slot = self.turbulence.slot(tickers)
+        timeout = max(FIRST_BAR_INTERVALS * self.interval_seconds, 60.0) + self.publish_delay
+        return (self.shm.name, self.ticker_list, len(self.tech_indicator_list), slot, timeout)
+
+    def fetch(self):
+        """Fetch the latest bar for the whole ticker union."""
+        self.fetch_count += 1
+        if self.feed is not None:
+            return self.feed.latest()
+
+        from finrl.meta.data_processors.processor_alpaca import AlpacaProcessor
+
+        processor = AlpacaProcessor(api=self.api)
+        price, tech, turbulence = processor.fetch_latest_data(
+            ticker_list=self.ticker_list,
+            time_interval=self.time_interval,
+            tech_indicator_list=self.tech_indicator_list,
+        )
+        return price, tech, turbulence
+
+    def bar_time(self, now=None):
+        """
+        Start of the bar just fetched, in epoch seconds.
+
+        The incremental feed knows the bar's own timestamp. The full-window path only gets
+        arrays, so it is taken to be the last bar completed at `now`.
+        """
+        if self.feed is not None and self.feed.bar_time is not None:
+            return self.feed.bar_time
+        now = time.time() if now is None else now
+        return (now // self.interval_seconds - 1) * self.interval_seconds
+
+    def publish(self, price, tech, turbulence, bar_time=None):
+        """Write one bar into shared memory using the seqlock protocol."""
+        n = len(self.ticker_list)
+        seq = self.buffer[0]
+        self.buffer[0] = seq + 1
+        self.buffer[1] = self.bar_time() if bar_time is None else bar_time
+        self.buffer[2] = float(np.asarray(turbulence, dtype=np.float64).ravel()[0])
+        self.buffer[HEADER_SIZE:HEADER_SIZE + n] = price
+        self.buffer[HEADER_SIZE + n:self.data_size] = np.asarray(tech, dtype=np.float64).ravel()
+        if self.turbulence is not None:
+            if self.feed is None:
+                # the feed updates the indices itself; the full-window path has only this bar
+                self.turbulence.update(price, self.buffer[1])
+            self.buffer[self.data_size:] = self.turbulence.values
+        self.buffer[0] = seq + 2
+
+    def next_bar_time(self, now=None):
+        """Return the next bar boundary after now, plus the publish delay."""
+        now = time.time() if now is None else now
+        return (now // self.interval_seconds + 1) * self.interval_seconds + self.publish_delay
+
+    def run(self):
+        """Fetch and publish once immediately, then once per bar until stopped."""
+        while not self._stop.is_set():
+            try:
+                price, tech, turbulence = self.fetch()
+                self.publish(price, tech, turbulence)
+            except Exception as e:
+                # the subscribers see the old bar_time and skip their cycles instead of trading on it
+                metrics.increment("market_data_fetch_failures")
+                print(f"Market data hub fetch failed, the last published bar stays stale: {e}")
+            self._stop.wait(max(0.0, self.next_bar_time() - time.time()))
+
+    def start(self):
+        """Run the fetch loop in a background thread."""
+        self._thread = threading.Thread(target=self.run, name="market-data-hub", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the fetch loop and release the shared memory block."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.buffer = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class MarketDataSubscriber:
+    def __init__(self, shm_name, ticker_list, n_indicators, turbulence_slot=None, timeout=180.0):
+        """
+        Read bars published by a MarketDataHub from another process.
+
+        Args:
+            shm_name (str): Name of the hub's shared memory block.
+            ticker_list (list): The hub's ticker union, in publishing order.
+            n_indicators (int): Number of indicators per ticker.
+            turbulence_slot (int): Universe turbulence slot to read instead of the VIXY turbulence.
+            timeout (float): Seconds latest() waits for the hub's first bar (the hub's descriptor
+                gives a few bar intervals).
+        """
+        self.ticker_list = list(ticker_list)
+        self.timeout = timeout
+        self.n_indicators = n_indicators
+        self.shm = shared_memory.SharedMemory(name=shm_name)
+        self.data_size = HEADER_SIZE + len(self.ticker_list) * (1 + n_indicators)
+        self.turbulence_index = 2 if turbulence_slot is None else self.data_size + turbulence_slot
+        size = max(self.data_size, self.turbulence_index + 1)
+        self.buffer = np.ndarray((size,), dtype=np.float64, buffer=self.shm.buf)
+        self._index_cache = {}
+        self.last_seq = 0
+
+    def _indices(self, tickers):
+        key = tuple(tickers)
+        if key not in self._index_cache:
+            self._index_cache[key] = np.array([self.ticker_list.index(t) for t in tickers])
+        return self._index_cache[key]
+
+    def snapshot(self):
+        """Return a consistent copy of the shared block, retrying while the hub writes."""
+        while True:
+            seq = self.buffer[0]
+            if seq % 2 == 0:
+                data = self.buffer.copy()
+                if self.buffer[0] == seq:
+                    return data
+            time.sleep(0.001)
+
+    def wait_for_bar(self, timeout=None):
+        """Block until a bar newer than the last one read is published. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.buffer[0] <= self.last_seq or self.buffer[0] % 2:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def latest(self, tickers, min_bar_time=None, timeout=0.0):
+        """
+        Return (price, tech, turbulence) for the given tickers from the latest published bar.
+
+        Waits for the first bar if nothing has been published yet.
+
+        Args:
+            min_bar_time (float): Oldest acceptable bar start, in epoch seconds. An older bar is
+                waited on for up to `timeout` seconds for the hub to publish a newer one.
+
+        Raises:
+            TimeoutError: If the hub publishes no bar within the subscriber's `timeout` seconds.
+            StaleBarError: If no bar starting at or after min_bar_time was published in time.
+        """
+        if self.last_seq == 0 and not self.wait_for_bar(self.timeout):
+            raise TimeoutError(f"No bar published by the market data hub within {self.timeout:g}s.")
+        data = self.snapshot()
+        if min_bar_time is not None:
+            deadline = time.time() + timeout
+            while data[1] < min_bar_time:
+                if time.time() >= deadline:
+                    raise StaleBarError(f"Hub's newest bar starts at {data[1]:.0f}, the cycle needs the bar "
+                                        f"at {min_bar_time:.0f}.")
+                self.last_seq = data[0]
+                self.wait_for_bar(deadline - time.time())
+                data = self.snapshot()
+        self.last_seq = data[0]
+        self.bar_time = data[1]
+        n = len(self.ticker_list)
+        idx = self._indices(tickers)
+        price = data[HEADER_SIZE:HEADER_SIZE + n][idx]
+        tech = data[HEADER_SIZE + n:self.data_size].reshape(n, self.n_indicators)[idx].ravel()
+        return price, tech, data[self.turbulence_index]
+
+    def close(self):
+        self.buffer = None
+        self.shm.close()
+
+
+def interval_to_seconds(time_interval):
+    """Convert an Alpaca interval string such as "1Min" or "5s" to seconds."""
+    units = {"s": 1, "Min": 60, "H": 3600, "D": 86400}
+    for unit, seconds in units.items():
+        if time_interval.endswith(unit):
+            return int(time_interval[:-len(unit)]) * seconds
+    raise ValueError(f"Time interval {time_interval} is not supported.")
@@ -0,0 +1,184 @@
+import hashlib
+import importlib
+import io
+import os
+import time
+import zipfile
+
+'''
+Lazy, algorithm-keyed model loading.
+Only the library for the requested algorithm is imported. For inference, the policy
+network of a stable_baselines3 zip is extracted once and cached on disk keyed by the
+zip's hash, so later starts load a small pickled policy instead of decompressing the
+zip and rebuilding the optimizer state.
+'''
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_DIR, '.model_cache')
+
+# model name -> (module, attribute); imported on first use only
+ALGORITHMS = {
+    "A2C": ("stable_baselines3", "A2C"),
+    "PPO": ("stable_baselines3", "PPO"),
+    "DDPG": ("stable_baselines3", "DDPG"),
+    "TD3": ("stable_baselines3", "TD3"),
+    "SAC": ("stable_baselines3", "SAC"),
+}
+ELEGANTRL = "ELEGANTRL"
+
+# seconds spent in the last load_model call, and whether it came from the cache
+last_load = {"seconds": 0.0, "cached": False}
+
+
+def get_algorithm(model_name):
+    """Import and return the algorithm class for a model name such as "A2C"."""
+    name = model_name.upper()
+    if name not in ALGORITHMS:
+        raise ValueError(f"Model {model_name} is not supported.")
+    module, attribute = ALGORITHMS[name]
+    return getattr(importlib.import_module(module), attribute)
+
+
+def guess_model_name(model_path):
+    """Infer the algorithm from a model file or directory name, e.g. trained_a2c.zip -> A2C."""
+    if os.path.basename(model_path) == "actor.pth":
+        return ELEGANTRL
+    lowered = model_path.lower()
+    for name in ALGORITHMS:
+        if name.lower() in os.path.basename(lowered) or f"agent_{name.lower()}" in lowered:
+            return name
+    return None
+
+
+def discover_models(tutorials_dir):
+    """
+    Find every saved model under the tutorial directories.
+
+    Returns a list of (tutorial_name, model_name, model_path) for SB3 zips, unzipped SB3
+    save directories (a folder with a "data" file) and ElegantRL actor.pth files.
+    """
+    found = []
+    for tutorial in sorted(os.listdir(tutorials_dir)):
+        tutorial_dir = os.path.join(tutorials_dir, tutorial)
+        if not os.path.isdir(tutorial_dir):
+            continue
+        for root, dirs, files in os.walk(tutorial_dir):
+            dirs.sort()
+            if "data" in files and "policy.pth" in files:
+                # unzipped SB3 save; skip the zip copy some of these folders also hold
+                found.append((tutorial, guess_model_name(root), root))
+                dirs[:] = []
+                continue
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if name.endswith(".zip") or name == "actor.pth":
+                    found.append((tutorial, guess_model_name(path), path))
+    return [entry for entry in found if entry[1] is not None]
+
+
+def _zip_directory(path):
+    """Pack an unzipped SB3 save directory into an in-memory zip that SB3 can load."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in sorted(os.listdir(path)):
+            if name != "model.zip":
+                archive.write(os.path.join(path, name), name)
+    buffer.seek(0)
+    return buffer
+
+
+def file_hash(model_path):
+    """Return the sha256 of a model file, or of every file in an unzipped save directory."""
+    digest = hashlib.sha256()
+    paths = [model_path]
+    if os.path.isdir(model_path):
+        paths = [os.path.join(model_path, name) for name in sorted(os.listdir(model_path)) if name != "model.zip"]
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_elegantrl_actor(model_path):
+    """Rebuild an ElegantRL actor (Linear/ReLU MLP with tanh output) from its state dict."""
+    import torch
+    from torch import nn
+
+    state_dict = torch.load(model_path, map_location="cpu")
+    if isinstance(state_dict, nn.Module):
+        return state_dict.eval()
+    layer_ids = sorted({int(key.split(".")[1]) for key in state_dict if key.startswith("net.") and key.endswith(".weight")})
+    layers = []
+    weights = {}
+    for i, layer_id in enumerate(layer_ids):
+        out_dim, in_dim = state_dict[f"net.{layer_id}.weight"].shape
+        weights[f"{len(layers)}.weight"] = state_dict[f"net.{layer_id}.weight"]
+        weights[f"{len(layers)}.bias"] = state_dict[f"net.{layer_id}.bias"]
+        layers.append(nn.Linear(in_dim, out_dim))
+        if i < len(layer_ids) - 1:
+            layers.append(nn.ReLU())
+    net = nn.Sequential(*layers)
+    net.load_state_dict(weights)
+    return nn.Sequential(net, nn.Tanh()).eval()
+
+
+def _load_full(model_name, model_path):
+    algorithm = get_algorithm(model_name)
+    source = _zip_directory(model_path) if os.path.isdir(model_path) else model_path
+    return algorithm.load(source, device="cpu")
+
+
+def _cache_path(model_name, model_path, cache_dir):
+    import stable_baselines3
+
+    key = f"{model_name.upper()}-{file_hash(model_path)[:16]}-sb3_{stable_baselines3.__version__}"
+    return os.path.join(cache_dir, f"{key}.policy.pt")
+
+
+def load_policy(model_name, model_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Load only the inference policy of a stable_baselines3 model, using the on-disk cache.
+
+    The returned policy has predict(), observation_space and action_space like the full
+    model, but no optimizer, replay buffer or training state.
+    """
+    import torch
+
+    path = _cache_path(model_name, model_path, cache_dir)
+    if os.path.exists(path):
+        return torch.load(path, map_location="cpu", weights_only=False), True
+
+    policy = _load_full(model_name, model_path).policy
+    policy.set_training_mode(False)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    torch.save(policy, tmp_path)
+    os.replace(tmp_path, path)
+    return policy, False
+
+
+def load_model(model_name, model_path, policy_only=True, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Load a model by algorithm name, importing only what that algorithm needs.
+
+    Args:
+        model_name (str): A2C, PPO, DDPG, TD3, SAC or ELEGANTRL.
+        model_path (str): SB3 zip, unzipped SB3 save directory or ElegantRL actor.pth.
+        policy_only (bool): Return the cached inference policy instead of the full SB3 model.
+            Use False when the model will be trained further.
+        cache_dir (str): Where extracted policies are cached.
+    """
+    start = time.perf_counter()
+    cached = False
+    if model_name.upper() == ELEGANTRL:
+        model = load_elegantrl_actor(model_path)
+    elif policy_only:
+        model, cached = load_policy(model_name, model_path, cache_dir)
+    else:
+        model = _load_full(model_name, model_path)
+    last_load["seconds"] = time.perf_counter() - start
+    last_load["cached"] = cached
+    source = "policy cache" if cached else model_path
+    print(f"Loaded {model_name} from {source} in {last_load['seconds']:.2f}s")
+    return model
@@ -1,11 +1,17 @@
+import os
 from paper_trading_manager import PaperTradingManager
 
 # Work in progress!
-# TODO: Fix bug with paths
 
-config_path = "/tutorials/FinRL_PortfolioAllocation_Explainable_DRL/config.json"
-model_path = "tutorials/FinRL_PortfolioAllocation_Explainable_DRL/models/trained_a2c.zip"
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+TUTORIAL_DIR = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_Explainable_DRL')
+config_path = os.path.join(TUTORIAL_DIR, 'config.json')
 
-manager = PaperTradingManager(config_path)
+# Each strategy is (config_path, model_name, model_path); they all run in one supervised pool.
+strategies = [
+    (config_path, "A2C", os.path.join(TUTORIAL_DIR, 'models/trained_a2c.zip')),
+    (config_path, "PPO", os.path.join(TUTORIAL_DIR, 'models/trained_ppo.zip')),
+]
 
-manager.start_paper_trading("A2C", model_path)
\ No newline at end of file
+if __name__ == "__main__":
+    PaperTradingManager.start_multi_strategy_trading(strategies)
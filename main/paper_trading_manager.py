@@ -1,11 +1,13 @@
 import json
 import os
-from stable_baselines3 import A2C, PPO, DDPG, TD3
-from finrl.meta.paper_trading.alpaca import PaperTradingAlpaca
-from finrl.config import INDICATORS
+import sys
+import time
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
 
 class PaperTradingManager:
     def __init__(self, config_path):
+        self.started_at = time.perf_counter()
         self.config_path = config_path
         self.config = self.load_config()
         self.setup_env()
@@ -17,6 +19,9 @@ class PaperTradingManager:
 
     def setup_env(self):
         """Set environment variables and API keys based on config."""
+        from finrl.config import INDICATORS
+        from tutorials.utils.state_schema import StateSchema
+
         self.DATA_API_KEY = self.config["alpaca"]["data_api_key"]
         self.DATA_API_SECRET = self.config["alpaca"]["data_api_secret"]
         self.DATA_API_BASE_URL = self.config["alpaca"]["data_api_base_url"]
@@ -26,28 +31,145 @@ class PaperTradingManager:
         self.ticker_list = self.config["training"]["ticker_list"]
         self.time_interval = self.config["training"]["time_interval"]
         self.net_dimension = self.config["training"]["net_dimension"]
-        self.state_dim = eval(self.config["training"]["state_dim_formula"].replace("action_dim", str(len(self.ticker_list))).replace("INDICATORS", "INDICATORS"))
+        self.state_schema = StateSchema.from_config(self.config, INDICATORS)
+        self.state_dim = self.state_schema.size
         self.action_dim = len(self.ticker_list)
+        # models whose observation is larger than the live state (zero-padded), e.g. Explainable DRL
+        self.allow_padding = self.config["trading"].get("allow_padding", False)
+
+    def load_model(self, model_name, model_path, policy_only=True):
+        """Load specified model, importing only the library its algorithm needs."""
+        from model_registry import load_model
+
+        return load_model(model_name, model_path, policy_only=policy_only)
+
+    @staticmethod
+    def watch_interval(value):
+        """
+        Seconds between model checks for a watch_model setting, or None when watching is off.
+
+        true/false (or yes/no, on/off) turn watching on with a 5s interval or off; a number is
+        the interval in seconds. Anything else, and intervals <= 0, raise ValueError.
+        """
+        if value is None or value is False:
+            return None
+        if value is True:
+            return 5.0
+        text = str(value).strip().lower()
+        if text in ("", "false", "no", "off"):
+            return None
+        if text in ("true", "yes", "on"):
+            return 5.0
+        try:
+            interval = float(text)
+        except ValueError:
+            raise ValueError(f"watch_model must be true, false or seconds between checks, not {value!r}.")
+        if not 0 < interval < float("inf"):
+            raise ValueError(f"watch_model interval must be positive seconds, not {value!r}.")
+        return interval
+
+    def model_watcher(self, model_name, model_path):
+        """
+        ModelWatcher reloading model_path when trading.watch_model is set in the config or
+        PAPER_TRADING_WATCH_MODEL in the environment (see watch_interval; the environment wins).
+        """
+        value = os.environ.get("PAPER_TRADING_WATCH_MODEL")
+        interval = self.watch_interval(value if value is not None else self.config["trading"].get("watch_model"))
+        if interval is None:
+            return None
+        from tutorials.utils.model_watcher import ModelWatcher
+
+        return ModelWatcher(model_path, lambda path: self.load_model(model_name, path), self.state_dim,
+                            self.action_dim, check_interval=interval, allow_padding=self.allow_padding)
+
+    def schedule(self, schedule=None):
+        """
+        BarScheduler settings for the trading loop: trading.schedule from the config, updated with
+        `schedule` (e.g. the slot assigned by the StrategyPool). None when trading.schedule is false.
+        """
+        settings = self.config["trading"].get("schedule", {})
+        if settings is False:
+            return None
+        return {**(settings if isinstance(settings, dict) else {}), **(schedule or {})}
+
+    def turbulence_model(self):
+        """
+        UniverseTurbulence over the config's tickers when trading.turbulence_source is "returns".
+
+        The default ("vixy") keeps FinRL's live behaviour of reading the VIXY close.
+        """
+        trading = self.config["trading"]
+        if trading.get("turbulence_source", "vixy") != "returns":
+            return None
+        from tutorials.utils.turbulence import UniverseTurbulence
+
+        return UniverseTurbulence(self.ticker_list, window=trading.get("turbulence_window", 252))
 
-    def load_model(self, model_name, model_path):
-        """Load specified model."""
-        if model_name == "A2C":
-            return A2C.load(model_path)
-        elif model_name == "PPO":
-            return PPO.load(model_path)
-        elif model_name == "DDPG":
-            return DDPG.load(model_path)
-        elif model_name == "TD3":
-            return TD3.load(model_path)
-        else:
-            raise ValueError(f"Model {model_name} is not supported.")
-
-    def start_paper_trading(self, model_name, model_path):
-        """Set up and run paper trading with the specified model."""
-        model = self.load_model(model_name, model_path)
-        print(f"{model_name} model loaded successfully!")
-
-        paper_trading = PaperTradingAlpaca(
+    def start_sentiment(self):
+        """
+        Start the live sentiment stream when the config trains with use_sentiment.
+
+        Reads the optional "sentiment" section: feeds (RSS URLs), keywords (per ticker),
+        feed_tickers (tickers per feed URL), half_life (seconds), processes, scorer
+        (textblob, lexicon or transformer), scorer_options and cache (SQLite path).
+        """
+        if self.state_schema.sentiment is None:
+            return None
+        from scraping.rss_feed_streamer import MultiFeedStreamer
+        from scraping.sentiment_scorer import CachedScorer, make_scorer
+        from scraping.sentiment_stream import SentimentStream
+
+        settings = self.config.get("sentiment", {})
+        scorer = make_scorer(settings.get("scorer", "textblob"), **settings.get("scorer_options", {}))
+        stream = SentimentStream(self.ticker_list, keywords=settings.get("keywords"),
+                                 feed_tickers=settings.get("feed_tickers"),
+                                 half_life=settings.get("half_life", 3600.0), score_fn=scorer,
+                                 processes=settings.get("processes", 2),
+                                 cache=CachedScorer(scorer, path=settings.get("cache")))
+        if settings.get("feeds"):
+            stream.follow(MultiFeedStreamer(settings["feeds"], check_interval=settings.get("check_interval", 60)))
+        return stream
+
+    def start_paper_trading(self, model_name, model_path, market_data=None, incremental_indicators=True, model=None,
+                            broker=None, sentiment=None, schedule=None):
+        """
+        Set up and run paper trading with the specified model.
+
+        Args:
+            model_name (str): Algorithm name (A2C, PPO, DDPG, TD3, SAC).
+            model_path (str): Path to the saved model.
+            market_data: Optional shared bar source (e.g. MarketDataSubscriber) used instead of
+                fetching bars from Alpaca in this process.
+            incremental_indicators (bool): Without market_data, update indicators from the latest
+                bar only instead of recomputing them from a full window every cycle.
+            model: Already loaded model or InferenceClient to predict with. Loaded from
+                model_path when None; only a model loaded here is hot swapped (see model_watcher).
+            broker: Stand-in for the Alpaca REST client, e.g. a SimulatedBroker replaying bars.
+                Falls back to PAPER_TRADING_BARS from the environment, then to Alpaca.
+            sentiment: Sentiment source appended to the state (see start_sentiment). Started
+                from the config when None and the config uses sentiment.
+            schedule (dict): BarScheduler.for_slot arguments, such as the slot and n_slots given to
+                each strategy of a pool, merged over trading.schedule from the config.
+        """
+        from finrl.config import INDICATORS
+        from tutorials.utils.live_trading import LivePaperTradingAlpaca
+        from tutorials.utils.metrics import configure_from_env, metrics
+
+        # one label per strategy so pooled strategies export distinguishable series
+        tutorial = os.path.basename(os.path.dirname(os.path.abspath(self.config_path)))
+        strategy = f"{tutorial}_{model_name.lower()}"
+        configure_from_env(labels={"strategy": strategy})
+
+        watcher = None
+        if model is None:
+            model = self.load_model(model_name, model_path)
+            print(f"{model_name} model loaded successfully!")
+            watcher = self.model_watcher(model_name, model_path)
+        started_sentiment = sentiment is None
+        if started_sentiment:
+            sentiment = self.start_sentiment()
+
+        paper_trading = LivePaperTradingAlpaca(
             ticker_list=self.ticker_list,
             time_interval=self.time_interval,
             drl_lib="stable_baselines3",
@@ -61,7 +183,45 @@ class PaperTradingManager:
             API_BASE_URL=self.TRADING_API_BASE_URL,
             tech_indicator_list=INDICATORS,
             turbulence_thresh=self.config["trading"]["turbulence_thresh"],
-            max_stock=self.config["trading"]["max_stock"]
+            max_stock=self.config["trading"]["max_stock"],
+            market_data=market_data,
+            incremental_indicators=incremental_indicators,
+            model=model,
+            broker=broker,
+            strategy=strategy,
+            sentiment=sentiment,
+            turbulence_model=self.turbulence_model() if market_data is None else None,
+            model_watcher=watcher,
+            schedule=self.schedule(schedule),
+            allow_padding=self.allow_padding
         )
+        startup = time.perf_counter() - self.started_at
+        metrics.set_gauge("startup_seconds", startup)
+        print(f"Startup took {startup:.2f}s")
 
         paper_trading.run()
+        if watcher is not None:
+            watcher.close()
+        if started_sentiment and sentiment is not None:
+            sentiment.close()
+
+    @staticmethod
+    def start_multi_strategy_trading(strategies, max_restarts=3, status_interval=60, share_market_data=True,
+                                     inference_server=False):
+        """
+        Run several strategies concurrently in one supervised process pool.
+
+        Args:
+            strategies (list): (config_path, model_name, model_path) tuples or StrategySpec objects.
+            max_restarts (int): How many times a crashed strategy is restarted.
+            status_interval (float): Seconds between aggregated status prints.
+            share_market_data (bool): Fetch bars once per interval for all strategies through a
+                MarketDataHub instead of once per strategy.
+            inference_server (bool): Load each model once in a shared InferenceServer process
+                that batches predictions from all strategies.
+        """
+        from strategy_pool import StrategyPool
+
+        pool = StrategyPool(strategies, max_restarts=max_restarts, status_interval=status_interval,
+                            share_market_data=share_market_data, inference_server=inference_server)
+        return pool.run()
@@ -0,0 +1,262 @@
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+'''
+Retrain a tutorial's model on many environments in parallel.
+The train (or full_train) bars of the config are read through the bar cache, and the
+indicators and turbulence are computed once with the same code the live feed and the
+backtester use. The range is then split into one contiguous chunk per environment.
+Every chunk runs FinRL's numpy StockTradingEnv in its own process behind SB3's
+SubprocVecEnv, so a rollout steps all environments at once across the cores. The
+processes are forked, so the feature arrays are shared copy-on-write, not pickled.
+
+Checkpoints go straight to the file the tutorial's scripts load for the algorithm
+(read from their MODEL_PATH, e.g. models/a2c_model.zip in NeurIPS 2018), or to
+models/trained_{algo}.zip when no script loads one. Each one is written beside the
+target and renamed over it, so a trader reloading the file never sees half a model.
+
+The models are trained under StockTradingEnv's convention: actions in [-1, 1] scaled by
+max_stock. The portfolio allocation scripts (Explainable DRL) read [0, 1] weights from a
+padded observation instead, so for those tutorials there is no default output and
+--output must name a new file.
+
+    python main/retrain.py --config tutorials/FinRL_StockTrading_Fundamental/config.json --model-name PPO
+    python main/retrain.py --config ... --model-name SAC --envs 16 --resume --evaluate
+'''
+
+# Shaped after ERL_PARAMS of the demo script; net_dimension, target_step and break_step come from the config.
+# The learning rate is not the demo's 3e-6: that value is tuned for ElegantRL's PPO, while SB3's Adam at 3e-6 barely
+# moves the policy within a nightly break_step budget. 3e-4 is SB3's default for PPO and SAC.
+TRAIN_PARAMS = {
+    "learning_rate": 3e-4,
+    "batch_size": 2048,
+    "gamma": 0.985,
+    "seed": 312,
+}
+
+ON_POLICY = {"A2C", "PPO"}
+
+
+def scripted_model_paths(tutorial_dir):
+    """Absolute model paths assigned to MODEL_PATH in the tutorial's scripts."""
+    paths = []
+    for script in sorted(glob.glob(os.path.join(tutorial_dir, "scripts", "*.py"))):
+        with open(script, 'r') as f:
+            for match in re.finditer(r"^MODEL_PATH\s*=.*?['\"](tutorials/[^'\"]+)['\"]", f.read(), re.MULTILINE):
+                paths.append(os.path.join(ROOT_DIR, match.group(1)))
+    return paths
+
+
+def model_file(config_path, model_name):
+    """
+    Default output for an algorithm: the file the tutorial's scripts load it from, else
+    {tutorial}/models/trained_{name}.zip.
+
+    Raises:
+        ValueError: For portfolio allocation tutorials, whose scripts expect another action convention.
+    """
+    from backtester import default_profile
+    from model_registry import guess_model_name
+
+    if default_profile(config_path) == "portfolio_allocation":
+        raise ValueError(f"{config_path} trades [0, 1] portfolio weights, but retraining produces StockTradingEnv "
+                         f"models; pass an explicit output path that no allocation script loads.")
+    tutorial_dir = os.path.dirname(os.path.abspath(config_path))
+    for path in scripted_model_paths(tutorial_dir):
+        if path.endswith(".zip") and guess_model_name(path) == model_name.upper():
+            return path
+    return os.path.join(tutorial_dir, "models", f"trained_{model_name.lower()}.zip")
+
+
+def save_atomic(model, path):
+    """Save an SB3 model to path through a temporary file and a rename."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.zip"
+    model.save(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def env_arrays(config, bars):
+    """price_array, tech_array and turbulence_array for StockTradingEnv from (bars, start, end, turbulence)."""
+    from finrl.config import INDICATORS
+
+    from backtester import compute_features
+
+    trading = config["trading"]
+    bars, start, end, turbulence = bars
+    tech, turbulence = compute_features(bars, INDICATORS, trading.get("turbulence_source", "vixy"), turbulence,
+                                        turbulence_window=trading.get("turbulence_window", 252))
+    # drop the warmup bars before start, whose indicators are not warm yet
+    first = int(np.searchsorted(bars.timestamps, start.value))
+    last = int(np.searchsorted(bars.timestamps, end.value, side="right"))
+    return bars.close[first:last], tech[first:last].reshape(last - first, -1), turbulence[first:last]
+
+
+def split_chunks(length, n_chunks, min_length=390):
+    """(start, stop) row ranges splitting length rows into up to n_chunks contiguous chunks of min_length or more."""
+    n_chunks = max(1, min(n_chunks, length // min_length))
+    bounds = np.linspace(0, length, n_chunks + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def make_env_fn(price, tech, turbulence, trading, seed):
+    """Factory building one StockTradingEnv over a chunk, for SubprocVecEnv."""
+    def make_env():
+        from finrl.meta.env_stock_trading.env_stocktrading_np import StockTradingEnv
+
+        env = StockTradingEnv(
+            config={"price_array": price, "tech_array": tech, "turbulence_array": turbulence, "if_train": True},
+            turbulence_thresh=trading["turbulence_thresh"],
+            max_stock=trading["max_stock"],
+        )
+        env.reset(seed=seed)
+        return env
+
+    return make_env
+
+
+def _checkpoint_callback(path, every):
+    """SB3 callback saving the model atomically to path every `every` environment steps."""
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class AtomicCheckpoint(BaseCallback):
+        def __init__(self):
+            super().__init__()
+            self.last = 0
+
+        def _on_step(self):
+            if self.num_timesteps - self.last >= every:
+                self.last = self.num_timesteps
+                save_atomic(self.model, path)
+                print(f"Checkpoint at {self.num_timesteps} steps written to {path}")
+            return True
+
+    return AtomicCheckpoint()
+
+
+def build_model(model_name, vec_env, params, net_dimension, target_step, resume_path=None):
+    """New SB3 model with the TRAIN_PARAMS settings, or the model at resume_path attached to vec_env."""
+    from model_registry import get_algorithm
+
+    n_envs = vec_env.num_envs
+    if resume_path and os.path.exists(resume_path):
+        # load(env=...) rebuilds the rollout buffers for vec_env; set_env would require the saved env count
+        return get_algorithm(model_name).load(resume_path, env=vec_env, device="cpu")
+    kwargs = {
+        "learning_rate": params["learning_rate"],
+        "gamma": params["gamma"],
+        "seed": params["seed"],
+        "policy_kwargs": {"net_arch": list(net_dimension)},
+        "device": "cpu",
+        "verbose": 1,
+    }
+    if model_name in ON_POLICY:
+        # target_step is the rollout size over all environments, as in ElegantRL
+        kwargs["n_steps"] = max(target_step // n_envs, 8)
+        if model_name == "PPO":
+            rollout = kwargs["n_steps"] * n_envs
+            kwargs["batch_size"] = min(params["batch_size"], rollout)
+    else:
+        kwargs["batch_size"] = params["batch_size"]
+    return get_algorithm(model_name)("MlpPolicy", vec_env, **kwargs)
+
+
+def retrain(config_path, model_name, period="train", envs=None, break_step=None, checkpoint_steps=None,
+            resume=False, output=None, bars_path=None, cache_dir=None, params=None):
+    """
+    Train model_name on the config's data with `envs` parallel environments.
+
+    Args:
+        config_path (str): Tutorial config.json.
+        model_name (str): A2C, PPO, DDPG, TD3 or SAC.
+        period (str): "train" or "full_train" dates of the config.
+        envs (int): Parallel environments (default: one per core).
+        break_step (int): Total environment steps (default: the config's break_step).
+        checkpoint_steps (int): Steps between checkpoints (default: the config's target_step).
+        resume (bool): Continue training the model already at the output path.
+        output (str): Model path (default: model_file(config_path, model_name); required for
+            portfolio allocation tutorials).
+        params (dict): Overrides of TRAIN_PARAMS.
+
+    Returns:
+        str: Path of the saved model.
+    """
+    import torch
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+
+    from backtester import load_bars
+
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    training = config["training"]
+    model_name = model_name.upper()
+    params = {**TRAIN_PARAMS, **(params or {})}
+    envs = envs or os.cpu_count() or 1
+    break_step = break_step or training["break_step"]
+    checkpoint_steps = checkpoint_steps or training["target_step"]
+    output = output or model_file(config_path, model_name)
+
+    start = time.perf_counter()
+    price, tech, turbulence = env_arrays(config, load_bars(config, period, bars_path, cache_dir))
+    chunks = split_chunks(len(price), envs)
+    print(f"{len(price)} bars of {price.shape[1]} tickers in {len(chunks)} environments "
+          f"({time.perf_counter() - start:.1f}s to load)")
+    env_fns = [make_env_fn(price[a:b], tech[a:b], turbulence[a:b], config["trading"], params["seed"] + i)
+               for i, (a, b) in enumerate(chunks)]
+    vec_env = SubprocVecEnv(env_fns, start_method="fork")
+    # the environments step in their own processes; the learner keeps one thread per core it is left
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // 4))
+    try:
+        model = build_model(model_name, vec_env, params, training["net_dimension"], training["target_step"],
+                            output if resume else None)
+        model.learn(total_timesteps=break_step, callback=_checkpoint_callback(output, checkpoint_steps),
+                    reset_num_timesteps=not resume)
+        save_atomic(model, output)
+    finally:
+        vec_env.close()
+    print(f"Trained {model_name} for {break_step} steps in {time.perf_counter() - start:.1f}s, saved to {output}")
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Retrain a tutorial model on parallel environments.")
+    parser.add_argument("--config", required=True, help="Tutorial config.json.")
+    parser.add_argument("--model-name", required=True, choices=["A2C", "PPO", "DDPG", "TD3", "SAC"],
+                        type=str.upper)
+    parser.add_argument("--period", default="train", choices=["train", "full_train"])
+    parser.add_argument("--envs", type=int, help="Parallel environments (default: one per core).")
+    parser.add_argument("--break-step", type=int, help="Total environment steps (default: config break_step).")
+    parser.add_argument("--checkpoint-steps", type=int, help="Steps between checkpoints (default: target_step).")
+    parser.add_argument("--resume", action="store_true", help="Continue training the saved model.")
+    parser.add_argument("--output", help="Model path (default: the file the tutorial's scripts load, else "
+                                         "models/trained_{name}.zip; required for portfolio allocation).")
+    parser.add_argument("--bars", help="CSV or Parquet bar file to use instead of the bar cache.")
+    parser.add_argument("--cache-dir", help="Bar cache directory (default .bar_cache).")
+    parser.add_argument("--learning-rate", type=float)
+    parser.add_argument("--batch-size", type=int)
+    parser.add_argument("--gamma", type=float)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--evaluate", action="store_true", help="Backtest the new model on the test dates.")
+    args = parser.parse_args(argv)
+
+    params = {key: getattr(args, key) for key in TRAIN_PARAMS if getattr(args, key) is not None}
+    path = retrain(args.config, args.model_name, args.period, args.envs, args.break_step, args.checkpoint_steps,
+                   args.resume, args.output, args.bars, args.cache_dir, params)
+    if args.evaluate:
+        from backtester import backtest, print_report
+
+        print_report(backtest(args.config, path, args.model_name, bars_path=args.bars, cache_dir=args.cache_dir))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
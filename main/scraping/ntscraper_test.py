@@ -1,4 +1,5 @@
 from ntscraper import Nitter
+from post_store import PostStore, post_from_tweet
 
 '''
 Nitter is a scaping library. 
@@ -20,29 +21,7 @@ print(tweets_data['tweets'][0])
 profile_info = scraper.get_profile_info(username='elonmusk')
 print(profile_info)
 
-# Creating a dictionary to store the tweet data
-data = {
-    'link': [],
-    'text': [],
-    'user': [],
-    'likes': [],
-    'retweets': [],
-    'comments': []
-}
-
-# Extracting data from tweets
-for tweet in tweets_data['tweets']:
-    data['link'].append(tweet['link'])
-    data['text'].append(tweet['text'])
-    data['user'].append(tweet['user']['name'])
-    data['likes'].append(tweet['stats']['likes'])
-    data['retweets'].append(tweet['stats']['retweets'])
-    data['comments'].append(tweet['stats']['comments'])
-
-# Creating a DataFrame and saving to CSV
-import pandas as pd
-df = pd.DataFrame(data)
-df.to_csv('main/scraping/results/musk.csv', index=False)
-print("Tweets saved to musk.csv")
-
-
+# Adding new tweets to the post store and refreshing the stats of tweets scraped before
+store = PostStore('main/scraping/results/posts.sqlite')
+new_posts = store.upsert([post_from_tweet(tweet) for tweet in tweets_data['tweets']])
+print(f"{new_posts} new tweets saved to posts.sqlite ({len(store)} stored)")
@@ -0,0 +1,139 @@
+import sqlite3
+import time
+
+import pandas as pd
+
+'''
+Incremental store of scraped posts.
+Posts are keyed by their link. A run inserts only posts that are new and updates the
+engagement stats (likes, retweets, comments) of posts seen before in place. Scraping
+again therefore costs as much as the new data, not the whole history.
+The created_at and (username, created_at) indices make time-range and per-user queries
+index scans, not full-table reads.
+'''
+
+COLUMNS = ["link", "text", "user", "username", "created_at", "likes", "retweets", "comments"]
+
+
+def parse_nitter_date(value):
+    """Epoch seconds from a Nitter date such as "Nov 5, 2024 · 2:01 AM UTC" (None when missing)."""
+    if not value:
+        return None
+    timestamp = pd.to_datetime(str(value).replace("·", ""), utc=True, errors="coerce")
+    return None if pd.isna(timestamp) else timestamp.timestamp()
+
+
+def post_from_tweet(tweet):
+    """Row for one tweet returned by ntscraper's Nitter.get_tweets."""
+    return {
+        "link": tweet["link"],
+        "text": tweet["text"],
+        "user": tweet["user"]["name"],
+        "username": tweet["user"].get("username", "").lstrip("@") or None,
+        "created_at": parse_nitter_date(tweet.get("date")),
+        "likes": tweet["stats"]["likes"],
+        "retweets": tweet["stats"]["retweets"],
+        "comments": tweet["stats"]["comments"],
+    }
+
+
+class PostStore:
+    def __init__(self, path):
+        """
+        SQLite store of scraped posts.
+
+        Args:
+            path (str): Database file, created on first use.
+        """
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS posts ("
+                "link TEXT PRIMARY KEY, text TEXT, user TEXT, username TEXT, created_at REAL, "
+                "likes INTEGER, retweets INTEGER, comments INTEGER, first_seen REAL, last_seen REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS posts_created_at ON posts (created_at)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS posts_username ON posts (username, created_at)")
+
+    def upsert(self, posts, seen_at=None):
+        """
+        Insert new posts and refresh the stats of known ones.
+
+        Args:
+            posts (list): Dicts with the COLUMNS keys (missing keys are stored as NULL).
+            seen_at (float): Scrape time, epoch seconds. Defaults to now.
+
+        Returns:
+            int: Number of posts that were new.
+        """
+        seen_at = time.time() if seen_at is None else seen_at
+        rows = {post["link"]: post for post in posts}
+        links = list(rows)
+        known = set()
+        for start in range(0, len(links), 500):
+            chunk = links[start:start + 500]
+            known.update(link for (link,) in self.connection.execute(
+                f"SELECT link FROM posts WHERE link IN ({','.join('?' * len(chunk))})", chunk))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO posts (link, text, user, username, created_at, likes, retweets, comments, "
+                "first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET likes = excluded.likes, retweets = excluded.retweets, "
+                "comments = excluded.comments, last_seen = excluded.last_seen, "
+                "created_at = COALESCE(posts.created_at, excluded.created_at)",
+                [tuple(post.get(column) for column in COLUMNS) + (seen_at, seen_at) for post in rows.values()],
+            )
+        return len(links) - len(known)
+
+    def query(self, start=None, end=None, username=None, limit=None):
+        """
+        Posts as a DataFrame, newest first.
+
+        Args:
+            start, end: Optional created_at bounds (anything pd.Timestamp accepts, or epoch seconds);
+                start is inclusive, end exclusive.
+            username (str): Only posts of this user.
+            limit (int): Maximum number of posts.
+        """
+        clauses, params = [], []
+        if username is not None:
+            clauses.append("username = ?")
+            params.append(username.lstrip("@"))
+        if start is not None:
+            clauses.append("created_at >= ?")
+            params.append(_epoch(start))
+        if end is not None:
+            clauses.append("created_at < ?")
+            params.append(_epoch(end))
+        sql = "SELECT * FROM posts"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def import_csv(self, path, username=None):
+        """Load a CSV written by the old scraper (link, text, user, likes, retweets, comments)."""
+        df = pd.read_csv(path)
+        if username is not None:
+            df["username"] = username
+        return self.upsert(df.astype(object).where(df.notna(), None).to_dict("records"))
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+
+def _epoch(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return timestamp.timestamp()
@@ -1,45 +1,267 @@
-import feedparser
+import collections
+import queue
+import sys
 import time
+import urllib.error
+import urllib.request
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import feedparser
 
 '''
 This file streams the output from RSS feeds.
 I made the RSS streams on https://rss.app/.
 This may be our best option for real-time social media post streaming.
 rss.app supports Reddit, facebook, LinkedIn and other integrations.
+
+MultiFeedStreamer polls many feeds at once from a thread pool, so one slow feed only
+holds up its own worker. Each request sends the feed's ETag / Last-Modified, so an
+unchanged feed costs a 304 and no parsing. Seen entry ids are kept only for a time
+window, so memory stays bounded however long the streamer runs.
 '''
 
-class RSSFeedStreamer:
-    def __init__(self, feed_url, check_interval=60):
-        self.feed_url = feed_url
+
+class SeenSet:
+    def __init__(self, window=2 * 24 * 3600, max_items=1_000_000):
+        """
+        Set of entry ids that forgets ids after `window` seconds.
+
+        Args:
+            window (float): Seconds an id is remembered. Feeds only repeat recent entries,
+                so this only needs to cover how far back a feed goes.
+            max_items (int): Hard cap; the oldest ids are dropped first beyond it.
+        """
+        self.window = window
+        self.max_items = max_items
+        self.items = collections.OrderedDict()
+
+    def add(self, key, now=None):
+        """
+        Add an id and return True if it was not seen within the window.
+
+        Seeing a known id again restarts its window, so an entry that stays in a feed
+        longer than the window is not reported again once it would have expired.
+        """
+        now = time.time() if now is None else now
+        self.prune(now)
+        if key in self.items:
+            self.items[key] = now
+            self.items.move_to_end(key)
+            return False
+        self.items[key] = now
+        if len(self.items) > self.max_items:
+            self.items.popitem(last=False)
+        return True
+
+    def prune(self, now=None):
+        now = time.time() if now is None else now
+        cutoff = now - self.window
+        while self.items:
+            key, seen_at = next(iter(self.items.items()))
+            if seen_at >= cutoff:
+                break
+            self.items.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+class FeedState:
+    def __init__(self, url, next_check=0.0):
+        """Conditional GET validators and schedule of one feed."""
+        self.url = url
+        self.etag = None
+        self.modified = None
+        self.next_check = next_check
+        self.in_flight = False
+        self.failures = 0
+        self.not_modified = 0
+        self.fetched = 0
+
+
+def fetch(feed, timeout=20.0, user_agent="FinRL-Paper-Trading RSS"):
+    """
+    Fetch one feed with a conditional GET.
+
+    Returns the parsed feed, or None when the server answered 304 Not Modified.
+    Updates the feed's ETag / Last-Modified from the response.
+    """
+    headers = {"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"}
+    if feed.etag:
+        headers["If-None-Match"] = feed.etag
+    if feed.modified:
+        headers["If-Modified-Since"] = feed.modified
+    request = urllib.request.Request(feed.url, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = response.read()
+            response_headers = {key.lower(): value for key, value in response.headers.items()}
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise
+    # feedparser does not decompress a body passed as bytes, so undo the Content-Encoding here
+    body = decode_body(body, response_headers.get("content-encoding"))
+    response_headers.pop("content-encoding", None)
+    parsed = feedparser.parse(body, response_headers=response_headers)
+    # keep the validators only once the body was read, so a failed parse is fetched again in full
+    feed.etag = response_headers.get("etag", feed.etag)
+    feed.modified = response_headers.get("last-modified", feed.modified)
+    return parsed
+
+
+def decode_body(body, content_encoding=None):
+    """Decompress a gzip or deflate (zlib or raw) response body; other bodies are returned as is."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # some servers send raw deflate without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def entry_id(entry):
+    return entry.get("id") or entry.get("link") or entry.get("title")
+
+
+def print_entry(feed_url, entry):
+    print(f"Title: {entry.get('title')}")
+    print(f"Link: {entry.get('link')}")
+    print(f"Published: {entry.get('published')}")
+    print("----")
+
+
+class MultiFeedStreamer:
+    def __init__(self, feed_urls, check_interval=60, max_workers=16, timeout=20.0, seen_window=2 * 24 * 3600,
+                 max_backoff=16):
+        """
+        Poll many RSS feeds concurrently and report entries not seen before.
+
+        Args:
+            feed_urls (list): Feed URLs, e.g. rss.app feeds.
+            check_interval (float): Seconds between polls of the same feed.
+            max_workers (int): Feeds fetched at the same time.
+            timeout (float): Socket timeout of one fetch.
+            seen_window (float): Seconds an entry id is remembered for deduplication.
+            max_backoff (int): Cap on the interval multiplier applied to failing feeds.
+        """
         self.check_interval = check_interval
-        self.seen_entries = set()
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        now = time.time()
+        # spread the first polls over one interval so hundreds of feeds do not fire at once
+        self.feeds = [
+            FeedState(url, now + check_interval * i / max(len(feed_urls), 1))
+            for i, url in enumerate(dict.fromkeys(feed_urls))
+        ]
+        self.seen = SeenSet(window=seen_window)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rss")
+        self.results = queue.Queue()
 
-    def fetch_feed(self):
-        """Fetch the RSS feed and return new entries."""
-        feed = feedparser.parse(self.feed_url)
+    def _fetch(self, feed):
+        try:
+            self.results.put((feed, fetch(feed, self.timeout), None))
+        except Exception as e:
+            self.results.put((feed, None, e))
+
+    def submit_due(self, now=None):
+        """Start fetching every feed that is due and not already being fetched."""
+        now = time.time() if now is None else now
+        submitted = 0
+        for feed in self.feeds:
+            if not feed.in_flight and feed.next_check <= now:
+                feed.in_flight = True
+                self.executor.submit(self._fetch, feed)
+                submitted += 1
+        return submitted
+
+    def collect(self, timeout=1.0):
+        """
+        Handle fetches that finished within `timeout` seconds.
+
+        Returns a list of (feed_url, entry) for entries not seen before.
+        """
         new_entries = []
-        
-        for entry in feed.entries:
-            if entry.id not in self.seen_entries:
-                self.seen_entries.add(entry.id)
-                new_entries.append(entry)
-        
+        deadline = time.time() + timeout
+        while True:
+            try:
+                feed, parsed, error = self.results.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            feed.in_flight = False
+            now = time.time()
+            if error is not None:
+                feed.failures += 1
+                backoff = min(2 ** feed.failures, self.max_backoff)
+                feed.next_check = now + self.check_interval * backoff
+                print(f"Fetching {feed.url} failed ({feed.failures} in a row): {error}")
+                continue
+            feed.failures = 0
+            feed.next_check = now + self.check_interval
+            if parsed is None:
+                feed.not_modified += 1
+                continue
+            feed.fetched += 1
+            for entry in parsed.entries:
+                key = entry_id(entry)
+                if key is not None and self.seen.add(key, now):
+                    new_entries.append((feed.url, entry))
         return new_entries
 
-    def stream(self):
-        """Continuously fetch the RSS feed at intervals and print new entries."""
-        print("Starting RSS feed stream...")
+    def poll_once(self, timeout=None):
+        """Fetch every feed once and return the new entries (used for one-off runs)."""
+        for feed in self.feeds:
+            feed.next_check = 0.0
+        self.submit_due()
+        new_entries = []
+        deadline = None if timeout is None else time.time() + timeout
+        while any(feed.in_flight for feed in self.feeds):
+            if deadline is not None and time.time() >= deadline:
+                break
+            new_entries.extend(self.collect(timeout=0.5))
+        return new_entries
+
+    def stream(self, handler=print_entry, tick=1.0):
+        """Continuously poll the feeds and call handler(feed_url, entry) for every new entry."""
+        print(f"Starting RSS feed stream over {len(self.feeds)} feeds...")
         while True:
-            new_entries = self.fetch_feed()
-            for entry in new_entries:
-                print(f"Title: {entry.title}")
-                print(f"Link: {entry.link}")
-                print(f"Published: {entry.published}")
-                print("----")
+            self.submit_due()
+            for feed_url, entry in self.collect(timeout=tick):
+                handler(feed_url, entry)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+
+class RSSFeedStreamer(MultiFeedStreamer):
+    def __init__(self, feed_url, check_interval=60):
+        super().__init__([feed_url], check_interval=check_interval, max_workers=1)
+        self.feed_url = feed_url
+
+    def fetch_feed(self):
+        """Fetch the RSS feed and return new entries."""
+        return [entry for _, entry in self.poll_once()]
+
+
+def load_feed_urls(path):
+    """Read feed URLs from a text file, one per line; blank lines and # comments are skipped."""
+    with open(path, 'r') as f:
+        return [line.split("#")[0].strip() for line in f if line.split("#")[0].strip()]
 
-            time.sleep(self.check_interval)
 
 if __name__ == "__main__":
-    feed_url = "https://rss.app/feeds/sELiL1zwWPUe2XcW.xml"
-    streamer = RSSFeedStreamer(feed_url, check_interval=60)
+    # python rss_feed_streamer.py [feeds.txt]
+    if len(sys.argv) > 1:
+        feed_urls = load_feed_urls(sys.argv[1])
+    else:
+        feed_urls = ["https://rss.app/feeds/sELiL1zwWPUe2XcW.xml"]
+    streamer = MultiFeedStreamer(feed_urls, check_interval=60)
     streamer.stream()
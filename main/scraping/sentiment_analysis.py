@@ -1,15 +1,27 @@
-import pandas as pd
-from textblob import TextBlob
+import sys
+
+from post_store import PostStore
+from sentiment_scorer import CachedScorer, make_scorer
 
 '''
 This is a super simple sentiment anlysis tool.
 We should look into other NLP solutions to get more accurate results.
+
+python sentiment_analysis.py [textblob|lexicon|transformer]
+Scores are cached in results/sentiment_cache.sqlite, so re-running over re-scraped
+posts only scores the new ones.
 '''
 
-df = pd.read_csv('main/scraping/results/musk.csv')
+store = PostStore('main/scraping/results/posts.sqlite')
+if not len(store):
+    store.import_csv('main/scraping/results/musk.csv', username='elonmusk')
+df = store.query(username='elonmusk')
 
-df['Sentiment'] = df['text'].apply(lambda tweet: TextBlob(tweet).sentiment.polarity)
+scorer = CachedScorer(make_scorer(sys.argv[1] if len(sys.argv) > 1 else "textblob"),
+                      path='main/scraping/results/sentiment_cache.sqlite')
+df['Sentiment'] = scorer.score(df['text'].fillna("").tolist())
+print(f"{scorer.hits} cached, {scorer.misses} scored")
 
 print(df.head())
 
-df['Sentiment'].plot(kind='hist', title='Sentiment Analysis of Tweets')
\ No newline at end of file
+df['Sentiment'].plot(kind='hist', title='Sentiment Analysis of Tweets')
@@ -0,0 +1,280 @@
+import collections
+import hashlib
+import re
+import sqlite3
+import threading
+
+import numpy as np
+
+'''
+Sentiment scorers that work on batches of texts, all returning floats in [-1, 1]:
+
+    TextBlobScorer      TextBlob polarity, one text at a time (what sentiment_analysis.py used)
+    LexiconScorer       word valences summed per text with numpy, VADER-style normalisation
+    TransformerScorer   a local Hugging Face model on the CPU, run in batches (optional)
+
+CachedScorer wraps any of them with an LRU in memory and an optional SQLite file, keyed
+by a hash of the scorer and the normalised text. Re-scraped posts and retweets are
+therefore only scored once.
+Every scorer can be pickled, so it can be handed to a process pool as a SentimentStream score_fn.
+'''
+
+_TOKEN = re.compile(r"[a-z][a-z']*|[!?]")
+_RETWEET = re.compile(r"^RT @\w+:\s*")
+_WHITESPACE = re.compile(r"\s+")
+
+NEGATIONS = {"not", "no", "never", "none", "nobody", "nothing", "neither", "nor", "cannot", "can't", "don't",
+             "doesn't", "didn't", "isn't", "wasn't", "aren't", "won't", "wouldn't", "shouldn't", "without"}
+
+# Small finance / social media lexicon used when no lexicon file is given (valences on VADER's -4..4 scale).
+LEXICON = {
+    "good": 1.9, "great": 3.1, "excellent": 3.2, "amazing": 2.8, "awesome": 3.1, "love": 3.2, "best": 3.2,
+    "win": 2.8, "winning": 2.4, "wins": 2.7, "success": 2.7, "strong": 2.3, "growth": 1.6, "profit": 1.9,
+    "profits": 1.9, "gain": 2.0, "gains": 1.8, "up": 0.5, "bull": 1.5, "bullish": 2.4, "beat": 1.0, "beats": 1.0,
+    "record": 1.0, "soar": 2.0, "soars": 2.0, "surge": 1.8, "surges": 1.8, "rally": 1.8, "buy": 0.8,
+    "upgrade": 1.8, "outperform": 1.9, "exciting": 2.2, "happy": 2.7, "positive": 2.6, "breakthrough": 2.2,
+    "approve": 1.9, "approved": 1.8, "launch": 0.8, "innovation": 1.6, "optimistic": 2.0, "boom": 1.9,
+    "bad": -2.5, "terrible": -2.5, "awful": -2.0, "worst": -3.1, "hate": -2.7, "lose": -1.6, "loss": -1.3,
+    "losses": -1.5, "weak": -1.9, "down": -0.9, "bear": -1.2, "bearish": -2.2, "miss": -0.6, "misses": -0.8,
+    "crash": -2.3, "crashes": -2.3, "plunge": -2.2, "plunges": -2.2, "drop": -1.1, "drops": -1.1, "fall": -0.9,
+    "falls": -0.9, "sell": -0.6, "downgrade": -1.8, "underperform": -1.7, "fraud": -2.8, "lawsuit": -1.6,
+    "recall": -1.3, "scandal": -2.5, "fail": -2.5, "failed": -2.3, "failure": -2.3, "negative": -2.7,
+    "risk": -1.1, "risky": -1.4, "fear": -2.2, "bankrupt": -2.6, "bankruptcy": -2.6, "delay": -1.3,
+    "delayed": -0.9, "investigation": -1.2, "concern": -1.0, "concerns": -1.0, "worry": -1.9, "sad": -2.1,
+}
+
+
+def normalize_text(text):
+    """Text as it is cached: retweet prefix removed, whitespace collapsed."""
+    return _WHITESPACE.sub(" ", _RETWEET.sub("", text or "")).strip()
+
+
+class Scorer:
+    """Scores a batch of texts; subclasses implement score(texts) and set a cache namespace `name`."""
+    name = "scorer"
+
+    def score(self, texts):
+        raise NotImplementedError
+
+    def __call__(self, texts):
+        return self.score(texts)
+
+
+class TextBlobScorer(Scorer):
+    name = "textblob"
+
+    def score(self, texts):
+        from textblob import TextBlob
+
+        return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+class LexiconScorer(Scorer):
+    def __init__(self, lexicon=None, negation_scale=-0.74, alpha=15.0):
+        """
+        Sum word valences per text and squash the sum into [-1, 1].
+
+        Args:
+            lexicon (dict): word -> valence (VADER scale, roughly -4..4). Defaults to LEXICON.
+            negation_scale (float): Factor applied to a word within two words after a negation.
+            alpha (float): Normalisation constant: score = sum / sqrt(sum**2 + alpha).
+        """
+        lexicon = LEXICON if lexicon is None else lexicon
+        self.words = {word: i for i, word in enumerate(lexicon)}
+        self.valences = np.array(list(lexicon.values()), dtype=np.float64)
+        self.negation_scale = negation_scale
+        self.alpha = alpha
+        digest = hashlib.sha1(repr(sorted(lexicon.items())).encode()).hexdigest()[:12]
+        self.name = f"lexicon:{digest}"
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Load a VADER-format lexicon: token<TAB>mean valence[<TAB>...] per line."""
+        lexicon = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) >= 2:
+                    lexicon[parts[0].lower()] = float(parts[1])
+        return cls(lexicon, **kwargs)
+
+    def score(self, texts):
+        doc_ids, word_ids, scales = [], [], []
+        for doc, text in enumerate(texts):
+            tokens = _TOKEN.findall(text.lower())
+            for position, token in enumerate(tokens):
+                word = self.words.get(token)
+                if word is None:
+                    continue
+                negated = any(t in NEGATIONS for t in tokens[max(position - 2, 0):position])
+                doc_ids.append(doc)
+                word_ids.append(word)
+                scales.append(self.negation_scale if negated else 1.0)
+        totals = np.bincount(np.array(doc_ids, dtype=np.int64),
+                             weights=self.valences[np.array(word_ids, dtype=np.int64)] * np.array(scales),
+                             minlength=len(texts))
+        return (totals / np.sqrt(totals * totals + self.alpha)).tolist()
+
+
+class TransformerScorer(Scorer):
+    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english", batch_size=32, threads=None,
+                 max_length=256):
+        """
+        Classify texts with a local transformers sentiment model on the CPU.
+
+        The model is loaded on first use in each process. A positive label scores +p and a
+        negative label -p (p being the label probability); any other label (neutral) scores 0.
+
+        Args:
+            model_name (str): Model id or local path, e.g. "ProsusAI/finbert".
+            batch_size (int): Texts per forward pass.
+            threads (int): torch CPU threads per process (leave None to keep torch's default).
+            max_length (int): Tokens kept per text.
+        """
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.max_length = max_length
+        self.name = f"transformer:{model_name}"
+        self.pipeline = None
+
+    def _load(self):
+        from transformers import pipeline
+
+        if self.threads:
+            import torch
+
+            torch.set_num_threads(self.threads)
+        self.pipeline = pipeline("sentiment-analysis", model=self.model_name, device=-1, truncation=True,
+                                 max_length=self.max_length)
+
+    def score(self, texts):
+        if self.pipeline is None:
+            self._load()
+        scores = []
+        for result in self.pipeline(list(texts), batch_size=self.batch_size):
+            label = result["label"].lower()
+            sign = 1.0 if label.startswith("pos") else -1.0 if label.startswith("neg") else 0.0
+            scores.append(sign * float(result["score"]))
+        return scores
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pipeline"] = None
+        return state
+
+
+def make_scorer(backend="textblob", **kwargs):
+    """Build a scorer by name: textblob, lexicon (optional lexicon_path) or transformer."""
+    if backend == "textblob":
+        return TextBlobScorer()
+    if backend == "lexicon":
+        path = kwargs.pop("lexicon_path", None)
+        return LexiconScorer.from_file(path, **kwargs) if path else LexiconScorer(**kwargs)
+    if backend == "transformer":
+        return TransformerScorer(**kwargs)
+    raise ValueError(f"Unknown sentiment scorer {backend!r}; use textblob, lexicon or transformer.")
+
+
+class CachedScorer(Scorer):
+    def __init__(self, scorer, max_items=100_000, path=None):
+        """
+        Score texts through `scorer`, reusing earlier scores of the same text.
+
+        Args:
+            scorer (Scorer): Scorer used for texts not in the cache.
+            max_items (int): Scores kept in the in-memory LRU.
+            path (str): Optional SQLite file that keeps scores across runs and processes.
+        """
+        self.scorer = scorer
+        self.name = scorer.name
+        self.max_items = max_items
+        self.path = path
+        self.memory = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.connection = None
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, text):
+        return hashlib.blake2b(f"{self.name}\0{normalize_text(text)}".encode("utf-8"), digest_size=16).digest()
+
+    def _db(self):
+        if self.connection is None and self.path:
+            self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS scores (key BLOB PRIMARY KEY, score REAL NOT NULL) "
+                                    "WITHOUT ROWID")
+        return self.connection
+
+    def lookup(self, texts):
+        """Return (scores, missing): cached scores (None where missing) and the indices of the missing texts."""
+        keys = [self.key(text) for text in texts]
+        scores = [None] * len(texts)
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key in self.memory:
+                    self.memory.move_to_end(key)
+                    scores[i] = self.memory[key]
+            unknown = list({key for key, score in zip(keys, scores) if score is None})
+            db = self._db()
+            if db is not None and unknown:
+                found = {}
+                for start in range(0, len(unknown), 500):
+                    chunk = unknown[start:start + 500]
+                    found.update(db.execute(f"SELECT key, score FROM scores WHERE key IN "
+                                            f"({','.join('?' * len(chunk))})", chunk).fetchall())
+                for i, key in enumerate(keys):
+                    if scores[i] is None and key in found:
+                        scores[i] = found[key]
+                self._remember(found.items())
+        missing = [i for i, score in enumerate(scores) if score is None]
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return scores, missing
+
+    def _remember(self, items):
+        for key, score in items:
+            self.memory[key] = score
+            self.memory.move_to_end(key)
+        while len(self.memory) > self.max_items:
+            self.memory.popitem(last=False)
+
+    def store(self, texts, scores):
+        """Cache the scores of texts scored elsewhere (e.g. in a process pool)."""
+        items = [(self.key(text), float(score)) for text, score in zip(texts, scores)]
+        with self.lock:
+            self._remember(items)
+            db = self._db()
+            if db is not None:
+                with db:
+                    db.executemany("INSERT OR REPLACE INTO scores (key, score) VALUES (?, ?)", items)
+
+    def score(self, texts):
+        texts = list(texts)
+        scores, missing = self.lookup(texts)
+        if missing:
+            # duplicates inside the batch are scored once
+            unique = list(dict.fromkeys(normalize_text(texts[i]) for i in missing))
+            fresh = dict(zip(unique, self.scorer.score(unique)))
+            for i in missing:
+                scores[i] = float(fresh[normalize_text(texts[i])])
+            self.store(unique, [fresh[text] for text in unique])
+        return scores
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["connection"] = None
+        state["lock"] = None
+        state["memory"] = collections.OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
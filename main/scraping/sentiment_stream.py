@@ -0,0 +1,263 @@
+import calendar
+import collections
+import math
+import multiprocessing as mp
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+'''
+Live sentiment for the trading state.
+Posts arrive from the RSS streamer or the scraper and are matched to tickers by
+cashtag and keywords. They are then scored in micro-batches on a process pool.
+Every ticker keeps an exponentially decayed mean of its scores, which a strategy can
+read as one extra value per ticker of its state vector.
+
+Memory is bounded: the queue of unscored posts has a fixed length (the oldest are
+dropped first), only a few batches are in flight at once, and each ticker holds just
+two floats.
+'''
+
+
+def textblob_polarity(texts):
+    """Score a batch of texts with TextBlob polarity in [-1, 1]."""
+    from textblob import TextBlob
+
+    return [TextBlob(text).sentiment.polarity for text in texts]
+
+
+class TickerMatcher:
+    def __init__(self, tickers, keywords=None, feed_tickers=None):
+        """
+        Find the tickers a post is about.
+
+        Args:
+            tickers (list): Tracked tickers. Cashtags such as $TSLA always match.
+            keywords (dict): Extra words per ticker, e.g. {"TSLA": ["tesla", "elon musk"]}.
+            feed_tickers (dict): Tickers every post of a feed is about, keyed by feed URL
+                (for feeds that follow one company or person).
+        """
+        self.tickers = list(tickers)
+        self.feed_tickers = feed_tickers or {}
+        self.patterns = []
+        for ticker in self.tickers:
+            words = [re.escape(f"${ticker}")] + [re.escape(word) for word in (keywords or {}).get(ticker, [])]
+            pattern = re.compile(r"(?<!\w)(?:" + "|".join(words) + r")(?!\w)", re.IGNORECASE)
+            self.patterns.append((ticker, pattern))
+
+    def match(self, text, feed_url=None):
+        found = [ticker for ticker, pattern in self.patterns if pattern.search(text)]
+        for ticker in self.feed_tickers.get(feed_url, []):
+            if ticker not in found:
+                found.append(ticker)
+        return found
+
+
+class DecayedScore:
+    def __init__(self, half_life=3600.0, prior_weight=1.0):
+        """
+        Exponentially decayed mean of scores.
+
+        value = decayed sum of scores / (decayed number of scores + prior_weight), so one
+        post moves the score less than many, and the score fades to 0 when posts stop.
+
+        Args:
+            half_life (float): Seconds after which a score counts half.
+            prior_weight (float): Weight of an implicit neutral (0) score.
+        """
+        self.decay = math.log(2) / half_life
+        self.prior_weight = prior_weight
+        self.total = 0.0
+        self.weight = 0.0
+        self.updated = None
+
+    def _decay_to(self, now):
+        if self.updated is not None and now > self.updated:
+            factor = math.exp(-self.decay * (now - self.updated))
+            self.total *= factor
+            self.weight *= factor
+        if self.updated is None or now > self.updated:
+            self.updated = now
+
+    def add(self, score, timestamp):
+        self._decay_to(timestamp)
+        if timestamp < self.updated:
+            # a late post counts as much as it would have had it arrived on time
+            factor = math.exp(-self.decay * (self.updated - timestamp))
+            self.total += score * factor
+            self.weight += factor
+        else:
+            self.total += score
+            self.weight += 1.0
+
+    def value(self, now):
+        self._decay_to(now)
+        return self.total / (self.weight + self.prior_weight)
+
+
+class SentimentStream:
+    def __init__(self, tickers, keywords=None, feed_tickers=None, half_life=3600.0, score_fn=textblob_polarity,
+                 batch_size=64, max_delay=2.0, processes=2, max_pending=10000, max_batches_in_flight=None,
+                 cache=None):
+        """
+        Score incoming posts in micro-batches and keep a decayed sentiment score per ticker.
+
+        Args:
+            tickers (list): Tickers to track, in the order scores() returns them.
+            keywords (dict): Extra match words per ticker (see TickerMatcher).
+            feed_tickers (dict): Tickers implied by a feed URL (see TickerMatcher).
+            half_life (float): Seconds after which a post's score counts half.
+            score_fn: Picklable function scoring a list of texts to a list of floats in [-1, 1],
+                such as a Scorer from sentiment_scorer.
+            batch_size (int): Posts per batch.
+            max_delay (float): Seconds a post may wait for its batch to fill up.
+            processes (int): Scoring processes; 0 scores on the batching thread itself.
+            max_pending (int): Unscored posts kept; the oldest are dropped beyond it.
+            max_batches_in_flight (int): Batches queued on the pool at once (default 2 per process).
+            cache: Object with lookup(texts) and store(texts, scores), such as a CachedScorer.
+                Posts it already knows are scored here and never sent to the pool.
+        """
+        self.tickers = list(tickers)
+        self.matcher = TickerMatcher(self.tickers, keywords, feed_tickers)
+        self.scores_by_ticker = {ticker: DecayedScore(half_life) for ticker in self.tickers}
+        self.score_fn = score_fn
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending = collections.deque(maxlen=max_pending)
+        self.condition = threading.Condition()
+        self.lock = threading.Lock()
+        self.pool = None
+        if processes:
+            # spawn: the pool is created from a process that already runs threads
+            self.pool = ProcessPoolExecutor(max_workers=processes, mp_context=mp.get_context("spawn"))
+        self.in_flight = threading.Semaphore(max_batches_in_flight or 2 * max(processes, 1))
+        self.submitted = 0
+        self.scored = 0
+        self.unmatched = 0
+        self.errors = 0
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, text, timestamp=None, feed_url=None):
+        """Queue a post for scoring. Returns the tickers it was matched to (none means it is ignored)."""
+        tickers = self.matcher.match(text, feed_url)
+        if not tickers:
+            self.unmatched += 1
+            return tickers
+        with self.condition:
+            self.pending.append((text, time.time() if timestamp is None else timestamp, tickers))
+            self.submitted += 1
+            if len(self.pending) >= self.batch_size:
+                self.condition.notify()
+        return tickers
+
+    def submit_entry(self, feed_url, entry):
+        """Handler for MultiFeedStreamer.stream: queue the entry's title and summary."""
+        text = " ".join(part for part in (entry.get("title"), entry.get("summary")) if part)
+        timestamp = None
+        if entry.get("published_parsed"):
+            timestamp = calendar.timegm(entry["published_parsed"])
+        return self.submit(text, timestamp, feed_url)
+
+    def follow(self, streamer):
+        """Consume a MultiFeedStreamer (or RSSFeedStreamer) on a background thread."""
+        thread = threading.Thread(target=streamer.stream, args=(self.submit_entry,), name="sentiment-feed",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def _next_batch(self):
+        with self.condition:
+            deadline = time.monotonic() + self.max_delay
+            while self.running and len(self.pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 and self.pending:
+                    break
+                self.condition.wait(timeout=remaining if remaining > 0 else self.max_delay)
+                if remaining <= 0:
+                    deadline = time.monotonic() + self.max_delay
+            n = min(len(self.pending), self.batch_size)
+            return [self.pending.popleft() for _ in range(n)]
+
+    def _apply(self, batch, scores):
+        with self.lock:
+            for (_, timestamp, tickers), score in zip(batch, scores):
+                for ticker in tickers:
+                    self.scores_by_ticker[ticker].add(float(score), timestamp)
+            self.scored += len(batch)
+
+    def _scored(self, batch, texts, scores):
+        if self.cache is not None:
+            self.cache.store(texts, scores)
+        by_text = dict(zip(texts, scores))
+        self._apply(batch, [by_text[text] for text, _, _ in batch])
+
+    def _on_done(self, batch, texts, future):
+        self.in_flight.release()
+        try:
+            self._scored(batch, texts, future.result())
+        except Exception as e:
+            self.errors += 1
+            print(f"Sentiment batch of {len(batch)} posts failed: {e}")
+
+    def _run(self):
+        while self.running or self.pending:
+            batch = self._next_batch()
+            if self.cache is not None and batch:
+                scores, missing = self.cache.lookup([text for text, _, _ in batch])
+                known = [i for i, score in enumerate(scores) if score is not None]
+                if known:
+                    self._apply([batch[i] for i in known], [scores[i] for i in known])
+                batch = [batch[i] for i in missing]
+            if not batch:
+                continue
+            # reposts inside one batch are scored once
+            texts = list(dict.fromkeys(text for text, _, _ in batch))
+            if self.pool is None:
+                try:
+                    self._scored(batch, texts, self.score_fn(texts))
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Sentiment batch of {len(batch)} posts failed: {e}")
+                continue
+            self.in_flight.acquire()
+            try:
+                future = self.pool.submit(self.score_fn, texts)
+            except Exception as e:
+                # a broken pool drops its batches instead of taking the batching thread down
+                self.in_flight.release()
+                self.errors += 1
+                print(f"Sentiment batch of {len(batch)} posts not scored: {e}")
+                continue
+            future.add_done_callback(lambda f, batch=batch, texts=texts: self._on_done(batch, texts, f))
+
+    def scores(self, tickers=None, now=None):
+        """Return the decayed sentiment of each ticker as a float32 array, for the state vector."""
+        now = time.time() if now is None else now
+        with self.lock:
+            return np.array([self.scores_by_ticker[ticker].value(now) for ticker in (tickers or self.tickers)],
+                            dtype=np.float32)
+
+    def close(self):
+        """Score what is queued, then stop the batching thread and the pool."""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    from rss_feed_streamer import MultiFeedStreamer
+
+    stream = SentimentStream(["TSLA"], keywords={"TSLA": ["tesla", "elon", "musk"]})
+    stream.follow(MultiFeedStreamer(["https://rss.app/feeds/sELiL1zwWPUe2XcW.xml"], check_interval=60))
+    while True:
+        time.sleep(60)
+        print(dict(zip(stream.tickers, stream.scores())), f"({stream.scored} posts scored)")
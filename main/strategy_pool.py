@@ -0,0 +1,321 @@
+import importlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+
+'''
+Runs several paper trading strategies side by side in one supervised process pool.
+The parent imports the heavy libraries (torch, stable_baselines3, finrl) once and forks
+the strategy processes from it, so those pages are shared copy-on-write instead of
+being loaded again by every strategy. Strategies that share a bar interval also share
+one MarketDataHub, so overlapping tickers are fetched from the broker only once per bar.
+
+Once the hub threads run, the parent is no longer safe to fork: a child could inherit a
+lock held by one of them. Restarted strategies and the inference server are therefore
+started through a forkserver (preloading the same modules), and every queue they share
+with the parent is created in that context.
+'''
+
+# Modules imported by the parent before forking so every child shares them.
+PRELOAD_MODULES = [
+    "numpy",
+    "torch",
+    "stable_baselines3",
+    "finrl.meta.paper_trading.alpaca",
+]
+
+
+class StrategySpec:
+    def __init__(self, config_path, model_name, model_path, name=None):
+        """
+        Describe one strategy run by the pool.
+
+        Args:
+            config_path (str): Path to the tutorial config.json.
+            model_name (str): Algorithm name understood by PaperTradingManager (A2C, PPO, ...).
+            model_path (str): Path to the saved model.
+            name (str): Unique name used in status reports. Defaults to model name and file.
+        """
+        self.config_path = config_path
+        self.model_name = model_name
+        self.model_path = model_path
+        self.name = name or f"{model_name}:{os.path.basename(model_path)}"
+        # (shm_name, ticker_list, n_indicators) of the hub feeding this strategy, set by the pool
+        self.market_data = None
+        # InferenceClient used instead of loading the model in the child, set by the pool
+        self.model_client = None
+        # {"slot": i, "n_slots": n} staggering this strategy's cycles within the bar, set by the pool
+        self.schedule = None
+        # added to PAPER_TRADING_METRICS_PORT so every child serves metrics on its own port, set by the pool
+        self.metrics_port_offset = 0
+
+    @classmethod
+    def from_tuple(cls, strategy):
+        """Build a spec from a (config_path, model_name, model_path) tuple."""
+        if isinstance(strategy, cls):
+            return strategy
+        return cls(*strategy)
+
+
+def _run_strategy(spec, status_queue):
+    """Child process entry point: run one strategy and report its lifecycle."""
+    from paper_trading_manager import PaperTradingManager
+    from market_data_hub import MarketDataSubscriber
+
+    status_queue.put((spec.name, "starting", {"pid": os.getpid()}))
+    os.environ["PAPER_TRADING_METRICS_PORT_OFFSET"] = str(spec.metrics_port_offset)
+    try:
+        market_data = MarketDataSubscriber(*spec.market_data) if spec.market_data else None
+        manager = PaperTradingManager(spec.config_path)
+        manager.start_paper_trading(spec.model_name, spec.model_path, market_data=market_data,
+                                    model=spec.model_client, schedule=spec.schedule)
+    except Exception as e:
+        status_queue.put((spec.name, "failed", {"error": str(e), "traceback": traceback.format_exc()}))
+        raise SystemExit(1)
+    status_queue.put((spec.name, "finished", {}))
+
+
+class StrategyPool:
+    def __init__(self, strategies, max_restarts=3, restart_backoff=5.0, status_interval=60,
+                 share_market_data=True, inference_server=False, torch_threads=1, target=_run_strategy):
+        """
+        Supervise one process per strategy and restart the ones that crash.
+
+        Args:
+            strategies (list): StrategySpec objects or (config_path, model_name, model_path) tuples.
+            max_restarts (int): How many times a crashed strategy is restarted before giving up.
+            restart_backoff (float): Base delay in seconds before a restart, doubled on each restart.
+            status_interval (float): Seconds between aggregated status prints.
+            share_market_data (bool): Feed strategies from one MarketDataHub per bar interval.
+            inference_server (bool): Load every model once in a shared InferenceServer process
+                and let strategies send batched predict requests to it.
+            torch_threads (int): Torch threads used by the inference server.
+            target (callable): Child entry point, called as target(spec, status_queue).
+        """
+        self.strategies = [StrategySpec.from_tuple(s) for s in strategies]
+        names = [s.name for s in self.strategies]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Strategy names must be unique, got {names}")
+        for i, spec in enumerate(self.strategies):
+            spec.metrics_port_offset = i
+
+        self.max_restarts = max_restarts
+        self.restart_backoff = restart_backoff
+        self.status_interval = status_interval
+        self.share_market_data = share_market_data
+        self.use_inference_server = inference_server
+        self.torch_threads = torch_threads
+        self.target = target
+        self.hubs = {}
+        self.inference_server = None
+        self.inference_server_restarts = 0
+
+        # fork lets the first children share the modules preloaded by the parent
+        if "fork" in mp.get_all_start_methods():
+            self.ctx = mp.get_context("fork")
+        else:
+            self.ctx = mp.get_context()
+        # processes started while the parent runs threads: restarts and the inference server
+        if "forkserver" in mp.get_all_start_methods():
+            self.restart_ctx = mp.get_context("forkserver")
+            self.restart_ctx.set_forkserver_preload(PRELOAD_MODULES)
+        else:
+            self.restart_ctx = self.ctx
+        self.status_queue = self.restart_ctx.Queue()
+        self.processes = {}
+        self.restarts = {s.name: 0 for s in self.strategies}
+        self.restart_at = {}
+        self.status = {s.name: {"state": "pending", "restarts": 0, "updated": time.time()} for s in self.strategies}
+
+    def preload(self):
+        """Import the heavy shared libraries in the parent before any child is forked."""
+        for module in PRELOAD_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError as e:
+                print(f"Could not preload {module}: {e}")
+
+    def create_hubs(self):
+        """Create one MarketDataHub per bar interval over the union of the strategies' tickers."""
+        import alpaca_trade_api as tradeapi
+        from finrl.config import INDICATORS
+        from market_data_hub import MarketDataHub
+
+        groups = {}
+        for spec in self.strategies:
+            with open(spec.config_path, 'r') as f:
+                config = json.load(f)
+            interval = config["training"]["time_interval"]
+            group = groups.setdefault(interval, {"config": config, "tickers": [], "specs": [], "universes": {}})
+            group["tickers"].extend(config["training"]["ticker_list"])
+            group["specs"].append(spec)
+            if config["trading"].get("turbulence_source") == "returns":
+                group["universes"][spec.name] = config["training"]["ticker_list"]
+                group.setdefault("turbulence_window", config["trading"].get("turbulence_window", 252))
+
+        for interval, group in groups.items():
+            alpaca = group["config"]["alpaca"]
+            api = tradeapi.REST(alpaca["data_api_key"], alpaca["data_api_secret"], alpaca["data_api_base_url"], "v2")
+            hub = MarketDataHub(group["tickers"], interval, INDICATORS, api,
+                                turbulence_universes=list(group["universes"].values()),
+                                turbulence_window=group.get("turbulence_window", 252))
+            self.hubs[interval] = hub
+            for spec in group["specs"]:
+                spec.market_data = hub.descriptor(group["universes"].get(spec.name))
+            print(f"Market data hub for {interval}: {len(hub.ticker_list)} tickers shared by {len(group['specs'])} strategies")
+
+    def assign_schedule_slots(self):
+        """Give the strategies of each bar interval consecutive slots so their cycles hit the broker in turn."""
+        groups = {}
+        for spec in self.strategies:
+            with open(spec.config_path, 'r') as f:
+                interval = json.load(f)["training"]["time_interval"]
+            groups.setdefault(interval, []).append(spec)
+        for specs in groups.values():
+            for slot, spec in enumerate(specs):
+                spec.schedule = {"slot": slot, "n_slots": len(specs)}
+
+    def start_inference_server(self):
+        """Load every strategy's model once in the inference server and hand out clients."""
+        from inference_server import InferenceServer
+
+        self.inference_server = InferenceServer(self.restart_ctx, torch_threads=self.torch_threads)
+        for spec in self.strategies:
+            spec.model_client = self.inference_server.client(spec.model_name, spec.model_path)
+        self.inference_server.start()
+        print(f"Inference server serving {len(self.inference_server.models)} models to {len(self.strategies)} strategies")
+
+    def start(self):
+        """Preload shared modules, start every strategy process and then the data hubs."""
+        self.preload()
+        self.assign_schedule_slots()
+        if self.share_market_data:
+            self.create_hubs()
+        if self.use_inference_server:
+            self.start_inference_server()
+        for spec in self.strategies:
+            self._spawn(spec)
+        # hub threads start after the first fork so no child inherits a running thread's locks;
+        # later processes come from restart_ctx
+        for hub in self.hubs.values():
+            hub.start()
+
+    def _spawn(self, spec, ctx=None):
+        ctx = ctx or self.ctx
+        process = ctx.Process(target=self.target, args=(spec, self.status_queue), name=spec.name, daemon=False)
+        process.start()
+        self.processes[spec.name] = process
+        self._update(spec.name, "started", {"pid": process.pid})
+
+    def _update(self, name, state, info):
+        entry = self.status[name]
+        entry.update(info)
+        entry["state"] = state
+        entry["restarts"] = self.restarts[name]
+        entry["updated"] = time.time()
+
+    def _drain_status(self, timeout):
+        """Apply every status message from the children, waiting up to timeout for the first."""
+        try:
+            message = self.status_queue.get(timeout=timeout) if timeout else self.status_queue.get_nowait()
+            while True:
+                name, state, info = message
+                self._update(name, state, info)
+                if state == "failed":
+                    print(f"Strategy {name} failed: {info.get('error')}")
+                message = self.status_queue.get_nowait()
+        except queue.Empty:
+            return
+
+    def _check_inference_server(self):
+        """Restart the inference server if its process died; the strategies' clients keep working."""
+        if self.inference_server is None or self.inference_server.alive():
+            return
+        self.inference_server_restarts += 1
+        print(f"Inference server exited with code {self.inference_server.process.exitcode}, restarting "
+              f"(restart {self.inference_server_restarts})")
+        self.inference_server.restart()
+
+    def _check_processes(self):
+        """Reap exited children and schedule restarts for the ones that crashed."""
+        self._check_inference_server()
+        now = time.time()
+        for spec in self.strategies:
+            process = self.processes.get(spec.name)
+            if process is None or process.is_alive():
+                continue
+            process.join()
+            del self.processes[spec.name]
+            if process.exitcode == 0:
+                self._update(spec.name, "finished", {"exitcode": 0})
+            elif self.restarts[spec.name] < self.max_restarts:
+                delay = self.restart_backoff * (2 ** self.restarts[spec.name])
+                self.restart_at[spec.name] = now + delay
+                self._update(spec.name, "restarting", {"exitcode": process.exitcode})
+                print(f"Strategy {spec.name} exited with code {process.exitcode}, restarting in {delay:.0f}s")
+            else:
+                self._update(spec.name, "given_up", {"exitcode": process.exitcode})
+                print(f"Strategy {spec.name} exceeded {self.max_restarts} restarts, giving up")
+
+        for spec in self.strategies:
+            if spec.name in self.restart_at and now >= self.restart_at[spec.name]:
+                del self.restart_at[spec.name]
+                self.restarts[spec.name] += 1
+                self._spawn(spec, self.restart_ctx)
+
+    def print_status(self):
+        """Print one line per strategy with its latest reported state."""
+        print("\n=== Strategy Pool Status ===")
+        for name, entry in self.status.items():
+            age = time.time() - entry["updated"]
+            print(f"{name}: {entry['state']} (pid={entry.get('pid')}, restarts={entry['restarts']}, {age:.0f}s ago)")
+
+    def running(self):
+        """Return True while any strategy is alive or waiting to be restarted."""
+        return bool(self.processes) or bool(self.restart_at)
+
+    def supervise(self, poll_interval=1.0):
+        """Block until every strategy has finished or given up, restarting crashed ones."""
+        last_print = time.time()
+        while self.running():
+            self._drain_status(timeout=poll_interval)
+            self._check_processes()
+            if time.time() - last_print >= self.status_interval:
+                self.print_status()
+                last_print = time.time()
+        self._drain_status(timeout=0)
+        self.print_status()
+
+    def stop(self, timeout=10):
+        """Terminate every running strategy."""
+        self.restart_at.clear()
+        for process in self.processes.values():
+            process.terminate()
+        for name, process in list(self.processes.items()):
+            process.join(timeout)
+            self._update(name, "stopped", {"exitcode": process.exitcode})
+        self.processes.clear()
+
+    def stop_hubs(self):
+        """Stop the data hubs and the inference server."""
+        for hub in self.hubs.values():
+            hub.stop()
+        self.hubs.clear()
+        if self.inference_server is not None:
+            self.inference_server.stop()
+            self.inference_server = None
+
+    def run(self):
+        """Start all strategies and supervise them until they finish or the user interrupts."""
+        self.start()
+        try:
+            self.supervise()
+        except KeyboardInterrupt:
+            print("Stopping all strategies...")
+            self.stop()
+        finally:
+            self.stop_hubs()
+        return self.status
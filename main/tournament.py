@@ -0,0 +1,182 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT_DIR)
+
+'''
+Tournament of every saved model in the tutorials.
+Models are found with model_registry.discover_models and paired with the config.json of
+their tutorial. The bars and features of each config are prepared once in the parent
+(through the bar cache, so every model sees the same data). The parent then forks one
+worker per core; the workers read the prepared markets copy-on-write and backtest one
+model each. Every worker runs torch single-threaded, so the cores are shared out
+between models rather than oversubscribed. The result is a ranked table of return,
+drawdown and per-decision inference cost. A model that fails to load or does not fit
+its config's state is listed with its error instead of stopping the tournament.
+
+    python main/tournament.py
+    python main/tournament.py --tutorials FinRL_StockTrading_Fundamental --workers 4 --output ranking.json
+    python main/tournament.py --synthetic-days 21
+'''
+
+RANK_KEYS = {
+    # key -> True when larger is better
+    "total_return": True,
+    "sharpe": True,
+    "max_drawdown": False,
+    "predict_us_per_decision": False,
+}
+
+# config path -> Market, filled by the parent before forking
+_MARKETS = {}
+
+
+def _init_worker():
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def _evaluate(tutorial, model_name, model_path, config_path, options):
+    from backtester import backtest
+
+    start = time.perf_counter()
+    try:
+        report = backtest(config_path, model_path, model_name, market=_MARKETS[config_path], **options)
+    except Exception as e:
+        traceback.print_exc()
+        report = {"model": model_name, "model_path": model_path, "error": f"{type(e).__name__}: {e}"}
+    report["tutorial"] = tutorial
+    report["wall_seconds"] = time.perf_counter() - start
+    return report
+
+
+def find_entries(tutorials_dir, tutorials=None):
+    """(tutorial, model_name, model_path, config_path) for every model whose tutorial has a config.json."""
+    from model_registry import discover_models
+
+    entries = []
+    for tutorial, model_name, model_path in discover_models(tutorials_dir):
+        config_path = os.path.join(tutorials_dir, tutorial, "config.json")
+        if tutorials and tutorial not in tutorials:
+            continue
+        if not os.path.exists(config_path):
+            print(f"Skipping {model_path}: no config.json in {tutorial}")
+            continue
+        entries.append((tutorial, model_name, model_path, config_path))
+    return entries
+
+
+def prepare_markets(config_paths, period="test", bars_path=None, cache_dir=None, synthetic_days=None):
+    """Load the bars and features of each config once; configs with the same tickers share the download."""
+    from backtester import load_bars, prepare_market
+
+    bars_by_universe = {}
+    for config_path in config_paths:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        key = (tuple(config["training"]["ticker_list"]), config["training"]["time_interval"],
+               tuple(sorted(config["dates"].items())))
+        if key not in bars_by_universe:
+            print(f"Loading bars of {len(key[0])} tickers for {config_path}")
+            bars_by_universe[key] = load_bars(config, period, bars_path, cache_dir, synthetic_days)
+        _MARKETS[config_path] = prepare_market(config, bars_by_universe[key])
+    return _MARKETS
+
+
+def run_tournament(entries, workers=None, **options):
+    """
+    Backtest every (tutorial, model_name, model_path, config_path) entry in parallel.
+
+    The markets of the entries' configs must have been prepared with prepare_markets.
+    Returns the reports in completion order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_evaluate(*entry, options) for entry in entries]
+    reports = []
+    # fork: the workers inherit the prepared markets and already imported libraries
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("fork"),
+                             initializer=_init_worker) as pool:
+        futures = [pool.submit(_evaluate, *entry, options) for entry in entries]
+        for future in as_completed(futures):
+            report = future.result()
+            status = report.get("error") or f"{report['total_return']:+.2%}"
+            print(f"Finished {report['tutorial']} {os.path.basename(report['model_path'])}: {status}")
+            reports.append(report)
+    return reports
+
+
+def rank(reports, key="total_return"):
+    """Successful reports sorted best first by key, followed by the failed ones."""
+    ok = [report for report in reports if "error" not in report]
+    failed = [report for report in reports if "error" in report]
+    ok.sort(key=lambda report: report[key], reverse=RANK_KEYS[key])
+    for i, report in enumerate(ok, 1):
+        report["rank"] = i
+    return ok + failed
+
+
+def print_ranking(reports):
+    header = (f"{'#':>3}  {'tutorial':<44}{'model':<10}{'file':<20}{'return':>9}{'max dd':>9}{'sharpe':>8}"
+              f"{'trades':>8}{'us/dec':>9}")
+    print(header)
+    print("-" * len(header))
+    for report in reports:
+        name = os.path.basename(os.path.normpath(report["model_path"]))
+        if "error" in report:
+            print(f"{'-':>3}  {report['tutorial']:<44}{report['model']:<10}{name:<20}{report['error']}")
+            continue
+        print(f"{report['rank']:>3}  {report['tutorial']:<44}{report['model']:<10}{name:<20}"
+              f"{report['total_return']:>+9.2%}{report['max_drawdown']:>9.2%}{report['sharpe']:>8.2f}"
+              f"{report['trades']:>8}{report['predict_us_per_decision']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest every saved model and rank them.")
+    parser.add_argument("--tutorials-dir", default=os.path.join(ROOT_DIR, "tutorials"))
+    parser.add_argument("--tutorials", nargs="+", help="Only these tutorial directories.")
+    parser.add_argument("--workers", type=int, help="Parallel backtests (default: one per core).")
+    parser.add_argument("--period", default="test", choices=["train", "test", "full_train"])
+    parser.add_argument("--rank-by", default="total_return", choices=list(RANK_KEYS))
+    parser.add_argument("--cash", type=float, default=100_000.0, help="Starting cash of every day.")
+    parser.add_argument("--cost", type=float, default=0.001, help="Transaction cost per dollar traded.")
+    parser.add_argument("--bars", help="CSV or Parquet bar file to use instead of the bar cache.")
+    parser.add_argument("--cache-dir", help="Bar cache directory (default .bar_cache).")
+    parser.add_argument("--synthetic-days", type=int, help="Replay this many days of synthetic bars.")
+    parser.add_argument("--output", help="Write the ranked reports as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    entries = find_entries(args.tutorials_dir, args.tutorials)
+    if not entries:
+        print("No models found.")
+        return 1
+    print(f"Found {len(entries)} models in {len({entry[0] for entry in entries})} tutorials")
+    start = time.perf_counter()
+    prepare_markets(sorted({entry[3] for entry in entries}), args.period, args.bars, args.cache_dir,
+                    args.synthetic_days)
+    reports = run_tournament(entries, args.workers, period=args.period, cash=args.cash, cost=args.cost)
+    ranked = rank(reports, args.rank_by)
+    print()
+    print_ranking(ranked)
+    print(f"\n{len(entries)} models in {time.perf_counter() - start:.1f}s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(ranked, f, indent=2)
+        print(f"Ranking written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from tutorials.google_docs_logger import GoogleDocsLogger, doc_length  # noqa: E402
+
+
+class _Call:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self):
+        return self.fn()
+
+
+class LocalDocsService:
+    def __init__(self, latency=0.0):
+        """
+        In-memory stand-in for the Docs API service (create/get/batchUpdate).
+
+        `calls` counts the API requests by method and `text(doc_id)` returns what was written.
+
+        Args:
+            latency (float): Seconds each request takes, to mimic HTTP round-trips.
+        """
+        self.latency = latency
+        self.docs = {}
+        self.calls = {'create': 0, 'get': 0, 'batchUpdate': 0}
+
+    def documents(self):
+        return self
+
+    def _call(self, method, fn):
+        def run():
+            self.calls[method] += 1
+            if self.latency:
+                time.sleep(self.latency)
+            return fn()
+        return _Call(run)
+
+    def text(self, doc_id):
+        return self.docs[doc_id]
+
+    def create(self, body):
+        def create():
+            doc_id = f"local-{len(self.docs) + 1}"
+            self.docs[doc_id] = "\n"
+            return {'documentId': doc_id, 'title': body.get('title')}
+        return self._call('create', create)
+
+    def get(self, documentId):
+        def get():
+            end_index = doc_length(self.docs.setdefault(documentId, "\n")) + 1
+            return {'documentId': documentId, 'body': {'content': [{'endIndex': end_index}]}}
+        return self._call('get', get)
+
+    def batchUpdate(self, documentId, body):
+        def batch_update():
+            text = self.docs.setdefault(documentId, "\n")
+            for request in body['requests']:
+                if 'insertText' in request:
+                    # Docs indices start at 1; the body always ends with a newline
+                    index = request['insertText']['location']['index'] - 1
+                    if not 0 <= index < doc_length(text):
+                        raise ValueError(f"Index {index + 1} must be less than the end index of the body.")
+                    prefix = text.encode('utf-16-le')[:index * 2].decode('utf-16-le')
+                    text = prefix + request['insertText']['text'] + text[len(prefix):]
+            self.docs[documentId] = text
+            return {'documentId': documentId, 'replies': [{} for _ in body['requests']]}
+        return self._call('batchUpdate', batch_update)
+
+
+class LostResponseService(LocalDocsService):
+    """Applies the next batchUpdate and then fails it, like a request whose response never arrived."""
+
+    def __init__(self):
+        super().__init__()
+        self.lose_next = False
+
+    def batchUpdate(self, documentId, body):
+        call = super().batchUpdate(documentId, body)
+
+        def run():
+            result = call.execute()
+            if self.lose_next:
+                self.lose_next = False
+                raise TimeoutError("response lost")
+            return result
+        return _Call(run)
+
+
+def logged_lines(service, logger):
+    return [line.split(" - ", 1)[1] for line in service.text(logger.doc_id).splitlines() if " - " in line]
+
+
+def test_messages_are_batched_in_order():
+    service = LocalDocsService()
+    logger = GoogleDocsLogger(service=service, flush_interval=0.2)
+    writes = service.calls['batchUpdate']
+    for i in range(20):
+        logger.log(f"message {i}", level='TRADE' if i % 2 else 'INFO')
+    logger.flush()
+    logger.log("après ünïcode ✓")
+    logger.close()
+
+    assert logged_lines(service, logger) == [f"message {i}" for i in range(20)] + ["après ünïcode ✓"]
+    assert service.calls['batchUpdate'] - writes == logger.batches == 2
+    # the tracked end index stays in step with the document, so no write needed a get first
+    assert logger.end_index == doc_length(service.text(logger.doc_id)) + 1
+    assert service.calls['get'] == 1
+    assert logger.dropped == 0
+
+
+def test_write_resyncs_after_an_edit_elsewhere():
+    service = LocalDocsService()
+    logger = GoogleDocsLogger(service=service, background=False)
+    logger.log("first")
+    # someone else deletes the document body; the tracked end index is now past its end
+    service.docs[logger.doc_id] = "\n"
+    logger.log("second")
+
+    assert logged_lines(service, logger) == ["second"]
+    assert logger.dropped == 0
+
+
+def test_write_is_not_repeated_when_only_the_response_was_lost():
+    service = LostResponseService()
+    logger = GoogleDocsLogger(service=service, background=False)
+    service.lose_next = True
+    logger.log("once")
+    logger.log("twice")
+
+    assert logged_lines(service, logger) == ["once", "twice"]
+    assert logger.batches == 2
+    assert logger.dropped == 0
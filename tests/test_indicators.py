@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+Sdf = pytest.importorskip("stockstats").StockDataFrame
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from tutorials.utils.broker_simulator import synthetic_bars  # noqa: E402
+from tutorials.utils.indicators import IncrementalIndicatorEngine  # noqa: E402
+
+# finrl.config.INDICATORS, then other windows of the same families
+INDICATORS = ["macd", "boll_ub", "boll_lb", "rsi_30", "cci_30", "dx_30", "close_30_sma", "close_60_sma",
+              "rsi_14", "cci_14", "dx_14", "close_5_sma"]
+TICKERS = ["AAA", "BBB", "CCC"]
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_bars(TICKERS, n_bars=400, seed=7, volatility=0.01)
+
+
+@pytest.fixture(scope="module")
+def incremental(bars):
+    """Indicator values after every bar, shape (T, n_tickers, n_indicators)."""
+    engine = IncrementalIndicatorEngine(len(TICKERS), INDICATORS)
+    return np.array([engine.update(bars.high[t], bars.low[t], bars.close[t]).copy() for t in range(len(bars))])
+
+
+def stockstats_column(bars, j, name):
+    """Compute an indicator for one ticker the way FinRL's FeatureEngineer does."""
+    df = pd.DataFrame({"open": bars.open[:, j], "high": bars.high[:, j], "low": bars.low[:, j],
+                       "close": bars.close[:, j], "volume": bars.volume[:, j]})
+    return np.asarray(Sdf.retype(df)[name], dtype=float)
+
+
+@pytest.mark.parametrize("name", INDICATORS)
+def test_incremental_indicators_match_stockstats(bars, incremental, name):
+    k = INDICATORS.index(name)
+    for j in range(len(TICKERS)):
+        expected = stockstats_column(bars, j, name)
+        # stockstats leaves the std of a single bar undefined (NaN); compare every bar it defines
+        defined = np.isfinite(expected)
+        assert defined[1:].all()
+        np.testing.assert_allclose(incremental[defined, j, k], expected[defined], rtol=1e-9, atol=1e-9)
@@ -0,0 +1,116 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip("finrl")
+pytest.importorskip("alpaca_trade_api")
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from tutorials.utils.broker_simulator import SimulatedBroker, synthetic_bars  # noqa: E402
+from tutorials.utils.live_trading import LivePaperTradingAlpaca  # noqa: E402
+from tutorials.utils.state_schema import StateSchema  # noqa: E402
+
+TICKERS = ["AAA", "BBB"]
+INDICATORS = ["macd"]
+N_BARS = 6
+CASH = 100_000.0
+
+
+class ScriptedModel:
+    """Buys on the first cycle, sells part of it on the second and holds afterwards."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, state, *args, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            return np.array([50.0, 30.0]), None
+        if self.calls == 2:
+            return np.array([-20.0, 0.0]), None
+        return np.zeros(len(TICKERS)), None
+
+
+class BrokerMarketData:
+    """Market data source reading the simulator's current bar, without indicators or turbulence."""
+
+    def __init__(self, broker):
+        self.broker = broker
+
+    def latest(self, tickers, **kwargs):
+        price = self.broker.current_prices()[[self.broker.bars.index[t] for t in tickers]]
+        return price, np.zeros(len(tickers) * len(INDICATORS)), np.zeros(1)
+
+
+class RecordingJournal:
+    def __init__(self):
+        self.cycles = []
+        self.closed = False
+
+    def record_cycle(self, state, action, plan, results, **kwargs):
+        self.cycles.append((plan.orders(), [r.ok for r in results]))
+
+    def close(self):
+        self.closed = True
+
+
+def make_trader(broker, journal):
+    return LivePaperTradingAlpaca(
+        ticker_list=TICKERS,
+        time_interval="1Min",
+        drl_lib="stable_baselines3",
+        agent="ppo",
+        cwd=None,
+        net_dim=[64, 64],
+        state_dim=StateSchema(len(TICKERS), len(INDICATORS)).size,
+        action_dim=len(TICKERS),
+        API_KEY="test",
+        API_SECRET="test",
+        API_BASE_URL="http://localhost",
+        tech_indicator_list=INDICATORS,
+        market_data=BrokerMarketData(broker),
+        model=ScriptedModel(),
+        broker=broker,
+        journal=journal,
+    )
+
+
+@pytest.fixture
+def broker():
+    return SimulatedBroker(synthetic_bars(TICKERS, n_bars=N_BARS, seed=1), cash=CASH)
+
+
+def test_replay_trades_scripted_actions(broker):
+    journal = RecordingJournal()
+    trader = make_trader(broker, journal)
+    trader.run()
+
+    close = broker.bars.close
+    # the first cycle trades at the close of the first bar, the second at the close of the second
+    expected_cash = CASH - 50 * close[0, 0] - 30 * close[0, 1] + 20 * close[1, 0]
+    assert broker.positions == {"AAA": 30, "BBB": 30}
+    assert broker.cash == pytest.approx(expected_cash)
+    assert float(broker.get_account().cash) == pytest.approx(expected_cash)
+    assert trader.cash == pytest.approx(expected_cash)
+    assert [o.side for o in broker.orders] == ["buy", "buy", "sell"]
+    assert all(o.client_order_id for o in broker.orders)
+
+    # one cycle per bar until the last one, which is too close to the end of the session
+    assert trader.model.calls == N_BARS - 1
+    assert len(trader.equities) == N_BARS - 1
+    assert journal.cycles[0] == ([(50, "AAA", "buy"), (30, "BBB", "buy")], [True, True])
+    assert journal.closed
+
+
+def test_run_stops_when_the_replay_is_used_up(broker):
+    journal = RecordingJournal()
+    trader = make_trader(broker, journal)
+    broker.sleep(N_BARS * 60)
+
+    # get_clock raises ReplayFinished instead of waiting for a session there is no data for
+    trader.run()
+    assert trader.model.calls == 0
+    assert broker.orders == []
+    assert journal.closed
@@ -0,0 +1,93 @@
+import gzip
+import os
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'main', 'scraping'))
+from rss_feed_streamer import FeedState, MultiFeedStreamer, SeenSet, fetch  # noqa: E402
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>fixture</title>
+<item><guid>post-1</guid><title>$TSLA up</title><link>http://example.com/1</link></item>
+<item><guid>post-2</guid><title>$AAPL down</title><link>http://example.com/2</link></item>
+</channel></rss>"""
+ETAG = '"v1"'
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        encoding = self.path.strip("/")
+        body = {"gzip": gzip.compress, "deflate": zlib.compress}.get(encoding, lambda b: b)(FEED)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("ETag", ETAG)
+        if encoding in ("gzip", "deflate"):
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}/{path}"
+
+
+@pytest.mark.parametrize("encoding", ["plain", "gzip", "deflate"])
+def test_fetch_parses_plain_and_compressed_feeds(server, encoding):
+    feed = FeedState(url(server, encoding))
+    parsed = fetch(feed)
+    assert [entry.id for entry in parsed.entries] == ["post-1", "post-2"]
+    assert feed.etag == ETAG
+
+
+def test_fetch_returns_none_on_304(server):
+    feed = FeedState(url(server, "gzip"))
+    assert len(fetch(feed).entries) == 2
+    assert fetch(feed) is None
+    assert server.requests[-1]["If-None-Match"] == ETAG
+
+
+def test_streamer_reports_each_entry_once(server):
+    streamer = MultiFeedStreamer([url(server, "plain"), url(server, "gzip")], check_interval=60, max_workers=2)
+    try:
+        first = streamer.poll_once(timeout=10)
+        assert sorted(entry.id for _, entry in first) == ["post-1", "post-2"]
+        assert streamer.poll_once(timeout=10) == []
+        assert all(feed.not_modified == 1 for feed in streamer.feeds)
+    finally:
+        streamer.close()
+
+
+def test_seen_set_keeps_ids_still_in_the_feed():
+    seen = SeenSet(window=100)
+    assert seen.add("post-1", now=0)
+    assert seen.add("post-2", now=0)
+    # post-1 is still in the feed at every poll; post-2 dropped out
+    for now in (60, 120, 180, 240):
+        assert not seen.add("post-1", now=now)
+    assert "post-1" in seen
+    assert "post-2" not in seen
+    assert seen.add("post-2", now=240)
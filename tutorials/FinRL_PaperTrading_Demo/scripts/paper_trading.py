@@ -6,8 +6,11 @@ from finrl.config import INDICATORS
 from finrl.config_tickers import DOW_30_TICKER
 from pandas.tseries.offsets import BDay
 import os
+import sys
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.append(ROOT_DIR)
+from tutorials.utils.state_schema import StateSchema
 CONFIG_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PaperTrading_Demo/config.json')
 MODEL_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PaperTrading_Demo/papertrading_erl_retrain')
 
@@ -37,7 +40,7 @@ ERL_PARAMS = {
 
 # Calculate state_dim based on formula in config
 action_dim = len(ticker_list)
-state_dim = eval(config["training"]["state_dim_formula"].replace("action_dim", str(action_dim)).replace("INDICATORS", "INDICATORS"))
+state_dim = StateSchema.from_config(config, INDICATORS).size
 
 # Set up Paper Trading
 paper_trading_erl = PaperTradingAlpaca(
@@ -1,7 +1,6 @@
 import json
 import builtins
 from stable_baselines3 import A2C
-from finrl.meta.paper_trading.alpaca import PaperTradingAlpaca
 from finrl.config import INDICATORS
 import os
 import sys
@@ -9,6 +8,10 @@ import numpy as np
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
 sys.path.append(ROOT_DIR)
 from tutorials.utils.observation_wrapper import ObservationReshapeWrapper
+from tutorials.utils.live_trading import LivePaperTradingAlpaca
+from tutorials.utils.metrics import configure_from_env, metrics
+from tutorials.utils.order_planner import plan_orders
+from tutorials.utils.state_schema import StateSchema
 
 CONFIG_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_Explainable_DRL/config.json')
 MODEL_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_Explainable_DRL/models/trained_a2c.zip')
@@ -17,6 +20,9 @@ MODEL_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_Explain
 with open(CONFIG_PATH, 'r') as f:
     config = json.load(f)
 
+# Export per-stage timings when PAPER_TRADING_METRICS_PORT or PAPER_TRADING_METRICS_FILE is set
+configure_from_env(labels={"strategy": "explainable_drl_a2c"})
+
 # API Keys
 TRADING_API_KEY = config["alpaca"]["trading_api_key"]
 TRADING_API_SECRET = config["alpaca"]["trading_api_secret"]
@@ -26,28 +32,35 @@ TRADING_API_BASE_URL = config["alpaca"]["trading_api_base_url"]
 ticker_list = config["training"]["ticker_list"]
 time_interval = config["training"]["time_interval"]
 action_dim = len(ticker_list)
-state_dim = eval(config["training"]["state_dim_formula"].replace("action_dim", str(action_dim)).replace("INDICATORS", "INDICATORS"))
+state_dim = StateSchema.from_config(config, INDICATORS).size
 
 # A2C Paper Trading
 a2c_model = A2C.load(MODEL_PATH)
 print("A2C model loaded successfully!")
 
-# Wrap the model with our observation reshaper
-wrapped_model = ObservationReshapeWrapper(a2c_model)
+# Wrap the model with our observation reshaper; the state is zero-padded to the model's observation shape
+wrapped_model = ObservationReshapeWrapper(a2c_model, state_dim, allow_padding=True)
 
-class CustomPaperTradingAlpaca(PaperTradingAlpaca):
+class CustomPaperTradingAlpaca(LivePaperTradingAlpaca):
     def __init__(self, wrapped_model, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.model = wrapped_model
         
-    def trade(self):    
+    def trade(self):
+        with metrics.timer("cycle"):
+            self.trade_cycle()
+        metrics.increment("cycles")
+
+    def trade_cycle(self):
         state = self.get_state()
-        print("\n=== Trading Cycle Start ===")
-        print(f"Current State Shape: {state.shape}")
-        print(f"Current State Values: {state}")
+        with metrics.timer("log"):
+            print("\n=== Trading Cycle Start ===")
+            print(f"Current State Shape: {state.shape}")
+            print(f"Current State Values: {state}")
 
         # Get model prediction and scale it
-        action = self.model.predict(state)[0]
+        with metrics.timer("predict"):
+            action = self.model.predict(state)[0]
         # Scale actions from [0,1] to [-100,100] range
         scaled_action = (action * 200) - 100
         scaled_action = scaled_action[:len(self.stockUniverse)]  # Only take first 4 values for our stocks
@@ -65,59 +78,21 @@ class CustomPaperTradingAlpaca(PaperTradingAlpaca):
         self.stocks_cd += 1
         if self.turbulence_bool == 0:
             min_action = 10  # stock_cd
-            
-            # Check sell conditions
-            sell_indices = np.where(scaled_action < -min_action)[0]
-            print(f"\nPotential Sell Opportunities: {sell_indices}")
-            for index in sell_indices:
-                sell_num_shares = min(self.stocks[index], -scaled_action[index])
-                qty = abs(int(sell_num_shares))
-                ticker = self.stockUniverse[index]
-                print(f"\nSell Analysis for {ticker}:")
-                print(f"- Current Holdings: {self.stocks[index]}")
-                print(f"- Sell Action Value: {scaled_action[index]}")
-                print(f"- Calculated Sell Quantity: {qty}")
-                
-                if qty > 0:
-                    print(f"Executing sell order for {qty} shares of {ticker}")
-                    respSO = []
-                    self.submitOrder(qty, ticker, "sell", respSO)
-                    print(f"Sell order response: {respSO}")
-                    self.cash = float(self.alpaca.get_account().cash)
-                    self.stocks_cd[index] = 0
-                else:
-                    print(f"Skipping sell for {ticker} due to zero quantity")
+            print(f"\nPotential Sell Opportunities: {np.where(scaled_action < -min_action)[0]}")
+            print(f"Potential Buy Opportunities: {np.where(scaled_action > min_action)[0]}")
+
+            # Plan every sell and buy of this cycle against a local cash ledger, then submit them concurrently
+            with metrics.timer("plan"):
+                plan = plan_orders(self.stockUniverse, scaled_action, self.stocks, self.price, self.cash, min_action=min_action,
+                                   fund_with_sales=False)
+            print(f"Planned Orders: {plan.orders()}")
+            print(f"Expected Cash After Orders: ${plan.cash_after:.2f}")
 
-            # Check buy conditions
-            buy_indices = np.where(scaled_action > min_action)[0]
-            print(f"\nPotential Buy Opportunities: {buy_indices}")
-            for index in buy_indices:
-                if self.cash < 0:
-                    tmp_cash = 0
-                else:
-                    tmp_cash = self.cash
-                    
-                buy_num_shares = min(
-                    tmp_cash // self.price[index], abs(int(scaled_action[index]))
-                )
-                qty = abs(int(buy_num_shares))
-                ticker = self.stockUniverse[index]
-                
-                print(f"\nBuy Analysis for {ticker}:")
-                print(f"- Available Cash: ${tmp_cash:.2f}")
-                print(f"- Stock Price: ${self.price[index]:.2f}")
-                print(f"- Buy Action Value: {scaled_action[index]}")
-                print(f"- Calculated Buy Quantity: {qty}")
-                
-                if qty > 0:
-                    print(f"Executing buy order for {qty} shares of {ticker}")
-                    respSO = []
-                    self.submitOrder(qty, ticker, "buy", respSO)
-                    print(f"Buy order response: {respSO}")
-                    self.cash = float(self.alpaca.get_account().cash)
-                    self.stocks_cd[index] = 0
-                else:
-                    print(f"Skipping buy for {ticker} due to zero quantity or insufficient funds")
+            results = self.execute_plan(plan)
+            for result in results:
+                print(f"{result.side.capitalize()} order for {result.qty} shares of {result.ticker}: {result.status}")
+            self.record_cycle(state, scaled_action, plan, results)
+            print(f"Cash After Orders: ${self.cash:.2f}")
         else:
             print("\nTurbulence detected. Skipping trades to avoid risk.")
             
@@ -138,7 +113,9 @@ paper_trading_a2c = CustomPaperTradingAlpaca(
     API_BASE_URL=TRADING_API_BASE_URL,
     tech_indicator_list=INDICATORS,
     turbulence_thresh=config["trading"]["turbulence_thresh"],
-    max_stock=config["trading"]["max_stock"]
+    max_stock=config["trading"]["max_stock"],
+    incremental_indicators=True,
+    strategy="explainable_drl_a2c"
 )
 
 # Run A2C paper trading
@@ -3,8 +3,11 @@ from stable_baselines3 import DDPG
 from finrl.meta.paper_trading.alpaca import PaperTradingAlpaca
 from finrl.config import INDICATORS
 import os
+import sys
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
+sys.path.append(ROOT_DIR)
+from tutorials.utils.state_schema import StateSchema
 CONFIG_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_NeurIPS_2020/config.json')
 MODEL_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_PortfolioAllocation_NeurIPS_2020/models/trained_ddpg.zip')
 
@@ -21,7 +24,7 @@ TRADING_API_BASE_URL = config["alpaca"]["trading_api_base_url"]
 ticker_list = config["training"]["ticker_list"]
 time_interval = config["training"]["time_interval"]
 action_dim = len(ticker_list)
-state_dim = eval(config["training"]["state_dim_formula"].replace("action_dim", str(action_dim)).replace("INDICATORS", "INDICATORS"))
+state_dim = StateSchema.from_config(config, INDICATORS).size
 
 # DDPG Paper Trading
 ddpg_model = DDPG.load(MODEL_PATH)
@@ -1,12 +1,13 @@
 import json
 from stable_baselines3 import A2C
-from finrl.meta.paper_trading.alpaca import PaperTradingAlpaca
 from finrl.config import INDICATORS
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../')))
 from tutorials.google_docs_logger import GoogleDocsLogger
-import numpy as np
+from tutorials.utils.live_trading import LivePaperTradingAlpaca
+from tutorials.utils.metrics import configure_from_env, metrics
+from tutorials.utils.state_schema import StateSchema
 
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..'))
 CONFIG_PATH = os.path.join(ROOT_DIR, 'tutorials/FinRL_StockTrading_Fundamental/config.json')
@@ -21,6 +22,9 @@ with open(CONFIG_PATH, 'r') as f:
     config = json.load(f)
 logger.log(f"Loaded configuration from {CONFIG_PATH}", level='INFO')
 
+# Export per-stage timings when PAPER_TRADING_METRICS_PORT or PAPER_TRADING_METRICS_FILE is set
+configure_from_env(labels={"strategy": "fundamental_a2c"})
+
 # API Keys
 TRADING_API_KEY = config["alpaca"]["trading_api_key"]
 TRADING_API_SECRET = config["alpaca"]["trading_api_secret"]
@@ -30,7 +34,7 @@ TRADING_API_BASE_URL = config["alpaca"]["trading_api_base_url"]
 ticker_list = config["training"]["ticker_list"]
 time_interval = config["training"]["time_interval"]
 action_dim = len(ticker_list)
-state_dim = eval(config["training"]["state_dim_formula"].replace("action_dim", str(action_dim)).replace("INDICATORS", "INDICATORS"))
+state_dim = StateSchema.from_config(config, INDICATORS).size
 
 logger.log(f"Trading parameters: Tickers={ticker_list}, Time Interval={time_interval}, Action Dimension={action_dim}, State Dimension={state_dim}", level='INFO')
 
@@ -42,7 +46,7 @@ except Exception as e:
     logger.log(f"Error loading A2C model: {str(e)}", level='ERROR')
     raise
 
-paper_trading_a2c = PaperTradingAlpaca(
+paper_trading_a2c = LivePaperTradingAlpaca(
     ticker_list=ticker_list,
     time_interval=time_interval,
     drl_lib="stable_baselines3",
@@ -56,7 +60,9 @@ paper_trading_a2c = PaperTradingAlpaca(
     API_BASE_URL=TRADING_API_BASE_URL,
     tech_indicator_list=INDICATORS,
     turbulence_thresh=config["trading"]["turbulence_thresh"],
-    max_stock=config["trading"]["max_stock"]
+    max_stock=config["trading"]["max_stock"],
+    incremental_indicators=True,
+    strategy="fundamental_a2c"
 )
 
 # Override the run method to include logging
@@ -82,61 +88,50 @@ def run_with_logging(self):
         raise
 
 # Override the trade method to include logging
-original_trade = paper_trading_a2c.trade
 def trade_with_logging(self):
+    with metrics.timer("cycle"):
+        trade_cycle_with_logging(self)
+    metrics.increment("cycles")
+
+def trade_cycle_with_logging(self):
     state = self.get_state()
-    logger.log(f"Current state: {state}", level='INFO')
+    with metrics.timer("log"):
+        logger.log(f"Current state: {state}", level='INFO')
     
     try:
-        action = self.model.predict(state)[0]
-        logger.log(f"Model predicted action: {action}", level='INFO')
-        
-        if self.turbulence_bool == 0:
-            min_action = 10
-            # Log sell actions
-            for index in np.where(action < -min_action)[0]:
-                sell_num_shares = min(self.stocks[index], -action[index])
-                qty = abs(int(sell_num_shares))
-                if qty > 0:
-                    logger.log_trade(
-                        action_type='SELL',
-                        symbol=self.stockUniverse[index],
-                        quantity=qty,
-                        price=self.price[index],
-                        status='PENDING'
-                    )
-            
-            # Log buy actions
-            for index in np.where(action > min_action)[0]:
-                if self.cash < 0:
-                    tmp_cash = 0
-                else:
-                    tmp_cash = self.cash
-                buy_num_shares = min(tmp_cash // self.price[index], abs(int(action[index])))
-                qty = abs(int(buy_num_shares))
-                if qty > 0:
-                    logger.log_trade(
-                        action_type='BUY',
-                        symbol=self.stockUniverse[index],
-                        quantity=qty,
-                        price=self.price[index],
-                        status='PENDING'
-                    )
-        else:
-            logger.log("Turbulence detected. Skipping trades to avoid risk.", level='WARNING')
+        action = self.predict_action(state)
+        with metrics.timer("log"):
+            logger.log(f"Model predicted action: {action}", level='INFO')
         
-        # Execute the original trade method
-        original_trade()
+        # Plan the whole cycle once; the same plan is logged and then submitted
+        plan = self.plan(action)
+        with metrics.timer("log"):
+            if self.turbulence_bool != 0:
+                logger.log("Turbulence detected. Liquidating positions to avoid risk.", level='WARNING')
+            for qty, ticker, side in plan.orders():
+                logger.log_trade(
+                    action_type=side.upper(),
+                    symbol=ticker,
+                    quantity=qty,
+                    price=self.price[self.stockUniverse.index(ticker)],
+                    status='PENDING'
+                )
+
+        self.stocks_cd += 1
+        results = self.execute_plan(plan)
+        self.record_cycle(state, action, plan, results)
         
         # Log updated portfolio status
-        account = self.alpaca.get_account()
-        positions = self.alpaca.list_positions()
+        with metrics.timer("account_refresh"):
+            account = self.alpaca.get_account()
+            positions = self.alpaca.list_positions()
         portfolio = {pos.symbol: {'quantity': float(pos.qty), 'price': float(pos.current_price)} for pos in positions}
-        logger.log_portfolio(
-            cash=float(account.cash),
-            positions=portfolio,
-            equity=float(account.equity)
-        )
+        with metrics.timer("log"):
+            logger.log_portfolio(
+                cash=float(account.cash),
+                positions=portfolio,
+                equity=float(account.equity)
+            )
         
     except Exception as e:
         logger.log(f"Error during trading: {str(e)}", level='ERROR')
@@ -148,5 +143,8 @@ paper_trading_a2c.trade = trade_with_logging.__get__(paper_trading_a2c)
 # Run A2C paper trading
 paper_trading_a2c.run()
 
+# Write the log lines still queued for the doc
+logger.close()
+
 # Log the Google Doc URL
 print(f"Trading logs are being written to: {logger.get_doc_url()}")
@@ -1,30 +1,63 @@
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import atexit
 import os.path
 import pickle
+import queue
+import threading
+import time
 from datetime import datetime
-import json
+
+LEVEL_COLORS = {
+    'ERROR': {'red': 1, 'green': 0, 'blue': 0},
+    'WARNING': {'red': 1, 'green': 0.5, 'blue': 0},
+    'TRADE': {'red': 0, 'green': 0.5, 'blue': 0},
+}
+
+
+def doc_length(text):
+    """Length of text in Google Docs indices, which count UTF-16 code units."""
+    return len(text.encode('utf-16-le')) // 2
+
 
 class GoogleDocsLogger:
-    def __init__(self, doc_id=None, credentials_path='credentials.json'):
+    def __init__(self, doc_id=None, credentials_path='credentials.json', service=None, flush_interval=2.0,
+                 max_batch=500, max_queue=10000, background=True):
         """
         Initialize the Google Docs Logger.
         
         Args:
             doc_id (str): The ID of the Google Doc to write to. If None, a new doc will be created.
             credentials_path (str): Path to the Google API credentials file.
+            service: Docs API service to use instead of authenticating, e.g. an in-memory fake in tests.
+            flush_interval (float): Seconds the background writer collects messages into one batchUpdate.
+            max_batch (int): Maximum number of messages per batchUpdate.
+            max_queue (int): Messages held before new ones are dropped rather than blocking log().
+            background (bool): Write from a background thread. When False, log() writes immediately.
         """
         self.doc_id = doc_id
         self.credentials_path = credentials_path
-        self.service = self._get_service()
+        self.service = service or self._get_service()
         if not doc_id:
             self.doc_id = self._create_doc()
             self._initialize_doc()
+        # the end of the doc is tracked locally so writes need no documents().get first
+        self.end_index = self._fetch_end_index()
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batches = 0
+        self.dropped = 0
+        self.thread = None
+        if background:
+            self.thread = threading.Thread(target=self._run_writer, name="google-docs-logger", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
     
     def _get_service(self):
         """Get the Google Docs service with proper authentication."""
+        from google.auth.transport.requests import Request
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        from googleapiclient.discovery import build
+
         SCOPES = ['https://www.googleapis.com/auth/documents']
         creds = None
         
@@ -53,6 +86,11 @@ class GoogleDocsLogger:
         title = f'Paper Trading Log - {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
         doc = self.service.documents().create(body={'title': title}).execute()
         return doc.get('documentId')
+
+    def _fetch_end_index(self):
+        """Read the current end index of the document body from the API."""
+        doc = self.service.documents().get(documentId=self.doc_id).execute()
+        return doc['body']['content'][-1]['endIndex']
     
     def _initialize_doc(self):
         """Initialize the document with headers and formatting."""
@@ -81,72 +119,131 @@ class GoogleDocsLogger:
     
     def log(self, message, level='INFO'):
         """
-        Append a message to the Google Doc with timestamp and log level.
-        
+        Queue a message for the Google Doc with timestamp and log level.
+
+        Returns immediately; the background writer appends queued messages in one
+        batchUpdate per flush interval.
+
         Args:
             message (str): The message to log.
             level (str): Log level (INFO, WARNING, ERROR, TRADE)
         """
-        # Get the current document
-        doc = self.service.documents().get(documentId=self.doc_id).execute()
-        
-        # Get the end of the document
-        end_index = doc['body']['content'][-1]['endIndex']
-        
-        # Format the log message
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         formatted_message = f"\n{timestamp} [{level}] - {message}"
-        
-        # Prepare the request to insert text
+        if self.thread is None:
+            self._write([(formatted_message, level)])
+            return
+        try:
+            self.queue.put_nowait((formatted_message, level))
+        except queue.Full:
+            # never block the trading thread on a slow or unreachable Docs API
+            self.dropped += 1
+
+    def _build_requests(self, entries):
+        """Coalesce entries into one insertText at the end of the doc plus their color ranges."""
+        text = "".join(formatted_message for formatted_message, _ in entries)
+        start_index = self.end_index - 1
         requests = [
             {
                 'insertText': {
-                    'location': {'index': end_index - 1},
-                    'text': formatted_message
+                    'location': {'index': start_index},
+                    'text': text
                 }
             }
         ]
-        
-        # Add formatting based on log level
-        if level == 'ERROR':
-            requests.append({
-                'updateTextStyle': {
-                    'range': {
-                        'startIndex': end_index - 1,
-                        'endIndex': end_index - 1 + len(formatted_message)
-                    },
-                    'textStyle': {'foregroundColor': {'color': {'rgbColor': {'red': 1, 'green': 0, 'blue': 0}}}},
-                    'fields': 'foregroundColor'
-                }
-            })
-        elif level == 'WARNING':
-            requests.append({
-                'updateTextStyle': {
-                    'range': {
-                        'startIndex': end_index - 1,
-                        'endIndex': end_index - 1 + len(formatted_message)
-                    },
-                    'textStyle': {'foregroundColor': {'color': {'rgbColor': {'red': 1, 'green': 0.5, 'blue': 0}}}},
-                    'fields': 'foregroundColor'
-                }
-            })
-        elif level == 'TRADE':
-            requests.append({
-                'updateTextStyle': {
-                    'range': {
-                        'startIndex': end_index - 1,
-                        'endIndex': end_index - 1 + len(formatted_message)
-                    },
-                    'textStyle': {'foregroundColor': {'color': {'rgbColor': {'red': 0, 'green': 0.5, 'blue': 0}}}},
-                    'fields': 'foregroundColor'
-                }
-            })
-        
-        # Execute the request
-        self.service.documents().batchUpdate(
-            documentId=self.doc_id,
-            body={'requests': requests}
-        ).execute()
+        offset = start_index
+        for formatted_message, level in entries:
+            length = doc_length(formatted_message)
+            if level in LEVEL_COLORS:
+                requests.append({
+                    'updateTextStyle': {
+                        'range': {
+                            'startIndex': offset,
+                            'endIndex': offset + length
+                        },
+                        'textStyle': {'foregroundColor': {'color': {'rgbColor': LEVEL_COLORS[level]}}},
+                        'fields': 'foregroundColor'
+                    }
+                })
+            offset += length
+        return requests, doc_length(text)
+
+    def _write(self, entries):
+        """
+        Append entries with one batchUpdate, re-reading the end index once if the write fails.
+
+        A failed request may still have been applied (e.g. the response was lost). When the
+        re-read end index is exactly where the batch would have left it, the lines are taken
+        as written instead of being appended a second time.
+        """
+        for attempt in range(2):
+            requests, length = self._build_requests(entries)
+            try:
+                self.service.documents().batchUpdate(
+                    documentId=self.doc_id,
+                    body={'requests': requests}
+                ).execute()
+                self.end_index += length
+                self.batches += 1
+                return True
+            except Exception as e:
+                print(f"Google Docs write of {len(entries)} log lines failed: {e}")
+                if attempt == 0:
+                    # the doc may have been edited elsewhere; resync the tracked end index
+                    try:
+                        end_index = self._fetch_end_index()
+                    except Exception:
+                        continue
+                    if end_index == self.end_index + length:
+                        self.end_index = end_index
+                        self.batches += 1
+                        return True
+                    self.end_index = end_index
+        self.dropped += len(entries)
+        return False
+
+    def _run_writer(self):
+        """Background writer: wait for a message, collect everything queued within the flush interval, write once."""
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                self.queue.task_done()
+                return
+            entries = [entry]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(entries) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stop = True
+                    break
+                entries.append(entry)
+            self._write(entries)
+            for _ in range(len(entries) + stop):
+                self.queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every queued message has been written (or dropped)."""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self):
+        """Write what is queued and stop the background writer."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        if self.dropped:
+            print(f"Google Docs logger dropped {self.dropped} log lines.")
     
     def log_trade(self, action_type, symbol, quantity, price=None, status=None):
         """
@@ -186,3 +283,4 @@ class GoogleDocsLogger:
     def get_doc_url(self):
         """Get the URL of the Google Doc."""
         return f'https://docs.google.com/document/d/{self.doc_id}'
+
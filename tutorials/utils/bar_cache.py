@@ -0,0 +1,303 @@
+import fcntl
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from tutorials.utils.broker_simulator import BarData, Record
+
+'''
+Local cache of historical bars, one directory per interval and ticker:
+
+    {directory}/{interval}/{ticker}/bars.npy         t, open, high, low, close, volume records
+    {directory}/{interval}/{ticker}/manifest.json    time ranges already downloaded
+
+bars.npy is a plain structured .npy file opened with mmap_mode="r". Each column is a
+strided view of it, so a warmup window or a backtest range is a searchsorted plus a
+slice of the mapped file, with no parsing or copying. A merge rewrites the file beside
+the old one and renames it, so readers always see whole records.
+Before reading, the cache checks the manifest and downloads only the parts of the
+requested range it has not covered yet. A range that has no bars (a weekend, a
+holiday) is also recorded, so it is not requested again.
+
+Wrap a broker client in CachedBarsAPI, or set PAPER_TRADING_BAR_CACHE, to have
+get_bars (and so the indicator warmup) read through the cache.
+'''
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+BAR_DTYPE = np.dtype([("t", np.int64)] + [(name, np.float64) for name in COLUMNS])
+
+INTERVAL_SECONDS = {"1s": 1, "5s": 5, "1Min": 60, "5Min": 60 * 5, "15Min": 60 * 15, "1H": 3600, "1D": 86400,
+                    "1Day": 86400, "1Hour": 3600}
+
+
+def _to_ns(value):
+    """
+    Nanoseconds since epoch of an int, datetime, pandas Timestamp or ISO string; naive times are UTC.
+
+    The one conversion shared by the cache, the SimulatedBroker replay and the trade journal,
+    so their timestamps agree to the nanosecond.
+    """
+    import pandas as pd
+
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize("UTC")
+    return int(timestamp.value)
+
+
+def _merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Parts of [start, end] not inside any of the (sorted, merged) covered ranges."""
+    missing = []
+    cursor = start
+    for covered_start, covered_end in covered:
+        if covered_end < cursor:
+            continue
+        if covered_start > end:
+            break
+        if covered_start > cursor:
+            missing.append((cursor, covered_start))
+        cursor = max(cursor, covered_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class BarSeries:
+    def __init__(self, timestamps, columns):
+        """Bars of one ticker: int64 ns timestamps and float64 columns, usually read-only memmap views."""
+        self.timestamps = timestamps
+        self.columns = columns
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def to_frame(self):
+        """DataFrame indexed by timestamp, like alpaca_trade_api's get_bars(...).df."""
+        import pandas as pd
+
+        return pd.DataFrame({name: np.asarray(values) for name, values in self.columns.items()},
+                            index=pd.to_datetime(np.asarray(self.timestamps), utc=True).rename("timestamp"))
+
+
+class BarCache:
+    def __init__(self, directory, api=None):
+        """
+        Memory-mapped bar store that downloads missing ranges on demand.
+
+        Args:
+            directory (str): Root directory of the cache.
+            api: Broker client with get_bars(symbol, timeframe, start=, end=) returning an object
+                with a .df DataFrame (alpaca_trade_api.REST or SimulatedBroker). Without it only
+                cached bars are served.
+        """
+        self.directory = directory
+        self.api = api
+        self.lock = threading.Lock()
+        self.downloads = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls, api=None):
+        """Cache in PAPER_TRADING_BAR_CACHE when it is set, otherwise return None."""
+        directory = os.environ.get("PAPER_TRADING_BAR_CACHE")
+        if not directory:
+            return None
+        return cls(directory, api)
+
+    def _path(self, interval, ticker, name=None):
+        path = os.path.join(self.directory, interval, ticker)
+        return path if name is None else os.path.join(path, name)
+
+    def manifest(self, ticker, interval):
+        """Covered [start_ns, end_ns] ranges of a ticker, sorted and merged."""
+        try:
+            with open(self._path(interval, ticker, "manifest.json"), 'r') as f:
+                return json.load(f)["covered"]
+        except FileNotFoundError:
+            return []
+
+    def series(self, ticker, interval):
+        """Every cached bar of a ticker as memory-mapped columns (empty if nothing is cached)."""
+        path = self._path(interval, ticker, "bars.npy")
+        bars = np.zeros(0, dtype=BAR_DTYPE)
+        if os.path.exists(path):
+            try:
+                bars = np.load(path, mmap_mode="r")
+            except ValueError:
+                # an empty array cannot be memory-mapped
+                pass
+        return BarSeries(bars["t"], {name: bars[name] for name in COLUMNS})
+
+    def _now(self, interval):
+        """Start of the newest complete bar by the broker clock; later bars may still change."""
+        clock = getattr(self.api, "get_clock", None)
+        now = _to_ns(clock().timestamp) if clock is not None else time.time_ns()
+        return now - INTERVAL_SECONDS.get(interval, 60) * 1_000_000_000
+
+    def ensure(self, ticker, interval, start, end):
+        """Download the parts of [start, end] that are not cached yet. Returns the number of downloads."""
+        start, end = _to_ns(start), _to_ns(end)
+        if self.api is None or not missing_ranges(self.manifest(ticker, interval), start, end):
+            return 0
+        end = min(end, self._now(interval))
+        os.makedirs(self._path(interval, ticker), exist_ok=True)
+        # the file lock keeps strategies in other processes from merging the same ticker at once
+        with self.lock, open(self._path(interval, ticker, ".lock"), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            covered = self.manifest(ticker, interval)
+            gaps = [gap for gap in missing_ranges(covered, start, end) if gap[0] < gap[1]]
+            if not gaps:
+                return 0
+            frames = [self.api.get_bars(ticker, interval, start=_iso(gap_start), end=_iso(gap_end)).df
+                      for gap_start, gap_end in gaps]
+            self.downloads += len(gaps)
+            self._merge(ticker, interval, frames, covered + [list(gap) for gap in gaps])
+            return len(gaps)
+
+    def _merge(self, ticker, interval, frames, covered):
+        old = self.series(ticker, interval)
+        timestamps = [np.array(old.timestamps)]
+        columns = {name: [np.array(old.columns[name])] for name in COLUMNS}
+        for df in frames:
+            if "symbol" in df.columns:
+                df = df[df["symbol"] == ticker]
+            if len(df):
+                timestamps.append(df.index.asi8)
+                for name in COLUMNS:
+                    columns[name].append(df[name].to_numpy(dtype=np.float64))
+        timestamps = np.concatenate(timestamps)
+        # stable sort, then keep the newest download of a duplicated timestamp
+        order = np.argsort(timestamps, kind="stable")[::-1]
+        unique, first = np.unique(timestamps[order], return_index=True)
+        keep = order[first]
+        bars = np.empty(len(unique), dtype=BAR_DTYPE)
+        bars["t"] = unique
+        for name in COLUMNS:
+            bars[name] = np.concatenate(columns[name])[keep]
+        # bars first: a manifest that lags the bars only costs a repeated download
+        _save(self._path(interval, ticker, "bars.npy"), bars)
+        manifest = self._path(interval, ticker, "manifest.json")
+        with open(manifest + ".tmp", 'w') as f:
+            json.dump({"covered": _merge_ranges(covered)}, f)
+        os.replace(manifest + ".tmp", manifest)
+
+    def get(self, ticker, interval, start, end):
+        """Bars of a ticker with start <= timestamp <= end, downloading what is missing first."""
+        self.ensure(ticker, interval, start, end)
+        series = self.series(ticker, interval)
+        first = int(np.searchsorted(series.timestamps, _to_ns(start), side="left"))
+        last = int(np.searchsorted(series.timestamps, _to_ns(end), side="right"))
+        return BarSeries(series.timestamps[first:last],
+                         {name: values[first:last] for name, values in series.columns.items()})
+
+    def window(self, ticker, interval, end, n_bars, lookback_days=5):
+        """The last n_bars bars at or before end (zero-copy views of the mapped columns)."""
+        end_ns = _to_ns(end)
+        start_ns = end_ns - int(lookback_days * 86400 * 1e9)
+        series = self.get(ticker, interval, start_ns, end_ns)
+        return BarSeries(series.timestamps[-n_bars:],
+                         {name: values[-n_bars:] for name, values in series.columns.items()})
+
+    def bar_data(self, tickers, interval, start, end):
+        """Aligned BarData over the timestamps every ticker has, e.g. for a SimulatedBroker replay."""
+        series = [self.get(ticker, interval, start, end) for ticker in tickers]
+        timestamps = series[0].timestamps
+        for s in series[1:]:
+            timestamps = np.intersect1d(timestamps, s.timestamps)
+        rows = [np.searchsorted(s.timestamps, timestamps) for s in series]
+        fields = [np.column_stack([s.columns[name][r] for s, r in zip(series, rows)]) if len(timestamps)
+                  else np.zeros((0, len(tickers))) for name in COLUMNS]
+        return BarData(tickers, timestamps, *fields)
+
+    def history(self, tickers, interval, start, end):
+        """Long DataFrame (timestamp, tic, open, high, low, close, volume) like FinRL's downloaded data."""
+        import pandas as pd
+
+        frames = []
+        for ticker in tickers:
+            df = self.get(ticker, interval, start, end).to_frame().reset_index()
+            df.insert(1, "tic", ticker)
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True).sort_values(["timestamp", "tic"], ignore_index=True)
+
+
+def config_dates(config, period="test"):
+    """(start, end) of a config's dates section for "train", "test" or "full_train"; end covers the whole day."""
+    import pandas as pd
+
+    dates = config["dates"]
+    start = pd.Timestamp(dates[f"{period}_start_date"], tz="UTC")
+    end = pd.Timestamp(dates[f"{period}_end_date"], tz="UTC") + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    return start, end
+
+
+class CachedBarsAPI:
+    def __init__(self, api, cache):
+        """
+        Broker client whose get_bars reads through a BarCache; everything else goes to `api`.
+
+        A get_bars without end is served up to the broker clock, minus one bar so the bar
+        still forming is not cached as complete.
+        """
+        self.api = api
+        self.cache = cache
+        if cache.api is None:
+            cache.api = api
+
+    def get_bars(self, symbol, timeframe, start=None, end=None, limit=None, **kwargs):
+        import pandas as pd
+
+        if not isinstance(timeframe, str) or kwargs:
+            return self.api.get_bars(symbol, timeframe, start=start, end=end, limit=limit, **kwargs)
+        if end is None:
+            now = _to_ns(self.api.get_clock().timestamp)
+            end = now - INTERVAL_SECONDS.get(timeframe, 60) * 1_000_000_000
+        if start is None:
+            start = _to_ns(end) - 5 * 86400 * 1_000_000_000
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        frames = []
+        for s in symbols:
+            df = self.cache.get(s, timeframe, start, end).to_frame()
+            if limit is not None:
+                df = df.tail(limit)
+            df["symbol"] = s
+            frames.append(df)
+        return Record(df=pd.concat(frames) if len(frames) > 1 else frames[0])
+
+    def __getattr__(self, name):
+        return getattr(self.api, name)
+
+
+def _iso(ns):
+    import pandas as pd
+
+    return pd.Timestamp(ns, tz="UTC").isoformat()
+
+
+def _save(path, array):
+    tmp = path + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
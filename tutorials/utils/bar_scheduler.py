@@ -0,0 +1,140 @@
+import math
+import time
+
+from tutorials.utils.metrics import metrics
+
+'''
+Bar-aligned cycle scheduling with deadlines.
+PaperTradingAlpaca.run() sleeps a full interval after each cycle. Every cycle then
+starts a little later than the last, and strategies started together all hit the
+broker at the same moment. The scheduler instead starts cycle k at
+
+    bar boundary k + offset
+
+on the shared wall clock, so cycles do not drift. Strategies get different offsets
+(slots), which spreads their broker-heavy stages (bars, positions, account, orders)
+over the first seconds of the bar instead of all at the top of it. No coordination
+between processes is needed beyond each one knowing its slot.
+
+Each cycle has a deadline inside its bar. A cycle that cannot finish by the deadline
+does not submit its orders, because the prices it planned with belong to a bar that is
+already over. Nor does a cycle whose market data is older than the bar that closed at
+its boundary (LivePaperTradingAlpaca.stale_data). Misses, skipped bars and the slack left in each cycle are recorded in
+the metrics, and every miss is reported through `alert` (printed by default), loudly
+once misses repeat.
+'''
+
+
+class Cycle:
+    def __init__(self, bar_start, start, deadline, missed_bars=0):
+        """One scheduled cycle: bar start, planned start and deadline, all in clock seconds."""
+        self.bar_start = bar_start
+        self.start = start
+        self.deadline = deadline
+        self.missed_bars = missed_bars
+        self.started = None
+
+    def __repr__(self):
+        return f"Cycle(bar_start={self.bar_start}, start={self.start}, deadline={self.deadline})"
+
+
+class BarScheduler:
+    def __init__(self, interval_seconds, offset=0.0, deadline=None, clock=time.time, sleep=time.sleep, alert=None,
+                 max_consecutive_misses=3):
+        """
+        Start cycles at a fixed offset into every bar and check them against a deadline.
+
+        Args:
+            interval_seconds (float): Bar length.
+            offset (float): Seconds after each bar boundary the cycle starts.
+            deadline (float): Seconds after each bar boundary the cycle must be done by.
+                Defaults to 90% of the bar.
+            clock: Function returning the current time in seconds (the simulator's clock in replays).
+            sleep: Function sleeping a number of seconds.
+            alert: Function called with a message on every deadline miss. Defaults to print.
+            max_consecutive_misses (int): Misses in a row after which alerts escalate.
+        """
+        self.interval = float(interval_seconds)
+        self.offset = float(offset)
+        self.deadline = 0.9 * self.interval if deadline is None else float(deadline)
+        if not 0 <= self.offset < self.deadline <= self.interval:
+            raise ValueError(f"Need 0 <= offset ({self.offset}) < deadline ({self.deadline}) <= interval "
+                             f"({self.interval}).")
+        self.clock = clock
+        self.sleep = sleep
+        self.alert = alert or print
+        self.max_consecutive_misses = max_consecutive_misses
+        self.last_bar = None
+        self.misses = 0
+        self.consecutive_misses = 0
+
+    @classmethod
+    def for_slot(cls, interval_seconds, slot=0, n_slots=1, start_delay=None, stagger=None, deadline_fraction=0.9,
+                 **kwargs):
+        """
+        Scheduler for strategy `slot` of `n_slots` sharing a bar interval.
+
+        Args:
+            start_delay (float): Seconds after the boundary the first slot starts, so the bar that
+                just closed is available (default 5s, at most 10% of the bar: later than the
+                MarketDataHub's 2s publish delay plus its fetch).
+            stagger (float): Seconds between consecutive slots (default: up to 1s, spread over at
+                most a quarter of the bar).
+            deadline_fraction (float): Deadline as a fraction of the bar.
+        """
+        start_delay = min(5.0, 0.1 * interval_seconds) if start_delay is None else start_delay
+        if stagger is None:
+            stagger = min(1.0, 0.25 * interval_seconds / max(n_slots, 1))
+        return cls(interval_seconds, offset=start_delay + slot * stagger,
+                   deadline=deadline_fraction * interval_seconds, **kwargs)
+
+    def next_cycle(self, now=None):
+        """The next cycle to run: this bar's if its start has not passed its deadline yet, else the next bar's."""
+        now = self.clock() if now is None else now
+        bar_start = math.floor(now / self.interval) * self.interval
+        if now >= bar_start + self.deadline or (self.last_bar is not None and bar_start <= self.last_bar):
+            bar_start = max(bar_start, self.last_bar if self.last_bar is not None else bar_start) + self.interval
+        missed = 0
+        if self.last_bar is not None:
+            missed = max(int(round((bar_start - self.last_bar) / self.interval)) - 1, 0)
+        return Cycle(bar_start, bar_start + self.offset, bar_start + self.deadline, missed)
+
+    def wait(self):
+        """Sleep until the next cycle's start and return the cycle."""
+        cycle = self.next_cycle()
+        delay = cycle.start - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        cycle.started = self.clock()
+        self.last_bar = cycle.bar_start
+        metrics.observe("cycle_start_delay", max(cycle.started - cycle.start, 0.0))
+        if cycle.missed_bars:
+            metrics.increment("bars_missed", cycle.missed_bars)
+            self.alert(f"{cycle.missed_bars} bar(s) passed without a cycle before the bar at {cycle.bar_start:.0f}")
+        return cycle
+
+    def remaining(self, cycle, now=None):
+        """Seconds left until the cycle's deadline (negative once it has passed)."""
+        return cycle.deadline - (self.clock() if now is None else now)
+
+    def expired(self, cycle, now=None):
+        return self.remaining(cycle, now) <= 0
+
+    def finish(self, cycle, now=None):
+        """Record how a cycle ended against its deadline. Returns True when it met it."""
+        now = self.clock() if now is None else now
+        slack = cycle.deadline - now
+        metrics.observe("cycle_wall", now - (cycle.started if cycle.started is not None else cycle.start))
+        metrics.set_gauge("cycle_slack_seconds", slack)
+        if slack >= 0:
+            self.consecutive_misses = 0
+            metrics.set_gauge("deadline_consecutive_misses", 0)
+            return True
+        self.misses += 1
+        self.consecutive_misses += 1
+        metrics.increment("deadline_misses")
+        metrics.set_gauge("deadline_consecutive_misses", self.consecutive_misses)
+        level = "ALERT" if self.consecutive_misses >= self.max_consecutive_misses else "WARNING"
+        self.alert(f"{level}: cycle of the bar at {cycle.bar_start:.0f} missed its deadline by {-slack:.2f}s "
+                   f"({self.consecutive_misses} in a row, {self.misses} in total)")
+        return False
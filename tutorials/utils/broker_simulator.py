@@ -0,0 +1,285 @@
+import datetime
+import itertools
+import os
+
+import numpy as np
+
+'''
+Local stand-in for the Alpaca REST client used by PaperTradingAlpaca.
+It serves the account, positions, orders, clock and bars endpoints from recorded or
+synthetic bar files, fills market orders at the current bar's close and runs on a
+virtual clock, so a full trading day can be replayed in seconds without network.
+
+Set PAPER_TRADING_BARS to a bar file to run the tutorial scripts against it;
+PAPER_TRADING_SPEED sets the time acceleration (default: as fast as possible).
+'''
+
+
+class SimulatedAPIError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ReplayFinished(Exception):
+    """Raised by SimulatedBroker.get_clock once the replayed bars are used up; there is no next session."""
+
+
+class Record:
+    def __init__(self, **fields):
+        """Attribute bag mimicking the entity objects returned by alpaca_trade_api."""
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        return f"Record({self.__dict__})"
+
+
+class BarData:
+    def __init__(self, tickers, timestamps, open, high, low, close, volume):
+        """
+        Aligned bars for several tickers.
+
+        Args:
+            tickers (list): Ticker per column.
+            timestamps (np.ndarray): Bar start times as int64 nanoseconds since epoch, ascending.
+            open, high, low, close, volume (np.ndarray): (T, n_tickers) arrays.
+        """
+        self.tickers = list(tickers)
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.open = np.asarray(open, dtype=float)
+        self.high = np.asarray(high, dtype=float)
+        self.low = np.asarray(low, dtype=float)
+        self.close = np.asarray(close, dtype=float)
+        self.volume = np.asarray(volume, dtype=float)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def load_bar_file(path):
+    """Load bars from a CSV or Parquet file with timestamp, symbol, open, high, low, close, volume columns."""
+    import pandas as pd
+
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], utc=True)
+    fields = {}
+    for field in ["open", "high", "low", "close", "volume"]:
+        fields[field] = df.pivot_table(index="timestamp", columns="symbol", values=field).sort_index().ffill().dropna()
+    tickers = list(fields["close"].columns)
+    index = fields["close"].index
+    return BarData(
+        tickers,
+        index.asi8,
+        *[fields[field].loc[index, tickers].values for field in ["open", "high", "low", "close", "volume"]],
+    )
+
+
+def synthetic_bars(tickers, n_bars=390, start="2023-09-05 13:30", interval_seconds=60, seed=0,
+                   start_price=100.0, volatility=0.001):
+    """Generate geometric Brownian motion bars for one session (default: a 390 minute NYSE day)."""
+    rng = np.random.default_rng(seed)
+    n = len(tickers)
+    returns = rng.normal(0.0, volatility, size=(n_bars, n))
+    close = start_price * np.exp(np.cumsum(returns, axis=0))
+    open_price = np.vstack([np.full((1, n), start_price), close[:-1]])
+    spread = np.abs(rng.normal(0.0, volatility, size=(n_bars, n))) * close
+    high = np.maximum(open_price, close) + spread
+    low = np.minimum(open_price, close) - spread
+    volume = rng.integers(1_000, 100_000, size=(n_bars, n)).astype(float)
+    start_ns = int(np.datetime64(start, "ns").astype(np.int64))
+    timestamps = start_ns + np.arange(n_bars, dtype=np.int64) * interval_seconds * 1_000_000_000
+    return BarData(tickers, timestamps, open_price, high, low, close, volume)
+
+
+def _to_datetime(ns):
+    return datetime.datetime.fromtimestamp(ns / 1e9, tz=datetime.timezone.utc)
+
+
+class SimulatedBroker:
+    def __init__(self, bars, cash=100_000.0, interval_seconds=60, speed=None, warmup_bars=0, slippage=0.0):
+        """
+        Simulated Alpaca account trading over a BarData replay.
+
+        Args:
+            bars (BarData): Bars to replay. Also serves history for indicator warmup.
+            cash (float): Starting cash.
+            interval_seconds (int): Bar length.
+            speed (float): Time acceleration for sleep(); None sleeps no real time at all.
+            warmup_bars (int): Bars before the session start that are history only.
+            slippage (float): Fractional price penalty applied to every fill.
+        """
+        self.bars = bars
+        self.cash = float(cash)
+        self.last_equity = float(cash)
+        self.interval_ns = interval_seconds * 1_000_000_000
+        self.speed = speed
+        self.slippage = slippage
+        self.positions = {}
+        self.orders = []
+        self._ids = itertools.count(1)
+        self.session_open = int(bars.timestamps[min(warmup_bars, len(bars) - 1)])
+        self.session_close = int(bars.timestamps[-1]) + self.interval_ns
+        # the clock sits at the end of the first session bar so that bar is complete
+        self.now = self.session_open + self.interval_ns
+        self.api_calls = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a simulator from PAPER_TRADING_BARS / PAPER_TRADING_SPEED, or return None."""
+        path = os.environ.get("PAPER_TRADING_BARS")
+        if not path:
+            return None
+        speed = os.environ.get("PAPER_TRADING_SPEED")
+        return cls(load_bar_file(path), speed=float(speed) if speed else None)
+
+    def _count(self, name):
+        self.api_calls[name] = self.api_calls.get(name, 0) + 1
+
+    def _bar_index(self):
+        """Index of the last bar completed at the current virtual time."""
+        return max(int(np.searchsorted(self.bars.timestamps, self.now - self.interval_ns, side="right")) - 1, 0)
+
+    def current_prices(self):
+        return self.bars.close[self._bar_index()]
+
+    def sleep(self, seconds):
+        """Advance the virtual clock, sleeping real time only when a speed is set."""
+        if self.speed:
+            import time
+            time.sleep(seconds / self.speed)
+        self.now += int(seconds * 1_000_000_000)
+
+    def equity(self):
+        prices = self.current_prices()
+        return self.cash + sum(qty * prices[self.bars.index[symbol]] for symbol, qty in self.positions.items())
+
+    # --- alpaca_trade_api.REST compatible endpoints ---
+
+    def get_clock(self):
+        """
+        Market clock at the virtual time.
+
+        Raises:
+            ReplayFinished: At or after the end of the bars. A live clock would report the next
+                session's open, which the replay has no data for, so waiting for it would never end.
+        """
+        self._count("get_clock")
+        if self.now >= self.session_close:
+            raise ReplayFinished(f"Replay finished at {_to_datetime(self.session_close)}, the end of the bar data.")
+        is_open = self.session_open <= self.now < self.session_close
+        next_open = self.session_open if self.now < self.session_open else self.session_open + 86_400 * 1_000_000_000
+        return Record(
+            timestamp=_to_datetime(self.now),
+            is_open=is_open,
+            next_open=_to_datetime(next_open),
+            next_close=_to_datetime(self.session_close),
+        )
+
+    def get_account(self):
+        self._count("get_account")
+        equity = self.equity()
+        return Record(cash=str(self.cash), equity=str(equity), last_equity=str(self.last_equity),
+                      buying_power=str(max(self.cash, 0.0)), status="ACTIVE")
+
+    def list_positions(self):
+        self._count("list_positions")
+        prices = self.current_prices()
+        positions = []
+        for symbol, qty in self.positions.items():
+            price = prices[self.bars.index[symbol]]
+            positions.append(Record(symbol=symbol, qty=str(qty), side="long", current_price=str(price),
+                                    market_value=str(qty * price)))
+        return positions
+
+    def list_orders(self, status="open", **kwargs):
+        self._count("list_orders")
+        return [order for order in self.orders if status in ("all", order.status)]
+
+    def cancel_order(self, order_id):
+        self._count("cancel_order")
+        for order in self.orders:
+            if order.id == order_id and order.status == "open":
+                order.status = "canceled"
+
+    def submit_order(self, symbol, qty, side, type="market", time_in_force="day", client_order_id=None, **kwargs):
+        self._count("submit_order")
+        if client_order_id is not None and any(o.client_order_id == client_order_id for o in self.orders):
+            raise SimulatedAPIError("client_order_id must be unique", 422)
+        if symbol not in self.bars.index:
+            raise SimulatedAPIError(f"asset {symbol} not found", 422)
+        qty = int(qty)
+        price = self.current_prices()[self.bars.index[symbol]]
+        held = self.positions.get(symbol, 0)
+        if side == "buy":
+            price *= 1 + self.slippage
+            if qty * price > self.cash:
+                raise SimulatedAPIError("insufficient buying power", 403)
+            self.cash -= qty * price
+            self.positions[symbol] = held + qty
+        elif side == "sell":
+            price *= 1 - self.slippage
+            if qty > held:
+                raise SimulatedAPIError("insufficient qty available for order", 403)
+            self.cash += qty * price
+            self.positions[symbol] = held - qty
+            if self.positions[symbol] == 0:
+                del self.positions[symbol]
+        else:
+            raise SimulatedAPIError(f"invalid side {side}", 422)
+        order = Record(id=str(next(self._ids)), symbol=symbol, qty=str(qty), side=side, type=type,
+                       time_in_force=time_in_force, status="filled", filled_avg_price=str(price),
+                       submitted_at=_to_datetime(self.now), client_order_id=client_order_id)
+        self.orders.append(order)
+        return order
+
+    def get_order_by_client_order_id(self, client_order_id):
+        self._count("get_order_by_client_order_id")
+        for order in self.orders:
+            if order.client_order_id == client_order_id:
+                return order
+        raise SimulatedAPIError("order not found", 404)
+
+    def get_latest_bars(self, symbols):
+        self._count("get_latest_bars")
+        i = self._bar_index()
+        bars = {}
+        for symbol in symbols:
+            j = self.bars.index.get(symbol)
+            if j is None:
+                # symbols outside the replay (e.g. VIXY for turbulence) get a flat bar
+                bars[symbol] = Record(t=_to_datetime(self.bars.timestamps[i]), o=0.0, h=0.0, l=0.0, c=0.0, v=0.0)
+                continue
+            bars[symbol] = Record(t=_to_datetime(self.bars.timestamps[i]), o=self.bars.open[i, j],
+                                  h=self.bars.high[i, j], l=self.bars.low[i, j], c=self.bars.close[i, j],
+                                  v=self.bars.volume[i, j])
+        return bars
+
+    def get_bars(self, symbol, timeframe=None, start=None, end=None, limit=None, **kwargs):
+        """Bars up to the current virtual time (never the future), as an object with a .df DataFrame."""
+        import pandas as pd
+
+        # bar_cache imports this module, so its helper is imported here rather than at the top
+        from tutorials.utils.bar_cache import _to_ns
+
+        self._count("get_bars")
+        symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+        last = self._bar_index() + 1
+        first = 0
+        if start is not None:
+            first = int(np.searchsorted(self.bars.timestamps, _to_ns(start), side="left"))
+        if end is not None:
+            last = min(last, int(np.searchsorted(self.bars.timestamps, _to_ns(end), side="right")))
+        frames = []
+        for s in symbols:
+            j = self.bars.index[s]
+            rows = slice(first, last) if limit is None else slice(max(first, last - limit), last)
+            frames.append(pd.DataFrame({
+                "open": self.bars.open[rows, j],
+                "high": self.bars.high[rows, j],
+                "low": self.bars.low[rows, j],
+                "close": self.bars.close[rows, j],
+                "volume": self.bars.volume[rows, j],
+                "symbol": s,
+            }, index=pd.to_datetime(self.bars.timestamps[rows], utc=True).rename("timestamp")))
+        return Record(df=pd.concat(frames) if len(frames) > 1 else frames[0])
@@ -0,0 +1,424 @@
+import datetime
+import time
+
+import numpy as np
+
+from tutorials.utils.bar_cache import INTERVAL_SECONDS, CachedBarsAPI, _to_ns
+
+'''
+Incremental versions of the finrl.config.INDICATORS used in the live state vector.
+Every indicator keeps its running state in NumPy arrays (one column per ticker), so a
+new bar costs O(1) per ticker instead of recomputing the whole lookback window.
+The formulas follow stockstats, which FinRL uses to compute the training features.
+'''
+
+
+class StaleBarError(Exception):
+    """A market data source has no bar as recent as the one a trading cycle needs."""
+
+
+class RingBuffer:
+    def __init__(self, window, n):
+        """Fixed-size (window, n) buffer that keeps the last `window` rows."""
+        self.window = window
+        self.data = np.zeros((window, n))
+        self.pos = 0
+        self.count = 0
+
+    def push(self, row):
+        """Store a row and return the row it replaced (zeros until the buffer is full)."""
+        old = self.data[self.pos].copy()
+        self.data[self.pos] = row
+        self.pos = (self.pos + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+        return old
+
+    def values(self):
+        """Return the filled part of the buffer (order is not chronological)."""
+        return self.data if self.count == self.window else self.data[:self.count]
+
+
+class SMA:
+    def __init__(self, window, n):
+        self.buffer = RingBuffer(window, n)
+        self.total = np.zeros(n)
+
+    def update(self, x):
+        self.total += x - self.buffer.push(x)
+        return self.total / self.buffer.count
+
+
+class RollingStd:
+    def __init__(self, window, n):
+        self.buffer = RingBuffer(window, n)
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+
+    def update(self, x):
+        old = self.buffer.push(x)
+        self.total += x - old
+        self.total_sq += x * x - old * old
+        count = self.buffer.count
+        mean = self.total / count
+        if count < 2:
+            return mean, np.zeros_like(mean)
+        var = (self.total_sq - count * mean * mean) / (count - 1)
+        return mean, np.sqrt(np.maximum(var, 0.0))
+
+
+class EMA:
+    def __init__(self, alpha, adjust=False):
+        """
+        Exponential moving average.
+
+        Args:
+            alpha (float): Smoothing factor.
+            adjust (bool): Normalize by the sum of the weights seen so far, like pandas
+                ewm(adjust=True), instead of seeding the recursion with the first value.
+        """
+        self.alpha = alpha
+        self.adjust = adjust
+        self.value = None
+        self.weights = 0.0
+
+    def update(self, x):
+        if self.adjust:
+            decay = 1.0 - self.alpha
+            total = np.array(x, dtype=float) if self.value is None else x + decay * self.weights * self.value
+            self.weights = 1.0 + decay * self.weights
+            self.value = total / self.weights
+        elif self.value is None:
+            self.value = np.array(x, dtype=float)
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class MACD:
+    def __init__(self, n, fast=12, slow=26):
+        # stockstats' ema is pandas ewm(span=..., adjust=True)
+        self.fast = EMA(2.0 / (fast + 1), adjust=True)
+        self.slow = EMA(2.0 / (slow + 1), adjust=True)
+
+    def update(self, high, low, close):
+        return self.fast.update(close) - self.slow.update(close)
+
+
+class Bollinger:
+    def __init__(self, n, upper, window=20, k=2.0):
+        self.std = RollingStd(window, n)
+        self.sign = 1.0 if upper else -1.0
+        self.k = k
+
+    def update(self, high, low, close):
+        mean, std = self.std.update(close)
+        return mean + self.sign * self.k * std
+
+
+class RSI:
+    def __init__(self, n, window):
+        # Wilder smoothing, as in stockstats smma
+        self.gain = EMA(1.0 / window)
+        self.loss = EMA(1.0 / window)
+        self.prev = None
+
+    def update(self, high, low, close):
+        delta = np.zeros_like(close) if self.prev is None else close - self.prev
+        self.prev = np.array(close, dtype=float)
+        gain = self.gain.update(np.maximum(delta, 0.0))
+        loss = self.loss.update(np.maximum(-delta, 0.0))
+        total = gain + loss
+        return np.divide(100.0 * gain, total, out=np.full_like(total, 50.0), where=total > 0)
+
+
+class CCI:
+    def __init__(self, n, window):
+        self.buffer = RingBuffer(window, n)
+        self.total = np.zeros(n)
+
+    def update(self, high, low, close):
+        tp = (high + low + close) / 3.0
+        self.total += tp - self.buffer.push(tp)
+        if self.buffer.count < self.buffer.window:
+            # stockstats has no mean deviation before the window is full and reports 0
+            return np.zeros_like(tp)
+        mean = self.total / self.buffer.count
+        # mean absolute deviation needs the window, but the window is fixed and tiny
+        mad = np.abs(self.buffer.values() - mean).mean(axis=0)
+        return np.divide(tp - mean, 0.015 * mad, out=np.zeros_like(mad), where=mad > 0)
+
+
+class DX:
+    def __init__(self, n, window):
+        self.pdm = EMA(1.0 / window)
+        self.mdm = EMA(1.0 / window)
+        self.tr = EMA(1.0 / window)
+        self.prev = None
+
+    def update(self, high, low, close):
+        if self.prev is None:
+            up = down = np.zeros_like(close)
+            tr = high - low
+        else:
+            prev_high, prev_low, prev_close = self.prev
+            up = high - prev_high
+            down = prev_low - low
+            tr = np.maximum.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+        self.prev = (np.array(high, dtype=float), np.array(low, dtype=float), np.array(close, dtype=float))
+        pdm = self.pdm.update(np.where((up > down) & (up > 0), up, 0.0))
+        mdm = self.mdm.update(np.where((down > up) & (down > 0), down, 0.0))
+        atr = self.tr.update(tr)
+        pdi = np.divide(100.0 * pdm, atr, out=np.zeros_like(atr), where=atr > 0)
+        mdi = np.divide(100.0 * mdm, atr, out=np.zeros_like(atr), where=atr > 0)
+        total = pdi + mdi
+        return np.divide(100.0 * np.abs(pdi - mdi), total, out=np.zeros_like(total), where=total > 0)
+
+
+class CloseSMA:
+    def __init__(self, n, window):
+        self.sma = SMA(window, n)
+
+    def update(self, high, low, close):
+        return self.sma.update(close)
+
+
+def make_indicator(name, n):
+    """Build the incremental indicator for a stockstats name such as "rsi_30" or "close_60_sma"."""
+    if name == "macd":
+        return MACD(n), 26
+    if name in ("boll_ub", "boll_lb"):
+        return Bollinger(n, upper=name == "boll_ub"), 20
+    parts = name.split("_")
+    if len(parts) == 2 and parts[1].isdigit():
+        window = int(parts[1])
+        if parts[0] == "rsi":
+            return RSI(n, window), window
+        if parts[0] == "cci":
+            return CCI(n, window), window
+        if parts[0] == "dx":
+            return DX(n, window), window
+    if len(parts) == 3 and parts[0] == "close" and parts[2] == "sma" and parts[1].isdigit():
+        window = int(parts[1])
+        return CloseSMA(n, window), window
+    raise ValueError(f"Indicator {name} is not supported incrementally.")
+
+
+class IncrementalIndicatorEngine:
+    def __init__(self, n_tickers, tech_indicator_list):
+        """
+        Update every indicator for every ticker from one new bar at a time.
+
+        Args:
+            n_tickers (int): Number of tickers, one column each.
+            tech_indicator_list (list): Indicator names, e.g. finrl.config.INDICATORS.
+        """
+        self.n_tickers = n_tickers
+        self.tech_indicator_list = list(tech_indicator_list)
+        self.indicators = []
+        self.warmup_bars = 1
+        for name in self.tech_indicator_list:
+            indicator, window = make_indicator(name, n_tickers)
+            self.indicators.append(indicator)
+            self.warmup_bars = max(self.warmup_bars, window)
+        # (n_tickers, n_indicators) so ravel() gives the ticker-major layout of the state vector
+        self.values = np.zeros((n_tickers, len(self.indicators)))
+        self.bars_seen = 0
+
+    @property
+    def ready(self):
+        """True once enough bars were seen for every indicator window to be full."""
+        return self.bars_seen >= self.warmup_bars
+
+    def update(self, high, low, close):
+        """Feed one bar (arrays of shape (n_tickers,)) and return the (n_tickers, n_indicators) values."""
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        for j, indicator in enumerate(self.indicators):
+            self.values[:, j] = indicator.update(high, low, close)
+        self.bars_seen += 1
+        return self.values
+
+    def warmup(self, high, low, close):
+        """Feed a history of bars given as (T, n_tickers) arrays, oldest first."""
+        for t in range(len(close)):
+            self.update(high[t], low[t], close[t])
+        return self.values
+
+    def tech_vector(self):
+        """Return indicators flattened per ticker, matching AlpacaProcessor.fetch_latest_data."""
+        return self.values.ravel()
+
+
+# Bar lengths PaperTradingAlpaca supports, used to size the warmup download.
+WARMUP_INTERVAL_SECONDS = {"1s": 1, "5s": 5, "1Min": 60, "5Min": 60 * 5, "15Min": 60 * 15}
+
+
+def fetch_warmup_bars(api, ticker_list, time_interval, n_bars, days=5, return_index=False):
+    """
+    Download the last n_bars bars for each ticker as aligned (T, n) high/low/close arrays.
+
+    Only timestamps present for every ticker are kept. With return_index, their
+    timestamps are returned as a fourth value. Through a CachedBarsAPI, the windows are
+    read from the bar cache directly (see fetch_cached_warmup_bars).
+    """
+    if isinstance(api, CachedBarsAPI):
+        return fetch_cached_warmup_bars(api, ticker_list, time_interval, n_bars, days, return_index)
+    # use the broker's clock so replays against a simulated broker get their own history
+    start = (api.get_clock().timestamp - datetime.timedelta(days=days)).isoformat()
+    frames = []
+    for ticker in ticker_list:
+        df = api.get_bars(ticker, time_interval, start=start).df
+        frames.append(df[["high", "low", "close"]].tail(n_bars * 2))
+    index = frames[0].index
+    for df in frames[1:]:
+        index = index.intersection(df.index)
+    index = index[-n_bars:]
+    high = np.column_stack([df.loc[index, "high"].values for df in frames])
+    low = np.column_stack([df.loc[index, "low"].values for df in frames])
+    close = np.column_stack([df.loc[index, "close"].values for df in frames])
+    if return_index:
+        return high, low, close, index
+    return high, low, close
+
+
+def fetch_cached_warmup_bars(api, ticker_list, time_interval, n_bars, days=5, return_index=False):
+    """
+    fetch_warmup_bars through the bar cache of a CachedBarsAPI.
+
+    Reads cache.window views of the mapped columns instead of building a DataFrame per
+    ticker. Like CachedBarsAPI.get_bars, the window ends one bar before the broker clock,
+    so the bar still forming is not read.
+    """
+    import pandas as pd
+
+    end = _to_ns(api.get_clock().timestamp) - INTERVAL_SECONDS.get(time_interval, 60) * 1_000_000_000
+    windows = [api.cache.window(ticker, time_interval, end, n_bars * 2, lookback_days=days) for ticker in ticker_list]
+    timestamps = windows[0].timestamps
+    for window in windows[1:]:
+        timestamps = np.intersect1d(timestamps, window.timestamps)
+    timestamps = timestamps[-n_bars:]
+    rows = [np.searchsorted(window.timestamps, timestamps) for window in windows]
+    high = np.column_stack([window.high[r] for window, r in zip(windows, rows)])
+    low = np.column_stack([window.low[r] for window, r in zip(windows, rows)])
+    close = np.column_stack([window.close[r] for window, r in zip(windows, rows)])
+    if return_index:
+        return high, low, close, pd.to_datetime(np.asarray(timestamps), utc=True)
+    return high, low, close
+
+
+class IncrementalBarFeed:
+    def __init__(self, api, ticker_list, time_interval, tech_indicator_list, turbulence_symbol="VIXY",
+                 turbulence_model=None):
+        """
+        Market data source that fetches only the latest bar and updates indicators incrementally.
+
+        latest(tickers) has the same contract as MarketDataSubscriber.latest, so it can be
+        passed as `market_data` to LivePaperTradingAlpaca or used by the MarketDataHub.
+
+        Args:
+            api: Alpaca REST client.
+            ticker_list (list): Tickers tracked by the feed.
+            time_interval (str): Bar interval, e.g. "1Min".
+            tech_indicator_list (list): Indicator names, e.g. finrl.config.INDICATORS.
+            turbulence_symbol (str): Symbol whose close is used as turbulence, as in FinRL.
+            turbulence_model (UniverseTurbulence): Compute turbulence from the tickers' own
+                returns instead (FinRL's training definition). It is warmed up and updated by
+                the feed, and turbulence_symbol is then not fetched.
+        """
+        self.api = api
+        self.ticker_list = list(ticker_list)
+        self.time_interval = time_interval
+        self.turbulence_symbol = turbulence_symbol
+        self.turbulence_model = turbulence_model
+        self.engine = IncrementalIndicatorEngine(len(self.ticker_list), tech_indicator_list)
+        self.index = {ticker: i for i, ticker in enumerate(self.ticker_list)}
+        self.price = np.zeros(len(self.ticker_list))
+        self.turbulence = 0.0
+        self.last_bar_time = None
+        # time of the last bar fed for each ticker
+        self.bar_times = [None] * len(self.ticker_list)
+
+    def warmup(self):
+        """Prime the indicators with enough history to fill every window."""
+        n_bars = self.engine.warmup_bars
+        days = 5
+        if self.turbulence_model is not None:
+            n_bars = max(n_bars, self.turbulence_model.warmup_bars)
+            bars_per_day = 6.5 * 3600 / WARMUP_INTERVAL_SECONDS.get(self.time_interval, 60)
+            days = max(days, int(n_bars / bars_per_day * 7 / 5) + 3)
+        high, low, close, index = fetch_warmup_bars(self.api, self.ticker_list, self.time_interval, n_bars,
+                                                    days=days, return_index=True)
+        self.engine.warmup(high[-self.engine.warmup_bars:], low[-self.engine.warmup_bars:],
+                           close[-self.engine.warmup_bars:])
+        if self.turbulence_model is not None:
+            self.turbulence_model.warmup(close)
+        self.price[:] = close[-1]
+        # the latest bar is usually the last warmup bar; do not count it twice
+        self.last_bar_time = index[-1]
+        self.bar_times = [index[-1]] * len(self.ticker_list)
+
+    def refresh(self):
+        """
+        Fetch the latest bar for every ticker and update the indicators once a bar newer than the last step arrives.
+
+        A ticker without a new bar (no trade in that interval) gets a flat bar at its last
+        close, the way FinRL's Alpaca processor fills missing bars in the training data,
+        instead of its previous bar again.
+        """
+        if self.engine.bars_seen == 0:
+            self.warmup()
+        symbols = self.ticker_list if self.turbulence_model is not None else self.ticker_list + [self.turbulence_symbol]
+        bars = self.api.get_latest_bars(symbols)
+        if self.turbulence_model is None:
+            self.turbulence = float(bars[self.turbulence_symbol].c)
+        times = [bars[ticker].t for ticker in self.ticker_list]
+        bar_time = max(times)
+        if self.last_bar_time is not None and bar_time <= self.last_bar_time:
+            # nothing newer than the last step; a late bar is used at the next one
+            return
+        self.last_bar_time = bar_time
+        advanced = np.array([last is None or t > last for t, last in zip(times, self.bar_times)])
+        self.bar_times = [t if new else last for t, last, new in zip(times, self.bar_times, advanced)]
+        close = np.array([bars[ticker].c for ticker in self.ticker_list], dtype=float)
+        self.price = np.where(advanced, close, self.price)
+        high = np.where(advanced, [bars[ticker].h for ticker in self.ticker_list], self.price)
+        low = np.where(advanced, [bars[ticker].l for ticker in self.ticker_list], self.price)
+        self.engine.update(high, low, self.price)
+        if self.turbulence_model is not None:
+            self.turbulence_model.update(self.price, bar_time)
+            self.turbulence = self.turbulence_model.value_for()
+
+    @property
+    def bar_time(self):
+        """Start of the newest bar fed, in epoch seconds (None before the first one)."""
+        return None if self.last_bar_time is None else _to_ns(self.last_bar_time) / 1e9
+
+    def latest(self, tickers=None, min_bar_time=None, timeout=0.0):
+        """
+        Return (price, tech, turbulence) for the given tickers (all tickers if None).
+
+        Args:
+            min_bar_time (float): Oldest acceptable bar start, in epoch seconds. Until the feed
+                has such a bar, the latest bars are polled again for up to `timeout` seconds.
+
+        Raises:
+            StaleBarError: If no bar starting at or after min_bar_time arrived in time.
+        """
+        self.refresh()
+        if min_bar_time is not None:
+            deadline = time.monotonic() + timeout
+            while self.bar_time is None or self.bar_time < min_bar_time:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise StaleBarError(f"Newest bar starts at {self.bar_time or 0:.0f}, the cycle needs the bar "
+                                        f"at {min_bar_time:.0f}.")
+                time.sleep(min(1.0, remaining))
+                self.refresh()
+        turbulence = self.turbulence
+        if self.turbulence_model is not None:
+            turbulence = self.turbulence_model.value_for(tickers)
+        if tickers is None or list(tickers) == self.ticker_list:
+            return self.price.copy(), self.engine.tech_vector().copy(), turbulence
+        idx = [self.index[ticker] for ticker in tickers]
+        return self.price[idx], self.engine.values[idx].ravel(), turbulence
@@ -0,0 +1,358 @@
+import datetime
+import time
+
+import alpaca_trade_api as tradeapi
+import numpy as np
+import pandas as pd
+from finrl.meta.paper_trading.alpaca import PaperTradingAlpaca
+from tutorials.utils.bar_cache import BarCache, CachedBarsAPI
+from tutorials.utils.bar_scheduler import BarScheduler
+from tutorials.utils.broker_simulator import ReplayFinished, SimulatedBroker
+from tutorials.utils.indicators import IncrementalBarFeed, StaleBarError
+from tutorials.utils.metrics import metrics
+from tutorials.utils.observation_adapter import ObservationAdapter
+from tutorials.utils.order_executor import AsyncOrderExecutor
+from tutorials.utils.order_planner import plan_liquidation, plan_orders
+from tutorials.utils.state_schema import StateSchema
+from tutorials.utils.trade_journal import TradeJournal
+
+
+class LivePaperTradingAlpaca(PaperTradingAlpaca):
+    def __init__(self, *args, market_data=None, incremental_indicators=False, model=None, max_orders_in_flight=8,
+                 broker=None, journal=None, strategy=None, sentiment=None, turbulence_model=None, model_watcher=None,
+                 schedule=None, allow_padding=False, **kwargs):
+        """
+        PaperTradingAlpaca that can read bars from a shared market data source.
+
+        Args:
+            market_data: Object with latest(tickers) -> (price, tech, turbulence), such as a
+                MarketDataSubscriber. If None, bars are fetched from Alpaca as usual.
+            incremental_indicators (bool): When no market_data is given, fetch only the latest
+                bar each cycle and update the indicators incrementally (IncrementalBarFeed).
+            model: Already loaded model (or InferenceClient). When given, the agent is not
+                loaded again from `cwd`, which saves a full model load at startup. If it has an
+                observation_space, states are mapped onto it by an ObservationAdapter, and a
+                state_dim that does not fit raises here.
+            max_orders_in_flight (int): Orders submitted concurrently by the AsyncOrderExecutor.
+            broker: Object replacing the Alpaca REST client, e.g. a SimulatedBroker. Defaults to
+                SimulatedBroker.from_env(), which is None unless PAPER_TRADING_BARS is set.
+                Without a broker, historical bars are read through BarCache.from_env() when
+                PAPER_TRADING_BAR_CACHE is set.
+            journal (TradeJournal): Where every cycle and order is recorded. Defaults to
+                TradeJournal.from_env(), which is None unless PAPER_TRADING_JOURNAL is set.
+            strategy (str): Strategy name used by the journal. Defaults to the agent name.
+            sentiment: Object with scores(tickers) -> array, such as a SentimentStream. When
+                given, one sentiment score per ticker is appended to the state, so state_dim
+                must include it (use_sentiment in the config).
+            turbulence_model (UniverseTurbulence): With incremental_indicators, compute turbulence
+                from the tickers' returns instead of the VIXY close.
+            model_watcher (ModelWatcher): Source of validated new models, swapped in before the
+                next cycle.
+            schedule (dict): Arguments of BarScheduler.for_slot (slot, n_slots, start_delay, stagger,
+                deadline_fraction). Cycles then start at a fixed offset into every bar, and a cycle
+                past its deadline skips its orders. Without it, run() sleeps an interval per cycle.
+            allow_padding (bool): Let the model's observation be larger than the state (zero-filled,
+                see ObservationAdapter), as in the Explainable DRL models; only the first
+                action_dim actions are traded.
+        """
+        self.observation_adapter = None
+        self.allow_padding = allow_padding
+        self.sentiment = sentiment
+        self.state_schema = StateSchema(len(kwargs["ticker_list"]), len(kwargs["tech_indicator_list"]),
+                                        sentiment=sentiment is not None)
+        if kwargs.get("state_dim") is not None and kwargs["state_dim"] != self.state_schema.size:
+            raise ValueError(f"state_dim is {kwargs['state_dim']}, but the live state has "
+                             f"{self.state_schema.size} values ({self.state_schema}).")
+        self.state_buffer = self.state_schema.allocate()
+        if model is None:
+            super().__init__(*args, **kwargs)
+        else:
+            self._init_without_agent(**kwargs)
+            self.model = model
+            if getattr(model, "observation_space", None) is not None:
+                self.observation_adapter = ObservationAdapter.from_model(model, kwargs["state_dim"],
+                                                                         allow_padding=allow_padding)
+        if broker is None:
+            broker = SimulatedBroker.from_env()
+        if broker is not None:
+            self.alpaca = broker
+        else:
+            bar_cache = BarCache.from_env(self.alpaca)
+            if bar_cache is not None:
+                self.alpaca = CachedBarsAPI(self.alpaca, bar_cache)
+        # the simulator advances its virtual clock instead of sleeping
+        self.sleep = getattr(self.alpaca, "sleep", time.sleep)
+        if self.sleep is time.sleep:
+            self.clock = time.time
+        else:
+            self.clock = lambda: self.alpaca.get_clock().timestamp.timestamp()
+        self.scheduler = None
+        if schedule is not None:
+            self.scheduler = BarScheduler.for_slot(self.time_interval, clock=self.clock, sleep=self.sleep,
+                                                   **schedule)
+        self.cycle = None
+        if market_data is None and incremental_indicators:
+            market_data = IncrementalBarFeed(self.alpaca, self.stockUniverse, kwargs["time_interval"],
+                                             self.tech_indicator_list, turbulence_model=turbulence_model)
+        self.market_data = market_data
+        self.order_executor = AsyncOrderExecutor(self.alpaca, max_in_flight=max_orders_in_flight)
+        self.strategy = strategy or kwargs.get("agent", "strategy")
+        self.journal = journal if journal is not None else TradeJournal.from_env(self.strategy)
+        self.cycle_time = None
+        self.model_watcher = model_watcher
+
+    def _init_without_agent(self, ticker_list, time_interval, drl_lib, agent, cwd, net_dim, state_dim, action_dim,
+                            API_KEY, API_SECRET, API_BASE_URL, tech_indicator_list, turbulence_thresh=30,
+                            max_stock=1e2, latency=None):
+        """Same setup as PaperTradingAlpaca.__init__, minus loading the agent from cwd."""
+        self.drl_lib = drl_lib
+        self.alpaca = tradeapi.REST(API_KEY, API_SECRET, API_BASE_URL, "v2")
+        intervals = {"1s": 1, "5s": 5, "1Min": 60, "5Min": 60 * 5, "15Min": 60 * 15}
+        if time_interval not in intervals:
+            raise ValueError("Time interval input is NOT supported yet.")
+        self.time_interval = intervals[time_interval]
+        self.tech_indicator_list = tech_indicator_list
+        self.turbulence_thresh = turbulence_thresh
+        self.max_stock = max_stock
+        self.stocks = np.asarray([0] * len(ticker_list))
+        self.stocks_cd = np.zeros_like(self.stocks)
+        self.cash = None
+        self.stocks_df = pd.DataFrame(self.stocks, columns=["stocks"], index=ticker_list)
+        self.asset_list = []
+        self.price = np.asarray([0] * len(ticker_list))
+        self.stockUniverse = ticker_list
+        self.turbulence_bool = 0
+        self.equities = []
+
+    def awaitMarketOpen(self):
+        isOpen = self.alpaca.get_clock().is_open
+        while not isOpen:
+            clock = self.alpaca.get_clock()
+            openingTime = clock.next_open.replace(tzinfo=datetime.timezone.utc).timestamp()
+            currTime = clock.timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+            timeToOpen = int((openingTime - currTime) / 60)
+            print(str(timeToOpen) + " minutes til market open.")
+            self.sleep(60)
+            isOpen = self.alpaca.get_clock().is_open
+
+    def run(self):
+        """
+        Same loop as PaperTradingAlpaca.run, sleeping through self.sleep so replays can run faster.
+
+        With a scheduler, each cycle waits for its slot in the next bar instead of sleeping an interval.
+        A SimulatedBroker replay stops when its bars run out (ReplayFinished). The order executor
+        and the journal are closed however the loop ends.
+        """
+        orders = self.alpaca.list_orders(status="open")
+        for order in orders:
+            self.alpaca.cancel_order(order.id)
+
+        print("Waiting for market to open...")
+        try:
+            self.awaitMarketOpen()
+            print("Market opened.")
+            while True:
+                if self.scheduler is not None:
+                    self.cycle = self.scheduler.wait()
+                clock = self.alpaca.get_clock()
+                closingTime = clock.next_close.replace(tzinfo=datetime.timezone.utc).timestamp()
+                currTime = clock.timestamp.replace(tzinfo=datetime.timezone.utc).timestamp()
+                self.timeToClose = closingTime - currTime
+                if self.timeToClose < 60:
+                    print("Market closing soon. Stop trading.")
+                    break
+                self.cycle_time = clock.timestamp
+                self.trade()
+                if self.cycle is not None:
+                    self.scheduler.finish(self.cycle)
+                metrics.set_gauge("time_to_close_seconds", self.timeToClose)
+                last_equity = float(self.alpaca.get_account().last_equity)
+                self.equities.append([currTime, last_equity])
+                if self.scheduler is None:
+                    self.sleep(self.time_interval)
+        except ReplayFinished as e:
+            # a replay has no next session to wait for
+            print(f"{e} Stop trading.")
+        finally:
+            # also on errors and KeyboardInterrupt, so the journal flushes its buffered rows
+            self.order_executor.close()
+            if self.journal is not None:
+                self.journal.close()
+
+    def get_state(self):
+        """Build the state from the shared market data source when one is attached."""
+        with metrics.timer("get_state"):
+            if self.market_data is None:
+                state = super().get_state()
+                if self.sentiment is None:
+                    return state
+                self.state_buffer[:self.state_schema.sentiment.start] = state
+                self.state_buffer[self.state_schema.sentiment] = self.sentiment_scores()
+                return self.state_buffer
+            kwargs = {}
+            if self.cycle is not None:
+                # wait for the bar that closed at this cycle's boundary, but only while there is time left to trade it
+                kwargs = {"min_bar_time": self.cycle.bar_start - self.time_interval,
+                          "timeout": max(self.scheduler.remaining(self.cycle) / 2, 0.0)}
+            with metrics.timer("market_data"):
+                price, tech, turbulence = self.market_data.latest(self.stockUniverse, **kwargs)
+            return self.build_state(price, tech, turbulence)
+
+    def get_holdings(self):
+        """Return share counts for our tickers, ignoring positions held by other strategies."""
+        index = {ticker: i for i, ticker in enumerate(self.stockUniverse)}
+        stocks = np.zeros(len(self.stockUniverse), dtype=float)
+        with metrics.timer("positions_refresh"):
+            positions = self.alpaca.list_positions()
+        for position in positions:
+            if position.symbol in index:
+                stocks[index[position.symbol]] = abs(int(float(position.qty)))
+        return stocks
+
+    def build_state(self, price, tech, turbulence):
+        """
+        Write the state into the preallocated state buffer, laid out as PaperTradingAlpaca.get_state does.
+
+        The returned array is reused by the next cycle; copy it to keep it.
+        """
+        turbulence = float(np.asarray(turbulence).ravel()[0])
+        self.turbulence_bool = 1 if turbulence >= self.turbulence_thresh else 0
+        turbulence = self.sigmoid_sign(turbulence, self.turbulence_thresh) * 2**-5
+
+        self.stocks = self.get_holdings()
+        self.cash = self.refresh_cash()
+        self.price = np.asarray(price)
+        return self.state_schema.write(self.state_buffer, self.cash, turbulence, self.turbulence_bool,
+                                       self.price, self.stocks, self.stocks_cd, tech,
+                                       sentiment=self.sentiment_scores())
+
+    def sentiment_scores(self):
+        """Current sentiment score of each ticker, or None without a sentiment source."""
+        if self.sentiment is None:
+            return None
+        with metrics.timer("sentiment"):
+            return self.sentiment.scores(self.stockUniverse)
+
+    def refresh_cash(self):
+        """Fetch the account cash from the broker."""
+        with metrics.timer("account_refresh"):
+            return float(self.alpaca.get_account().cash)
+
+    def predict_action(self, state):
+        """Return the raw action for a state, the same way PaperTradingAlpaca.trade does (deterministic for SB3)."""
+        with metrics.timer("predict"):
+            if self.drl_lib == "elegantrl":
+                import torch
+
+                with torch.no_grad():
+                    s_tensor = torch.as_tensor((state,), device=self.device)
+                    action = self.act(s_tensor).detach().cpu().numpy()[0]
+                return (action * self.max_stock).astype(int)
+            if self.observation_adapter is not None:
+                state = self.observation_adapter.adapt(state)
+            # deterministic, like the InferenceServer and the backtester
+            action = self.model.predict(state, deterministic=True)[0]
+            # a padded model has actions for its padding tickers too
+            return action[:len(self.stockUniverse)] if self.allow_padding else action
+
+    def plan(self, action):
+        """Plan this cycle's orders from the action, or a liquidation when turbulence is high."""
+        with metrics.timer("plan"):
+            if self.turbulence_bool == 0:
+                # the orders go out concurrently, so the buys cannot spend the sells' proceeds yet
+                return plan_orders(self.stockUniverse, action, self.stocks, self.price, self.cash,
+                                   fund_with_sales=False)
+            metrics.increment("liquidations")
+            return plan_liquidation(self.stockUniverse, self.stocks, self.price, self.cash)
+
+    def cycle_id(self):
+        """Strategy and bar of the current cycle, for the orders' client_order_ids (None outside run())."""
+        if self.cycle is not None:
+            return f"{self.strategy}-{self.cycle.bar_start:.0f}"
+        if self.cycle_time is not None:
+            return f"{self.strategy}-{self.cycle_time.isoformat()}"
+        return None
+
+    def execute_plan(self, plan):
+        """Submit every order of a plan concurrently, then reconcile cash with the broker once."""
+        with metrics.timer("order_submit"):
+            results = self.order_executor.execute(plan.orders(), self.cycle_id())
+        for result in results:
+            if result.ok:
+                metrics.increment("orders_submitted")
+                print(f"Market order of | {result.qty} {result.ticker} {result.side} | completed.")
+            else:
+                metrics.increment("orders_failed")
+                print(f"Order of | {result.qty} {result.ticker} {result.side} | did not go through: {result.error}")
+            metrics.increment("order_retries", result.attempts - 1)
+        self.stocks_cd[plan.traded] = 0
+        if len(plan):
+            self.cash = self.refresh_cash()
+        return results
+
+    def record_cycle(self, state, action, plan, results):
+        """Queue the cycle and its orders in the trade journal, if there is one."""
+        if self.journal is None:
+            return
+        self.journal.record_cycle(state, action, plan, results, price=self.price, cash=plan.cash_before,
+                                  turbulence_bool=self.turbulence_bool, timestamp=self.cycle_time)
+
+    def swap_model(self):
+        """Switch to the model staged by the model watcher, if there is one. Runs between cycles."""
+        if self.model_watcher is None:
+            return False
+        staged = self.model_watcher.take()
+        if staged is None:
+            return False
+        self.model, self.observation_adapter = staged
+        metrics.increment("model_swaps")
+        print(f"Swapped in the new model from {self.model_watcher.model_path}")
+        return True
+
+    def stale_data(self):
+        """
+        How many seconds the market data's bar is older than the bar this cycle should trade, or 0.
+
+        The bar to trade is the one that closed at the cycle's bar boundary (at the last boundary
+        of the clock without a scheduler). Sources without a bar time are never stale.
+        """
+        bar_time = getattr(self.market_data, "bar_time", None)
+        if bar_time is None:
+            return 0.0
+        if self.cycle is not None:
+            boundary = self.cycle.bar_start
+        else:
+            boundary = self.clock() // self.time_interval * self.time_interval
+        return max(boundary - self.time_interval - bar_time, 0.0)
+
+    def trade(self):
+        """One trading cycle: state, prediction, one planned batch of orders."""
+        self.swap_model()
+        with metrics.timer("cycle"):
+            try:
+                state = self.get_state()
+            except StaleBarError as e:
+                metrics.increment("stale_data_cycles_skipped")
+                print(f"Market data is not current, cycle skipped: {e}")
+                return []
+            lag = self.stale_data()
+            if lag:
+                metrics.increment("stale_data_bars")
+                if self.cycle is not None:
+                    metrics.increment("stale_data_cycles_skipped")
+                    print(f"Market data is {lag:.0f}s behind the bar at {self.cycle.bar_start:.0f}, cycle skipped.")
+                    return []
+                print(f"Warning: market data is {lag:.0f}s behind the last bar.")
+            action = self.predict_action(state)
+            self.stocks_cd += 1
+            plan = self.plan(action)
+            if self.cycle is not None and self.scheduler.expired(self.cycle):
+                # the bar the plan was made from is over; its prices are stale
+                metrics.increment("stale_cycles_skipped")
+                print(f"Cycle past its deadline, {len(plan)} planned orders not submitted.")
+                results = []
+            else:
+                results = self.execute_plan(plan)
+            self.record_cycle(state, action, plan, results)
+        metrics.increment("cycles")
+        return results
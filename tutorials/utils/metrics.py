@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+
+'''
+Lightweight timers and counters for the trading hot path.
+Stages are wrapped in `metrics.timer("stage")` and events counted with
+`metrics.increment("name")`. When metrics are disabled (the default) both return
+immediately through a shared no-op, so the instrumentation costs one attribute check.
+
+Enable with configure(...) or the environment:
+    PAPER_TRADING_METRICS_PORT=9100            serve Prometheus text on http://host:9100/metrics
+    PAPER_TRADING_METRICS_FILE=metrics.prom    rewrite this file every PAPER_TRADING_METRICS_INTERVAL seconds
+
+A StrategyPool sets PAPER_TRADING_METRICS_PORT_OFFSET in each child, so strategy i serves on
+port + i, and a file path without "{strategy}" or "{pid}" becomes metrics.<strategy>.prom.
+'''
+
+# Histogram bucket upper bounds in seconds, from 1ms to one 1Min bar.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PREFIX = "paper_trading"
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.increment(f"{self.name}_errors")
+        return False
+
+
+class Histogram:
+    def __init__(self):
+        """Cumulative latency histogram with Prometheus-style buckets."""
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.last = seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self, enabled=False, labels=None):
+        """
+        Registry of stage timers, counters and gauges for one process.
+
+        Args:
+            enabled (bool): Record anything at all. Disabled metrics are no-ops.
+            labels (dict): Labels added to every exported sample, e.g. {"strategy": "A2C"}.
+        """
+        self.enabled = enabled
+        self.labels = dict(labels or {})
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.exporter = None
+
+    def timer(self, name):
+        """Context manager timing a stage into the `name` histogram."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        if not self.enabled:
+            return
+        self.gauges[name] = float(value)
+
+    def _labels(self, extra=None):
+        labels = dict(self.labels, **(extra or {}))
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{self._labels({'le': bound})} {cumulative}")
+                lines.append(f"{metric}_bucket{self._labels({'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{metric}_sum{self._labels()} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{self._labels()} {histogram.count}")
+            for name, value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{self._labels()} {value}")
+            for name, value in sorted(self.gauges.items()):
+                metric = f"{PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric}{self._labels()} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Return {stage: (count, mean seconds, last seconds)} for printing."""
+        with self.lock:
+            return {
+                name: (h.count, h.sum / h.count if h.count else 0.0, h.last)
+                for name, h in sorted(self.histograms.items())
+            }
+
+    def write_file(self, path):
+        """Write the current metrics to a file atomically (for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_file_exporter(self, path, interval=15.0):
+        """Rewrite `path` every `interval` seconds from a daemon thread."""
+        def export():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_file(path)
+                except OSError as e:
+                    print(f"Could not write metrics to {path}: {e}")
+
+        self.exporter = threading.Thread(target=export, name="metrics-exporter", daemon=True)
+        self.exporter.start()
+
+    def start_http_server(self, port, host="0.0.0.0"):
+        """Serve the metrics at http://host:port/metrics from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+
+
+# Process-wide registry used by the trading classes and tutorial scripts.
+metrics = Metrics()
+
+
+def configure(enabled=True, labels=None, port=None, path=None, interval=15.0):
+    """
+    Enable the process-wide registry and start its exporters.
+
+    Args:
+        enabled (bool): Turn recording on.
+        labels (dict): Labels added to every sample, e.g. {"strategy": "A2C"}.
+        port (int): Serve Prometheus text over HTTP on this port.
+        path (str): Periodically write Prometheus text to this file. "{strategy}" and
+            "{pid}" are filled in, so processes of a StrategyPool do not share one file.
+        interval (float): Seconds between file writes.
+    """
+    metrics.enabled = enabled
+    metrics.labels.update(labels or {})
+    if port is not None and metrics.server is None:
+        try:
+            metrics.start_http_server(int(port))
+        except OSError as e:
+            # several strategies of one pool cannot share a port; they still export to files
+            print(f"Could not serve metrics on port {port}: {e}")
+    if path is not None and metrics.exporter is None:
+        path = path.format(strategy=metrics.labels.get("strategy", "default"), pid=os.getpid())
+        metrics.start_file_exporter(path, interval)
+    return metrics
+
+
+def configure_from_env(labels=None):
+    """
+    Enable metrics when PAPER_TRADING_METRICS_PORT or PAPER_TRADING_METRICS_FILE is set.
+
+    The port is shifted by PAPER_TRADING_METRICS_PORT_OFFSET, and a file path without
+    "{strategy}" or "{pid}" gets the strategy inserted before its extension, so every
+    process of a pool reading the same environment exports on its own port and file.
+    """
+    port = os.environ.get("PAPER_TRADING_METRICS_PORT")
+    path = os.environ.get("PAPER_TRADING_METRICS_FILE")
+    if not port and not path:
+        return metrics
+    if port:
+        port = int(port) + int(os.environ.get("PAPER_TRADING_METRICS_PORT_OFFSET", 0))
+    if path and "{strategy}" not in path and "{pid}" not in path and (labels or {}).get("strategy"):
+        root, ext = os.path.splitext(path)
+        path = f"{root}.{{strategy}}{ext}"
+    interval = float(os.environ.get("PAPER_TRADING_METRICS_INTERVAL", 15))
+    return configure(labels=labels, port=port or None, path=path or None, interval=interval)
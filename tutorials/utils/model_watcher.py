@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from tutorials.utils.metrics import metrics
+from tutorials.utils.observation_adapter import ObservationAdapter
+
+'''
+Hot swap of a strategy's model while it trades.
+A background thread watches the model file (or unzipped save directory) for a new
+version. Once the file has stopped changing, the thread loads it and checks it against
+the live state: the state must map onto its observation_space, and a dry-run predict
+on an empty state must return one finite action per ticker. A model that passes is
+staged; the trading loop picks it up with take() between two cycles, so a cycle never
+mixes two models and the swap itself is only a reference assignment. A model that
+fails is rejected with its reason, and the running model keeps trading.
+'''
+
+
+def fingerprint(path):
+    """(inode, size, mtime) of a file, or of every file of a directory; None when path does not exist."""
+    try:
+        if not os.path.isdir(path):
+            stat = os.stat(path)
+            return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        entries = []
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                entries.append((name, stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(entries)
+    except FileNotFoundError:
+        return None
+
+
+def validate_model(model, state_dim, action_dim, allow_padding=False):
+    """
+    Check that a model can trade the live state and return its ObservationAdapter.
+
+    Raises:
+        ValueError: If the state does not map onto the model's observation, or the model
+            does not return one finite action per ticker.
+    """
+    adapter = ObservationAdapter.from_model(model, state_dim, allow_padding=allow_padding)
+    action = np.asarray(model.predict(adapter.adapt(np.zeros(state_dim, dtype=np.float32)))[0])
+    if action.ndim != 1 or len(action) < action_dim or (len(action) > action_dim and not allow_padding):
+        raise ValueError(f"Model returns actions of shape {action.shape}, the strategy trades {action_dim} tickers.")
+    if not np.all(np.isfinite(action)):
+        raise ValueError("Model returns non-finite actions on an empty state.")
+    return adapter
+
+
+class ModelWatcher:
+    def __init__(self, model_path, load_fn, state_dim, action_dim, check_interval=5.0, settle_seconds=2.0,
+                 allow_padding=False):
+        """
+        Watch a model path and stage validated new versions for the trading loop.
+
+        Args:
+            model_path (str): SB3 zip, unzipped save directory or other file load_fn reads.
+            load_fn: Function model_path -> model with predict() and observation_space.
+            state_dim (int): Length of the live state vector.
+            action_dim (int): Number of tickers traded.
+            check_interval (float): Seconds between checks of the path.
+            settle_seconds (float): How long the path must stay unchanged before it is loaded,
+                for writers that do not replace the file atomically.
+            allow_padding (bool): Accept a model observation larger than the state (see
+                ObservationAdapter) and extra actions.
+        """
+        self.model_path = model_path
+        self.load_fn = load_fn
+        self.state_dim = state_dim
+        self.action_dim = action_dim
+        self.check_interval = check_interval
+        self.settle_seconds = settle_seconds
+        self.allow_padding = allow_padding
+        # the version already running; only a different one is loaded
+        self.current = fingerprint(model_path)
+        self.pending = None
+        self.rejected = None
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        seen, seen_at = self.current, time.monotonic()
+        while not self.stopped.wait(self.check_interval):
+            version = fingerprint(self.model_path)
+            if version != seen:
+                seen, seen_at = version, time.monotonic()
+                continue
+            if version is None or version == self.current or version == self.rejected:
+                continue
+            if time.monotonic() - seen_at >= self.settle_seconds:
+                self.check(version)
+
+    def check(self, version=None):
+        """Load and validate the model at the path now; stage it if it passes. Returns True when staged."""
+        version = fingerprint(self.model_path) if version is None else version
+        start = time.perf_counter()
+        try:
+            model = self.load_fn(self.model_path)
+            adapter = validate_model(model, self.state_dim, self.action_dim, self.allow_padding)
+        except Exception as e:
+            self.rejected = version
+            metrics.increment("model_swaps_rejected")
+            print(f"New model at {self.model_path} rejected, keeping the running one: {e}")
+            return False
+        with self.lock:
+            self.pending = (model, adapter)
+            self.current = version
+        metrics.observe("model_load", time.perf_counter() - start)
+        print(f"New model at {self.model_path} validated ({adapter}), swapping in at the next cycle")
+        return True
+
+    def take(self):
+        """The staged (model, adapter), or None. Each staged model is returned once."""
+        if self.pending is None:
+            return None
+        with self.lock:
+            staged, self.pending = self.pending, None
+        return staged
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
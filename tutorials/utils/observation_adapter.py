@@ -0,0 +1,101 @@
+import numpy as np
+
+'''
+Maps the live state vector onto the observation layout a saved model was trained on.
+The mapping is worked out once, when the model is loaded, from the model's
+observation_space. Each cycle then copies the state into one preallocated buffer
+without allocating. A state that cannot be mapped raises at load time instead of
+being reshaped silently into a bad trade.
+'''
+
+
+class ObservationAdapter:
+    def __init__(self, model_shape, state_dim, allow_padding=False, index_map=None, dtype=np.float32):
+        """
+        Precomputed mapping from a (state_dim,) live state to a model observation.
+
+        Args:
+            model_shape (tuple): Observation shape the model expects, e.g. (20, 16).
+            state_dim (int): Length of the live state vector.
+            allow_padding (bool): Accept a state shorter than the model observation and
+                zero-fill the rest (what the Explainable DRL models were run with).
+            index_map (np.ndarray): Optional explicit mapping: for each flat model position,
+                the state index to copy, or -1 for zero. Overrides the default layout.
+            dtype: Dtype of the observation buffer.
+
+        Raises:
+            ValueError: If the state cannot be mapped onto the model observation.
+        """
+        self.model_shape = tuple(int(d) for d in model_shape)
+        self.state_dim = int(state_dim)
+        self.size = int(np.prod(self.model_shape))
+        self.buffer = np.zeros(self.model_shape, dtype=dtype)
+        self.flat = self.buffer.reshape(-1)
+
+        if index_map is not None:
+            index_map = np.asarray(index_map, dtype=np.int64).ravel()
+            if index_map.size != self.size:
+                raise ValueError(f"index_map has {index_map.size} entries, the model observation {self.size}.")
+            if index_map.max(initial=-1) >= self.state_dim or index_map.min(initial=0) < -1:
+                raise ValueError(f"index_map refers to state indices outside 0..{self.state_dim - 1}.")
+        elif self.state_dim == self.size:
+            index_map = np.arange(self.size)
+        elif self.state_dim < self.size and allow_padding:
+            index_map = np.full(self.size, -1, dtype=np.int64)
+            index_map[:self.state_dim] = np.arange(self.state_dim)
+        else:
+            hint = " Pass allow_padding=True to zero-fill it." if self.state_dim < self.size else ""
+            raise ValueError(
+                f"State of length {self.state_dim} does not match the model observation {self.model_shape} "
+                f"({self.size} values). Check the tickers, indicators and state_dim_formula in the config.{hint}"
+            )
+        self.index_map = index_map
+
+        # a leading run of state values is a plain slice copy; zero positions are never written
+        prefix = int(np.count_nonzero(index_map >= 0))
+        self.prefix = prefix if np.array_equal(index_map[:prefix], np.arange(prefix)) else None
+        if self.prefix is None:
+            # gather through a scratch copy of the state with a trailing zero for the -1 entries
+            self.scratch = np.zeros(self.state_dim + 1, dtype=dtype)
+            self.gather = np.where(index_map >= 0, index_map, self.state_dim)
+
+    @classmethod
+    def from_model(cls, model, state_dim, **kwargs):
+        """Build the adapter from a loaded model's (or policy's) observation_space."""
+        space = getattr(model, "observation_space", None)
+        if space is None or getattr(space, "shape", None) is None:
+            raise ValueError(f"{type(model).__name__} has no observation_space to adapt the state to.")
+        return cls(space.shape, state_dim, **kwargs)
+
+    @property
+    def identity(self):
+        """True when the state is passed to the model as is (same size, same order)."""
+        return self.prefix == self.size
+
+    def adapt(self, state):
+        """Fill the preallocated observation buffer from the state and return it."""
+        state = np.asarray(state)
+        if state.shape != (self.state_dim,):
+            raise ValueError(f"Expected a state of shape ({self.state_dim},), got {state.shape}.")
+        if self.prefix is not None:
+            np.copyto(self.flat[:self.prefix], state[:self.prefix], casting="unsafe")
+        else:
+            np.copyto(self.scratch[:-1], state, casting="unsafe")
+            np.take(self.scratch, self.gather, out=self.flat)
+        return self.buffer
+
+    def adapt_batch(self, states):
+        """Map a (batch, state_dim) array of states to a new (batch, *model_shape) array of observations."""
+        states = np.asarray(states)
+        if states.ndim != 2 or states.shape[1] != self.state_dim:
+            raise ValueError(f"Expected states of shape (batch, {self.state_dim}), got {states.shape}.")
+        out = np.zeros((len(states), self.size), dtype=self.buffer.dtype)
+        if self.prefix is not None:
+            out[:, :self.prefix] = states[:, :self.prefix]
+        else:
+            padded = np.concatenate([states, np.zeros((len(states), 1), dtype=states.dtype)], axis=1)
+            out[:] = padded[:, self.gather]
+        return out.reshape((len(states),) + self.model_shape)
+
+    def __repr__(self):
+        return f"ObservationAdapter(({self.state_dim},) -> {self.model_shape})"
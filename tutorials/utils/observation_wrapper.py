@@ -1,16 +1,21 @@
-import numpy as np
-from gym import ObservationWrapper
+from tutorials.utils.observation_adapter import ObservationAdapter
 
 class ObservationReshapeWrapper:
-    def __init__(self, model):
+    def __init__(self, model, state_dim, allow_padding=False):
+        """
+        Adapt live states to the model's observation shape before predicting.
+
+        The mapping is built here from model.observation_space, so a state that does not
+        fit the model raises now rather than on the first trade.
+
+        Args:
+            model: Loaded model with predict() and observation_space.
+            state_dim (int): Length of the live state vector.
+            allow_padding (bool): Zero-fill a state shorter than the observation.
+        """
         self.model = model
-        
+        self.adapter = ObservationAdapter.from_model(model, state_dim, allow_padding=allow_padding)
+
     def predict(self, observation, *args, **kwargs):
-        """Reshape observation to match expected model input shape."""
-        # Reshape from (58,) to (20, 16)
-        if isinstance(observation, np.ndarray) and observation.shape == (58,):
-            # Pad with zeros if needed
-            padded_obs = np.pad(observation, (0, 320 - 58), 'constant')
-            reshaped_obs = padded_obs.reshape(20, 16)
-            return self.model.predict(reshaped_obs, *args, **kwargs)
-        return self.model.predict(observation, *args, **kwargs) 
\ No newline at end of file
+        """Fill the preallocated observation from the state and predict."""
+        return self.model.predict(self.adapter.adapt(observation), *args, **kwargs)
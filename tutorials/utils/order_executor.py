@@ -0,0 +1,151 @@
+import asyncio
+import functools
+import hashlib
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Concurrent order submission for the trade() paths.
+Orders are sent through asyncio with a bounded number in flight, so a slow broker
+response for one symbol no longer delays every symbol after it. Time from decision to
+last order sent drops from the sum of the round-trips to roughly the slowest one.
+Every order carries a client_order_id derived from its cycle, ticker and side, and
+keeps it on every attempt. A retry after a timeout whose order did reach the broker is
+then rejected as a duplicate and resolved to the existing order, not filled twice.
+'''
+
+try:
+    import requests
+
+    # connection failures and timeouts of the HTTP client alpaca_trade_api uses
+    RETRYABLE_ERRORS = (ConnectionError, TimeoutError, requests.exceptions.ConnectionError,
+                        requests.exceptions.Timeout)
+except ImportError:
+    RETRYABLE_ERRORS = (ConnectionError, TimeoutError)
+
+
+class OrderResult:
+    def __init__(self, ticker, side, qty):
+        """Outcome of one submitted order."""
+        self.ticker = ticker
+        self.side = side
+        self.qty = qty
+        self.order = None
+        self.error = None
+        self.client_order_id = None
+        self.attempts = 0
+        self.latency = 0.0
+
+    @property
+    def ok(self):
+        return self.order is not None
+
+    @property
+    def status(self):
+        if self.ok:
+            return getattr(self.order, "status", "submitted")
+        return f"failed: {self.error}"
+
+    def __repr__(self):
+        return f"OrderResult({self.side} {self.qty} {self.ticker}, {self.status}, attempts={self.attempts})"
+
+
+def is_retryable(error):
+    """Retry connection errors, timeouts, rate limits and server errors; not rejected orders or bugs."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+def client_order_id(cycle_id, ticker, side):
+    """Deterministic client_order_id of an order (Alpaca allows at most 48 characters)."""
+    digest = hashlib.sha1(f"{cycle_id}|{ticker}|{side}".encode()).hexdigest()[:32]
+    return f"{side[0]}-{digest}"
+
+
+class AsyncOrderExecutor:
+    def __init__(self, alpaca, max_in_flight=8, max_retries=3, backoff=0.5, time_in_force="day"):
+        """
+        Submit market orders concurrently with a bounded in-flight window.
+
+        Args:
+            alpaca: Alpaca REST client (its blocking submit_order runs in a thread pool).
+            max_in_flight (int): Maximum number of orders waiting on the broker at once.
+            max_retries (int): Attempts per order before giving up.
+            backoff (float): Delay before the first retry in seconds, doubled after each retry.
+            time_in_force (str): Alpaca time in force for every order.
+        """
+        self.alpaca = alpaca
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.time_in_force = time_in_force
+        self.pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="order")
+
+    async def _submit(self, semaphore, qty, ticker, side, cycle_id):
+        result = OrderResult(ticker, side, qty)
+        result.client_order_id = client_order_id(cycle_id, ticker, side)
+        loop = asyncio.get_running_loop()
+        submit = functools.partial(self.alpaca.submit_order, ticker, qty, side, "market", self.time_in_force,
+                                   client_order_id=result.client_order_id)
+        start = time.perf_counter()
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 1):
+                result.attempts = attempt
+                try:
+                    result.order = await loop.run_in_executor(self.pool, submit)
+                    result.error = None
+                    break
+                except Exception as e:
+                    if attempt > 1 and getattr(e, "status_code", None) == 422:
+                        # a duplicate client_order_id: an earlier attempt reached the broker after all
+                        existing = await self._existing_order(loop, result.client_order_id)
+                        if existing is not None:
+                            result.order, result.error = existing, None
+                            break
+                    result.error = e
+                    if attempt == self.max_retries or not is_retryable(e):
+                        break
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        result.latency = time.perf_counter() - start
+        return result
+
+    async def _existing_order(self, loop, order_id):
+        try:
+            return await loop.run_in_executor(self.pool, self.alpaca.get_order_by_client_order_id, order_id)
+        except Exception:
+            return None
+
+    async def submit_all(self, orders, cycle_id=None):
+        """
+        Submit (qty, ticker, side) orders and return their OrderResults, sells first.
+
+        Sells are sent and acknowledged before the buys go out. A sell that was accepted has not
+        necessarily filled, so the buys must not count on its proceeds (the live planner budgets
+        them with fund_with_sales=False).
+
+        Args:
+            cycle_id (str): Identifies the trading cycle in the orders' client_order_ids, so the same
+                cycle never places an order twice. A random one is used when None.
+        """
+        cycle_id = uuid.uuid4().hex if cycle_id is None else cycle_id
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        results = []
+        for sides in (("sell",), ("buy",)):
+            futures = [
+                asyncio.ensure_future(self._submit(semaphore, qty, ticker, side, cycle_id))
+                for qty, ticker, side in orders if side in sides
+            ]
+            results.extend(await asyncio.gather(*futures))
+        return results
+
+    def execute(self, orders, cycle_id=None):
+        """Blocking entry point for the trade loop."""
+        if not orders:
+            return []
+        return asyncio.run(self.submit_all(orders, cycle_id))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
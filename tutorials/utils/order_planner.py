@@ -0,0 +1,124 @@
+import numpy as np
+
+'''
+Plans all of a cycle's orders at once against a local cash/position ledger.
+The trade loops used to submit one order at a time and re-fetch the account cash
+after each one; here sell and buy quantities are computed in one NumPy pass and the
+broker is only asked for the real cash once, after the whole batch is submitted.
+'''
+
+
+class OrderPlan:
+    def __init__(self, tickers, sell_qty, buy_qty, cash_before, cash_after):
+        """
+        Sell and buy quantities for every ticker in one trading cycle.
+
+        Args:
+            tickers (list): Ticker for each index.
+            sell_qty (np.ndarray): Shares to sell per ticker (0 for no order).
+            buy_qty (np.ndarray): Shares to buy per ticker (0 for no order).
+            cash_before (float): Cash the plan started from.
+            cash_after (float): Cash expected once every order fills at the planning prices.
+        """
+        self.tickers = tickers
+        self.sell_qty = sell_qty
+        self.buy_qty = buy_qty
+        self.cash_before = cash_before
+        self.cash_after = cash_after
+
+    @property
+    def traded(self):
+        """Boolean mask of tickers with an order in this plan."""
+        return (self.sell_qty > 0) | (self.buy_qty > 0)
+
+    def orders(self):
+        """Return (qty, ticker, side) tuples, sells first so their proceeds fund the buys."""
+        sells = [(int(self.sell_qty[i]), self.tickers[i], "sell") for i in np.flatnonzero(self.sell_qty)]
+        buys = [(int(self.buy_qty[i]), self.tickers[i], "buy") for i in np.flatnonzero(self.buy_qty)]
+        return sells + buys
+
+    def __len__(self):
+        return int(np.count_nonzero(self.sell_qty) + np.count_nonzero(self.buy_qty))
+
+
+def plan_orders(tickers, action, stocks, price, cash, min_action=10, fund_with_sales=True):
+    """
+    Compute every sell and buy quantity for one cycle.
+
+    Follows the rules of the tutorial trade loops: sell min(holding, -action) where
+    action < -min_action, then buy min(cash // price, action) where action > min_action,
+    spending cash in ticker order.
+
+    Args:
+        fund_with_sales (bool): Count the sell proceeds in the buy budget. Live orders go out
+            together and the sells have not filled when the buys are placed, so live
+            trading budgets the buys from the current cash only (False).
+    """
+    action = np.asarray(action, dtype=float)
+    stocks = np.asarray(stocks, dtype=float)
+    price = np.asarray(price, dtype=float)
+    valid_price = price > 0
+
+    sell_qty = np.where(action < -min_action, np.abs(np.trunc(np.minimum(stocks, -action))), 0).astype(np.int64)
+    cash_before = float(cash)
+    cash = cash_before + float(np.dot(sell_qty, price))
+
+    buy_mask = (action > min_action) & valid_price
+    desired = np.where(buy_mask, np.abs(np.trunc(action)), 0).astype(np.int64)
+    cost = np.cumsum(desired * price)
+    budget = max(cash if fund_with_sales else cash_before, 0.0)
+    if len(cost) == 0 or cost[-1] <= budget:
+        buy_qty = desired
+    else:
+        # not everything is affordable: spend the budget greedily in ticker order
+        buy_qty = np.zeros_like(desired)
+        for i in np.flatnonzero(desired):
+            qty = min(int(budget // price[i]), int(desired[i]))
+            buy_qty[i] = qty
+            budget -= qty * price[i]
+    cash -= float(np.dot(buy_qty, price))
+    return OrderPlan(tickers, sell_qty, buy_qty, cash_before, cash)
+
+
+def plan_liquidation(tickers, stocks, price, cash):
+    """Plan selling every share held in the given tickers (used when turbulence is high)."""
+    sell_qty = np.abs(np.trunc(np.asarray(stocks, dtype=float))).astype(np.int64)
+    buy_qty = np.zeros_like(sell_qty)
+    return OrderPlan(tickers, sell_qty, buy_qty, float(cash), float(cash) + float(np.dot(sell_qty, price)))
+
+
+def plan_orders_batch(action, stocks, price, cash, min_action=10):
+    """
+    plan_orders for many independent portfolios at once (one row each), e.g. backtest paths.
+    A simulated sell fills at once, so the sell proceeds always count in the buy budget.
+
+    Args:
+        action, stocks, price (np.ndarray): (paths, n_tickers) arrays.
+        cash (np.ndarray): (paths,) cash per portfolio.
+
+    Returns:
+        (sell_qty, buy_qty, cash_after): the per-row results plan_orders would give.
+    """
+    action = np.asarray(action, dtype=float)
+    stocks = np.asarray(stocks, dtype=float)
+    price = np.asarray(price, dtype=float)
+
+    sell_qty = np.where(action < -min_action, np.abs(np.trunc(np.minimum(stocks, -action))), 0).astype(np.int64)
+    cash = np.asarray(cash, dtype=float) + np.einsum("ij,ij->i", sell_qty, price)
+
+    buy_mask = (action > min_action) & (price > 0)
+    desired = np.where(buy_mask, np.abs(np.trunc(action)), 0).astype(np.int64)
+    budget = np.maximum(cash, 0.0)
+    affordable = np.cumsum(desired * price, axis=1)[:, -1] <= budget if desired.shape[1] else np.ones(len(cash), bool)
+    buy_qty = np.where(affordable[:, None], desired, 0)
+    short = np.flatnonzero(~affordable)
+    if len(short):
+        # the greedy spend of plan_orders, one ticker at a time across every short portfolio
+        left = budget[short].copy()
+        safe_price = np.where(price[short] > 0, price[short], np.inf)
+        for i in range(desired.shape[1]):
+            qty = np.minimum(np.floor(left / safe_price[:, i]), desired[short, i]).astype(np.int64)
+            buy_qty[short, i] = qty
+            left -= qty * price[short, i]
+    cash = cash - np.einsum("ij,ij->i", buy_qty, price)
+    return sell_qty, buy_qty, cash
@@ -0,0 +1,167 @@
+import ast
+
+import numpy as np
+
+'''
+Declarative layout of the FinRL paper trading state vector.
+The config's state_dim_formula is evaluated with a small AST evaluator (integers,
++ - * //, action_dim, sentiment_dim and len(INDICATORS) only) instead of eval(), and
+checked against the layout PaperTradingAlpaca actually builds:
+
+    [cash, turbulence, turbulence_bool, price * n, stocks * n, stocks_cd * n, tech * n * k]
+
+with the k indicators of each ticker stored next to each other. Strategies trained with
+"use_sentiment" get one decayed sentiment score per ticker appended (sentiment * n).
+The same layout writes the live state into a preallocated array by offset.
+'''
+
+# Scaling PaperTradingAlpaca.get_state applies to each block.
+CASH_SCALE = 2 ** -12
+PRICE_SCALE = 2 ** -6
+STOCKS_SCALE = 2 ** -6
+TECH_SCALE = 2 ** -7
+
+_BINARY_OPERATORS = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.FloorDiv: lambda a, b: a // b,
+}
+
+
+def evaluate_formula(formula, variables):
+    """
+    Evaluate an integer formula such as "1 + 2 + 3 * action_dim + len(INDICATORS) * action_dim".
+
+    Args:
+        formula (str): Formula from the config.
+        variables (dict): Values of the names it may use. len() is allowed on list values.
+
+    Raises:
+        ValueError: If the formula uses anything but integers, + - * //, the given names and len().
+    """
+    def visit(node):
+        if isinstance(node, ast.Expression):
+            return visit(node.body)
+        if isinstance(node, ast.Constant) and isinstance(node.value, int) and not isinstance(node.value, bool):
+            return node.value
+        if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            return _BINARY_OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+            value = visit(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.Name) and node.id in variables:
+            value = variables[node.id]
+            if not isinstance(value, int):
+                raise ValueError(f"{node.id} is not an integer; use len({node.id}).")
+            return value
+        if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "len"
+                and len(node.args) == 1 and not node.keywords
+                and isinstance(node.args[0], ast.Name) and node.args[0].id in variables
+                and isinstance(variables[node.args[0].id], (list, tuple))):
+            return len(variables[node.args[0].id])
+        raise ValueError(f"Unsupported expression in state_dim_formula: {ast.dump(node)}")
+
+    try:
+        tree = ast.parse(formula, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid state_dim_formula {formula!r}: {e}") from e
+    return visit(tree)
+
+
+class StateSchema:
+    def __init__(self, n_tickers, n_indicators, sentiment=False):
+        """
+        Offsets of every block of the state vector.
+
+        Args:
+            n_tickers (int): Number of tickers (action_dim).
+            n_indicators (int): Number of technical indicators per ticker.
+            sentiment (bool): Append one sentiment score per ticker.
+        """
+        self.n_tickers = n_tickers
+        self.n_indicators = n_indicators
+        offset = 0
+        blocks = []
+        for name, length in [
+            ("cash", 1),
+            ("turbulence", 1),
+            ("turbulence_bool", 1),
+            ("price", n_tickers),
+            ("stocks", n_tickers),
+            ("stocks_cd", n_tickers),
+            ("tech", n_tickers * n_indicators),
+            ("sentiment", n_tickers if sentiment else 0),
+        ]:
+            blocks.append((name, slice(offset, offset + length)))
+            offset += length
+        self.blocks = dict(blocks)
+        self.size = offset
+        self.cash = self.blocks["cash"]
+        self.turbulence = self.blocks["turbulence"]
+        self.turbulence_bool = self.blocks["turbulence_bool"]
+        self.price = self.blocks["price"]
+        self.stocks = self.blocks["stocks"]
+        self.stocks_cd = self.blocks["stocks_cd"]
+        self.tech = self.blocks["tech"]
+        self.sentiment = self.blocks["sentiment"] if sentiment else None
+
+    @classmethod
+    def from_config(cls, config, indicators):
+        """
+        Build the schema for a tutorial config and check its state_dim_formula against it.
+
+        Raises:
+            ValueError: If the formula is unsafe or does not match the state layout.
+        """
+        training = config["training"]
+        n_tickers = len(training["ticker_list"])
+        sentiment = bool(training.get("use_sentiment", False))
+        schema = cls(n_tickers, len(indicators), sentiment=sentiment)
+        formula = training.get("state_dim_formula")
+        if formula:
+            state_dim = evaluate_formula(formula, {"action_dim": n_tickers, "INDICATORS": list(indicators),
+                                                   "sentiment_dim": n_tickers if sentiment else 0})
+            if state_dim != schema.size:
+                raise ValueError(
+                    f"state_dim_formula gives {state_dim}, but the state of {n_tickers} tickers with "
+                    f"{len(indicators)} indicators has {schema.size} values."
+                )
+        return schema
+
+    def tech_offset(self, ticker_index):
+        """Index of the first indicator of a ticker."""
+        return self.tech.start + ticker_index * self.n_indicators
+
+    def allocate(self, dtype=np.float32, batch=None):
+        """Zeroed state vector, or a (batch, size) array of them."""
+        return np.zeros(self.size if batch is None else (batch, self.size), dtype=dtype)
+
+    def write(self, out, cash, turbulence, turbulence_bool, price, stocks, stocks_cd, tech, sentiment=None):
+        """
+        Write a scaled state into `out` in place, the way PaperTradingAlpaca.get_state builds it.
+
+        turbulence is expected already squashed (sigmoid_sign(...) * 2**-5); tech may be
+        (n, k) or flat; sentiment is left unscaled (scores are already in [-1, 1]) and
+        written as 0 when not given. NaN and inf values are replaced by 0.
+
+        `out` may also be a (batch, size) array from allocate(batch=...); every argument
+        then has a leading batch dimension.
+        """
+        out[..., self.cash] = np.expand_dims(np.multiply(cash, CASH_SCALE), -1)
+        out[..., self.turbulence] = np.expand_dims(turbulence, -1)
+        out[..., self.turbulence_bool] = np.expand_dims(turbulence_bool, -1)
+        np.multiply(price, PRICE_SCALE, out=out[..., self.price], casting="unsafe")
+        np.multiply(stocks, STOCKS_SCALE, out=out[..., self.stocks], casting="unsafe")
+        out[..., self.stocks_cd] = stocks_cd
+        tech_out = out[..., self.tech]
+        np.multiply(np.reshape(tech, tech_out.shape), TECH_SCALE, out=tech_out, casting="unsafe")
+        if self.sentiment is not None:
+            out[..., self.sentiment] = 0.0 if sentiment is None else sentiment
+        np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        return out
+
+    def __repr__(self):
+        layout = ", ".join(f"{name}[{block.start}:{block.stop}]" for name, block in self.blocks.items()
+                           if block.stop > block.start)
+        return f"StateSchema({layout})"
@@ -0,0 +1,300 @@
+import datetime
+import glob
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from tutorials.utils.bar_cache import _to_ns
+
+'''
+Append-only, fixed-schema journal of every trading cycle and order.
+Records are queued by the trading thread and written by a background thread as Arrow
+record batches to one IPC stream segment per day. When the day changes (or on close)
+the day's segments are rolled into a single compressed Parquet file, so months of
+minute-level history can be loaded with pandas/pyarrow without parsing text logs.
+
+Layout: {directory}/{strategy}/{kind}-{YYYY-MM-DD}.parquet for closed days and
+{kind}-{YYYY-MM-DD}.{segment}.arrows for the day being written, kind being
+"cycles" or "orders".
+'''
+
+CYCLE_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ns", tz="UTC")),
+    ("strategy", pa.string()),
+    ("cycle", pa.int64()),
+    ("cash", pa.float64()),
+    ("turbulence_bool", pa.int8()),
+    ("n_orders", pa.int32()),
+    ("expected_cash", pa.float64()),
+    ("state", pa.list_(pa.float32())),
+    ("action", pa.list_(pa.float32())),
+])
+
+ORDER_SCHEMA = pa.schema([
+    ("timestamp", pa.timestamp("ns", tz="UTC")),
+    ("strategy", pa.string()),
+    ("cycle", pa.int64()),
+    ("ticker", pa.string()),
+    ("side", pa.string()),
+    ("qty", pa.int64()),
+    ("price", pa.float64()),
+    ("status", pa.string()),
+    ("filled_avg_price", pa.float64()),
+    ("attempts", pa.int32()),
+    ("latency", pa.float64()),
+    ("error", pa.string()),
+])
+
+SCHEMAS = {"cycles": CYCLE_SCHEMA, "orders": ORDER_SCHEMA}
+
+
+def _day(timestamp_ns):
+    return datetime.datetime.fromtimestamp(timestamp_ns / 1e9, tz=datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+class _DayWriter:
+    def __init__(self, directory, kind, day):
+        """Column buffers and the open IPC stream segment of one record kind for one day."""
+        self.directory = directory
+        self.kind = kind
+        self.day = day
+        self.schema = SCHEMAS[kind]
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+        self.writer = None
+        self.sink = None
+
+    def append(self, row):
+        for name in self.schema.names:
+            self.columns[name].append(row.get(name))
+        self.rows += 1
+
+    def _open(self):
+        segment = len(glob.glob(os.path.join(self.directory, f"{self.kind}-{self.day}.*.arrows")))
+        path = os.path.join(self.directory, f"{self.kind}-{self.day}.{segment}.arrows")
+        self.sink = pa.OSFile(path, "wb")
+        self.writer = ipc.new_stream(self.sink, self.schema)
+
+    def flush(self):
+        """Write the buffered rows as one record batch."""
+        if not self.rows:
+            return
+        if self.writer is None:
+            self._open()
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(self.columns[field.name], type=field.type) for field in self.schema],
+            schema=self.schema,
+        )
+        self.writer.write_batch(batch)
+        self.sink.flush()
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+
+
+def read_segment(path, kind):
+    """Read an IPC stream segment, keeping the complete batches of one cut short by a crash."""
+    batches = []
+    with pa.memory_map(path) as source:
+        try:
+            for batch in ipc.open_stream(source):
+                batches.append(batch)
+        except pa.ArrowInvalid:
+            pass
+    return pa.Table.from_batches(batches, schema=SCHEMAS[kind])
+
+
+def roll_day(directory, kind, day, compression="zstd"):
+    """Merge a day's IPC segments (and any earlier Parquet file for it) into one Parquet file."""
+    segments = sorted(glob.glob(os.path.join(directory, f"{kind}-{day}.*.arrows")))
+    if not segments:
+        return None
+    path = os.path.join(directory, f"{kind}-{day}.parquet")
+    tables = [pq.read_table(path)] if os.path.exists(path) else []
+    tables.extend(read_segment(segment, kind) for segment in segments)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.concat_tables(tables), tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+    for segment in segments:
+        os.remove(segment)
+    return path
+
+
+class TradeJournal:
+    def __init__(self, directory, strategy, flush_rows=512, flush_interval=30.0, max_queue=100000):
+        """
+        Background writer of cycle and order records for one strategy.
+
+        Args:
+            directory (str): Root directory of the journal.
+            strategy (str): Strategy name; records go to directory/strategy.
+            flush_rows (int): Buffered rows per kind before a record batch is written.
+            flush_interval (float): Seconds after which buffered rows are written anyway.
+            max_queue (int): Records held before new ones are dropped rather than blocking.
+        """
+        self.directory = os.path.join(directory, strategy)
+        self.strategy = strategy
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.cycle = 0
+        self.dropped = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.writers = {}
+        self.roll_stale()
+        self.thread = threading.Thread(target=self._run, name="trade-journal", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def from_env(cls, strategy):
+        """Journal to PAPER_TRADING_JOURNAL when it is set, otherwise return None."""
+        directory = os.environ.get("PAPER_TRADING_JOURNAL")
+        if not directory:
+            return None
+        return cls(directory, strategy)
+
+    def roll_stale(self):
+        """Roll segments left behind by an earlier run (e.g. after a crash) into Parquet."""
+        for path in glob.glob(os.path.join(self.directory, "*.arrows")):
+            kind, day = os.path.basename(path).split(".")[0].split("-", 1)
+            roll_day(self.directory, kind, day)
+
+    def _put(self, kind, row):
+        try:
+            self.queue.put_nowait((kind, row))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_cycle(self, state, action, plan, results=(), price=None, cash=None, turbulence_bool=0,
+                     timestamp=None):
+        """
+        Queue one cycle and its orders. Returns immediately.
+
+        Args:
+            state (np.ndarray): Observation the model acted on.
+            action (np.ndarray): Action used to plan the orders.
+            plan (OrderPlan): Planned orders of the cycle.
+            results (list): OrderResults returned by the executor.
+            price (np.ndarray): Prices the orders were planned at, per ticker of the plan.
+            cash (float): Cash before the orders.
+            turbulence_bool (int): Whether the cycle ran in turbulence mode.
+            timestamp: datetime or nanoseconds of the cycle; defaults to now.
+        """
+        self.cycle += 1
+        timestamp = time.time_ns() if timestamp is None else _to_ns(timestamp)
+        self._put("cycles", {
+            "timestamp": timestamp,
+            "strategy": self.strategy,
+            "cycle": self.cycle,
+            "cash": None if cash is None else float(cash),
+            "turbulence_bool": int(turbulence_bool),
+            "n_orders": len(plan),
+            "expected_cash": float(plan.cash_after),
+            # copies: the live state buffer is rewritten in place next cycle
+            "state": np.array(state, dtype=np.float32),
+            "action": np.array(action, dtype=np.float32),
+        })
+        index = {ticker: i for i, ticker in enumerate(plan.tickers)}
+        for result in results:
+            filled_avg_price = getattr(result.order, "filled_avg_price", None)
+            self._put("orders", {
+                "timestamp": timestamp,
+                "strategy": self.strategy,
+                "cycle": self.cycle,
+                "ticker": result.ticker,
+                "side": result.side,
+                "qty": int(result.qty),
+                "price": None if price is None else float(price[index[result.ticker]]),
+                "status": result.status if result.ok else "failed",
+                "filled_avg_price": float(filled_avg_price) if filled_avg_price is not None else None,
+                "attempts": result.attempts,
+                "latency": result.latency,
+                "error": None if result.error is None else str(result.error),
+            })
+
+    def _writer(self, kind, day):
+        writer = self.writers.get(kind)
+        if writer is not None and writer.day != day:
+            writer.close()
+            roll_day(self.directory, kind, writer.day)
+            writer = None
+        if writer is None:
+            writer = self.writers[kind] = _DayWriter(self.directory, kind, day)
+        return writer
+
+    def _flush(self):
+        for writer in self.writers.values():
+            writer.flush()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            if item:
+                kind, row = item
+                writer = self._writer(kind, _day(row["timestamp"]))
+                writer.append(row)
+                if writer.rows >= self.flush_rows:
+                    writer.flush()
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        for kind, writer in list(self.writers.items()):
+            writer.close()
+            roll_day(self.directory, kind, writer.day)
+        self.writers = {}
+
+    def close(self):
+        """Write everything queued, roll the current day into Parquet and stop the writer."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        if self.dropped:
+            print(f"Trade journal dropped {self.dropped} records.")
+
+
+def read_journal(directory, strategy, kind="cycles", start=None, end=None):
+    """
+    Load journal records as a pandas DataFrame.
+
+    Reads the rolled Parquet files and any IPC segments still being written.
+
+    Args:
+        directory (str): Root directory of the journal.
+        strategy (str): Strategy name.
+        kind (str): "cycles" or "orders".
+        start (str): First day to read, YYYY-MM-DD (inclusive).
+        end (str): Last day to read, YYYY-MM-DD (inclusive).
+    """
+    strategy_dir = os.path.join(directory, strategy)
+    tables = []
+    for path in sorted(glob.glob(os.path.join(strategy_dir, f"{kind}-*"))):
+        day = os.path.basename(path)[len(kind) + 1:len(kind) + 11]
+        if (start and day < start) or (end and day > end):
+            continue
+        if path.endswith(".parquet"):
+            tables.append(pq.read_table(path))
+        elif path.endswith(".arrows"):
+            tables.append(read_segment(path, kind))
+    if not tables:
+        return SCHEMAS[kind].empty_table().to_pandas()
+    return pa.concat_tables(tables).to_pandas()
@@ -0,0 +1,187 @@
+import numpy as np
+
+from tutorials.utils.indicators import RingBuffer
+
+'''
+Incremental turbulence index, as FinRL defines it for training:
+
+    turbulence_t = (r_t - mean)' cov^-1 (r_t - mean)
+
+r_t holds the returns of the universe's tickers on bar t. mean and cov are taken over the
+`window` returns before it. The rolling mean, the scatter matrix and its inverse are
+kept up to date as each bar slides the window. The inverse gets two Sherman-Morrison
+rank-one updates per bar, so a bar costs O(n^2) instead of the O(window * n^2 + n^3)
+needed to rebuild and invert the covariance. Every `refactor_interval` bars the
+statistics are rebuilt from the window to bound floating point drift.
+'''
+
+
+class TurbulenceIndex:
+    def __init__(self, n, window=252, refactor_interval=None, ridge=1e-8):
+        """
+        Rolling Mahalanobis turbulence over the returns of n tickers.
+
+        Args:
+            n (int): Number of tickers.
+            window (int): Returns the mean and covariance are taken over (252 days in FinRL).
+            refactor_interval (int): Bars between full rebuilds of the mean, scatter and inverse.
+                Defaults to `window`.
+            ridge (float): Relative diagonal loading that keeps the covariance invertible when
+                tickers move together or fewer returns than tickers are available.
+        """
+        self.n = n
+        self.window = window
+        self.refactor_interval = refactor_interval or window
+        self.ridge = ridge
+        self.returns = RingBuffer(window, n)
+        self.mean = np.zeros(n)
+        self.scatter = np.zeros((n, n))
+        self.inverse = None
+        self.since_refactor = 0
+        self.prev_close = None
+        self.last_bar_time = None
+        self.value = 0.0
+        self.refactors = 0
+
+    @property
+    def warmup_bars(self):
+        """Closes needed for the first turbulence value: a base close, `window` returns and the bar scored."""
+        return self.window + 2
+
+    @property
+    def ready(self):
+        return self.returns.count == self.window
+
+    def warmup(self, close):
+        """Feed a (T, n) history of closes, oldest first, and return the last turbulence."""
+        for row in close:
+            self.update(row)
+        return self.value
+
+    def update(self, close, bar_time=None):
+        """
+        Add one bar of closes and return its turbulence (0 until the window is full).
+
+        A bar_time equal to the last one is ignored, so several feeds may share one index.
+        """
+        if bar_time is not None and bar_time == self.last_bar_time:
+            return self.value
+        self.last_bar_time = bar_time
+        close = np.asarray(close, dtype=float)
+        if self.prev_close is None:
+            self.prev_close = close.copy()
+            return self.value
+        ret = np.divide(close, self.prev_close, out=np.ones(self.n), where=self.prev_close > 0) - 1.0
+        ret[~np.isfinite(ret)] = 0.0
+        self.prev_close = close.copy()
+
+        if self.ready:
+            if self.inverse is None or self.since_refactor >= self.refactor_interval:
+                self.refactor()
+            diff = ret - self.mean
+            self.value = float((self.window - 1) * diff @ self.inverse @ diff)
+            self._slide(ret)
+        else:
+            self._append(ret)
+        return self.value
+
+    def _append(self, ret):
+        """Welford update while the window fills up."""
+        self.returns.push(ret)
+        delta = ret - self.mean
+        self.mean += delta / self.returns.count
+        self.scatter += np.outer(delta, ret - self.mean)
+
+    def _slide(self, ret):
+        """Replace the oldest return by ret: scatter and inverse each get +u1 v1' - u2 v2'."""
+        old = self.returns.push(ret)
+        mean = self.mean + (ret - old) / self.window
+        u1, v1 = ret - self.mean, ret - mean
+        u2, v2 = old - self.mean, old - mean
+        self.scatter += np.outer(u1, v1) - np.outer(u2, v2)
+        self.mean = mean
+        if not (self._rank_one(u1, v1) and self._rank_one(-u2, v2)):
+            self.refactor()
+            return
+        self.since_refactor += 1
+
+    def _rank_one(self, u, v):
+        """Sherman-Morrison: inverse of (A + u v') from the inverse of A. False if A + u v' is near singular."""
+        pu = self.inverse @ u
+        vp = v @ self.inverse
+        denominator = 1.0 + vp @ u
+        if abs(denominator) < 1e-12:
+            return False
+        self.inverse -= np.outer(pu, vp) / denominator
+        return True
+
+    def refactor(self):
+        """Rebuild mean, scatter and inverse from the returns in the window."""
+        data = self.returns.values()
+        self.mean = data.mean(axis=0)
+        centered = data - self.mean
+        self.scatter = centered.T @ centered
+        loading = self.ridge * max(np.trace(self.scatter) / self.n, 1e-12)
+        try:
+            self.inverse = np.linalg.inv(self.scatter + loading * np.eye(self.n))
+        except np.linalg.LinAlgError:
+            self.inverse = np.linalg.pinv(self.scatter + loading * np.eye(self.n))
+        # the loading stays in the inverse; rank-one updates keep it constant until the next rebuild
+        self.scatter += loading * np.eye(self.n)
+        self.since_refactor = 0
+        self.refactors += 1
+
+
+class UniverseTurbulence:
+    def __init__(self, ticker_list, universes=None, window=252, refactor_interval=None):
+        """
+        One TurbulenceIndex per distinct ticker universe, all fed from the same bars.
+
+        Strategies trading the same universe share its index, whatever order they list the
+        tickers in.
+
+        Args:
+            ticker_list (list): Tickers of the closes passed to update(), in that order.
+            universes (list): Ticker lists to compute turbulence for. Defaults to ticker_list.
+            window (int): Rolling window in bars.
+            refactor_interval (int): Bars between full rebuilds (see TurbulenceIndex).
+        """
+        self.ticker_list = list(ticker_list)
+        position = {ticker: i for i, ticker in enumerate(self.ticker_list)}
+        self.universes = []
+        self.slots = {}
+        for universe in universes or [self.ticker_list]:
+            key = frozenset(universe)
+            if key in self.slots:
+                continue
+            self.slots[key] = len(self.universes)
+            columns = np.array(sorted(position[ticker] for ticker in key))
+            self.universes.append((columns, TurbulenceIndex(len(columns), window, refactor_interval)))
+        self.values = np.zeros(len(self.universes))
+
+    @property
+    def warmup_bars(self):
+        return self.universes[0][1].warmup_bars
+
+    def slot(self, tickers):
+        """Index into values of the universe made of these tickers."""
+        return self.slots[frozenset(tickers)]
+
+    def warmup(self, close):
+        """Feed a (T, len(ticker_list)) history of closes, oldest first."""
+        for row in np.asarray(close, dtype=float):
+            self.update(row)
+        return self.values
+
+    def update(self, close, bar_time=None):
+        """Add one bar of closes for ticker_list and return the turbulence of every universe."""
+        close = np.asarray(close, dtype=float)
+        for i, (columns, index) in enumerate(self.universes):
+            self.values[i] = index.update(close[columns], bar_time)
+        return self.values
+
+    def value_for(self, tickers=None):
+        """Turbulence of the universe made of these tickers (the first universe when unknown)."""
+        if tickers is None:
+            return float(self.values[0])
+        return float(self.values[self.slots.get(frozenset(tickers), 0)])